@@ -1,57 +1,24 @@
-# from flask import Flask
-# from flask_sqlalchemy import SQLAlchemy
-# from flask_bcrypt import Bcrypt
-# from flask_jwt_extended import JWTManager
-# from dotenv import load_dotenv
-# import os
-
-# load_dotenv()  # Load environment variables from .env
-
-# db = SQLAlchemy()
-# bcrypt = Bcrypt()
-# jwt = JWTManager()
-
-# def create_app():
-#     app = Flask(__name__)
-
-#     # Load configuration
-#     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
-#     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
-
-#     # Initialize extensions
-#     db.init_app(app)
-#     bcrypt.init_app(app)
-#     jwt.init_app(app)
-
-#     # Register Blueprints
-#     from routes import competition_routes
-#     app.register_blueprint(competition_routes)
-
-#     return app
-
-# # Create the app instance at the module level
-# app = create_app()
-
-# if __name__ == "__main__":
-#     app.run(host="0.0.0.0", port=5001, debug=True)
-
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 from dotenv import load_dotenv
 import os
-import threading
-import asyncio
-import websockets
-import json
 import redis
+import requests
+from cache import ShardedCache
+from db_routing import RoutingSQLAlchemy, router_from_env
 
 load_dotenv()  # Load environment variables from .env
 
-db = SQLAlchemy()
-bcrypt = Bcrypt()
+# Importing this module (and so each gunicorn worker, or the master with --preload) only
+# builds objects: Redis clients, engines, the user service session and background threads
+# all connect or start on first use, per process. That keeps imports fast and makes the
+# app safe to load before forking (see gunicorn.conf.py).
+
+# GET requests read from the replicas in DATABASE_REPLICA_URLS (see db_routing.py)
+db = RoutingSQLAlchemy()
 jwt = JWTManager()
+# Schema changes are Alembic revisions under migrations/versions (python migrate.py applies them)
+MIGRATIONS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
 
 # Get environment variables
 SERVICE_DISCOVERY_URL = os.getenv('SERVICE_DISCOVERY_URL', 'http://service_discovery:9000')
@@ -62,25 +29,53 @@ def register_service():
         "service_url": "http://competition_service:5001"
     }
     try:
-        response = requests.post("http://service_discovery:9000/register", json=service_data)
+        response = requests.post(f"{SERVICE_DISCOVERY_URL}/register", json=service_data, timeout=5)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         print(f"Error registering service: {e}")
 
-# Redis client
-redis_client = redis.StrictRedis(host='redis', port=6379, db=0)
-
-def create_app():
+# Read-through cache, consistent-hashed across the Redis nodes in CACHE_REDIS_URLS
+# (comma separated; `memory://<name>` gives an in-process node). Concurrent misses for an
+# entry are loaded once, serving the stale entry meanwhile (see cache.py).
+cache = ShardedCache.from_urls(
+    os.getenv('CACHE_REDIS_URLS', 'redis://redis:6379/0').split(','),
+    ttl=int(os.getenv('CACHE_TTL', '60')),
+    stale_ttl=int(os.getenv('CACHE_STALE_TTL', '10')),
+    lock_ttl=float(os.getenv('CACHE_LOCK_TTL', '5'))
+)
+
+db_router = router_from_env(redis.Redis.from_url(
+    os.getenv('REDIS_URL', 'redis://redis:6379/0'), socket_timeout=0.25, socket_connect_timeout=0.25
+))
+# Pages read from a lagging replica are only cached for about as long as the allowed lag
+cache.ttl_cap = db_router.cache_ttl_cap
+
+# Alembic is only needed to apply migrations, so workers don't import it
+def init_migrations(app):
+    from flask_migrate import Migrate
+    return Migrate(app, db, directory=MIGRATIONS_DIRECTORY)
+
+# Run in each gunicorn worker after forking from a preloaded master
+def reset_after_fork():
+    with app.app_context():
+        db.engine.dispose()
+    db_router.dispose()
+
+def create_app(migrations=False):
     app = Flask(__name__)
 
     # Load configuration
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
+    # Same key as user_management_service, so tokens are verified locally
+    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
 
     # Initialize extensions
     db.init_app(app)
-    bcrypt.init_app(app)
     jwt.init_app(app)
+    db_router.init_app(app)
+    if migrations:
+        init_migrations(app)
 
     # Register Blueprints
     from routes import competition_routes
@@ -91,47 +86,6 @@ def create_app():
 # Create the app instance at the module level
 app = create_app()
 
-# WebSocket server code
-connected_clients = {}
-
-async def websocket_handler(websocket, path):
-    try:
-        async for message in websocket:
-            data = json.loads(message)
-            action = data.get("action")
-
-            if action == "subscribe":
-                competition_id = data.get("competition_id")
-                if competition_id:
-                    if competition_id not in connected_clients:
-                        connected_clients[competition_id] = []
-                    connected_clients[competition_id].append(websocket)
-                    await websocket.send(json.dumps({"status": "subscribed", "competition_id": competition_id}))
-            elif action == "new_submission":
-                competition_id = data.get("competition_id")
-                if competition_id in connected_clients:
-                    # Notify all subscribers of the new submission
-                    for client in connected_clients[competition_id]:
-                        if client != websocket:
-                            await client.send(json.dumps({"message": "New submission received", "data": data}))
-    except websockets.ConnectionClosed:
-        pass
-    finally:
-        # Remove disconnected clients from all rooms
-        for subscribers in connected_clients.values():
-            if websocket in subscribers:
-                subscribers.remove(websocket)
-
-def start_websocket_server():
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    start_server = websockets.serve(websocket_handler, "0.0.0.0", 6480)
-    loop.run_until_complete(start_server)
-    loop.run_forever()
-
-# Start WebSocket server in a separate thread
-threading.Thread(target=start_websocket_server, daemon=True).start()
-
 if __name__ == "__main__":
-    rregister_service()
+    register_service()
     app.run(host="0.0.0.0", port=5001, debug=True)
@@ -0,0 +1,13 @@
+import sys
+from app import create_app
+from models import Competition
+import rollups
+
+app = create_app()
+
+# Usage: python backfill_rollups.py [competition_id ...]   (all competitions by default)
+with app.app_context():
+    competition_ids = sys.argv[1:] or [competition_id for competition_id, in Competition.query.with_entities(Competition.id)]
+    for competition_id in competition_ids:
+        buckets = rollups.rebuild(competition_id)
+        print(f"Rollups for {competition_id} rebuilt: {buckets} buckets.")
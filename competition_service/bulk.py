@@ -0,0 +1,205 @@
+import csv
+import datetime
+import io
+import json
+import os
+import uuid
+from collections import Counter
+from itertools import islice
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
+from app import db, cache
+from models import Submission, Comment, make_excerpt
+import counters
+import leaderboard
+import rollups
+import search
+
+# Bulk import/export of submissions and comments as NDJSON or CSV, used by the
+# /import and /export routes and by bulk_cli.py.
+#
+# Imports are read and written CHUNK_SIZE records at a time, with COPY on Postgres and an
+# executemany INSERT elsewhere, all in one transaction. Nothing is published to the
+# notification processes. Exports read through a server-side cursor, so memory use stays
+# flat however large the competition is.
+
+FORMATS = ('ndjson', 'csv')
+CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', '1000'))
+
+SUBMISSION_COLUMNS = ["submission_id", "title", "content", "created_at", "user_id", "likes_count", "comments_count"]
+COMMENT_COLUMNS = ["comment_id", "submission_id", "parent_comment_id", "content", "created_at", "user_id"]
+
+
+def parse_format(raw, mimetype=None):
+    if not raw:
+        return 'csv' if mimetype == 'text/csv' else 'ndjson'
+    if raw not in FORMATS:
+        raise ValueError(f"Unknown format: {raw}")
+    return raw
+
+def read_records(stream, fmt):
+    if fmt == 'csv':
+        # Empty CSV cells mean "not given"
+        for record in csv.DictReader(stream):
+            yield {key: value for key, value in record.items() if value != ''}
+        return
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            raise ValueError(f"Invalid JSON on line {number}")
+
+def _chunks(records):
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, CHUNK_SIZE))
+        if not chunk:
+            return
+        yield chunk
+
+def _required(record, *fields):
+    missing = [field for field in fields if not record.get(field)]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+
+def _timestamp(value, default):
+    if not value:
+        return default
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid created_at: {value}")
+
+def _write(table, rows):
+    if db.engine.dialect.name != 'postgresql':
+        db.session.execute(table.insert(), rows)
+        return
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([row[column] for column in columns] for row in rows)
+    buffer.seek(0)
+    # COPY runs on the session's own connection, inside the import transaction
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert(f'COPY "{table.name}" ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+def import_submissions(competition, records, default_user_id=None):
+    now = datetime.datetime.utcnow()
+    imported = 0
+    for chunk in _chunks(records):
+        rows = []
+        for record in chunk:
+            _required(record, "title", "content")
+            rows.append({
+                "id": record.get("submission_id") or str(uuid.uuid4()),
+                "title": record["title"],
+                "content": record["content"],
+                "excerpt": make_excerpt(record["content"]),
+                "content_length": len(record["content"]),
+                "created_at": _timestamp(record.get("created_at"), now),
+                "competition_id": competition.id,
+                "user_id": record.get("user_id") or default_user_id or competition.admin_id,
+                # Likes and comments are not part of the import; they start from zero
+                "likes_count": 0,
+                "comments_count": 0
+            })
+        _write(Submission.__table__, rows)
+        counters.record_submission(competition.id, len(rows))
+        deltas = rollups.Deltas()
+        for row in rows:
+            deltas.add(competition.id, row["id"], row["user_id"], 'submissions', row["created_at"])
+        deltas.apply()
+        search.index_documents([('submission', row["id"], competition.id, row["title"], row["content"])
+                                for row in rows])
+        imported += len(rows)
+    db.session.commit()
+
+    cache.invalidate("competitions", f"competition:{competition.id}")
+    # Rebuilt from the database on the next read
+    leaderboard.forget_competition(competition.id)
+    return imported
+
+def import_comments(competition, records, default_user_id=None):
+    now = datetime.datetime.utcnow()
+    imported = Counter()
+    submissions = {}
+    for chunk in _chunks(records):
+        for record in chunk:
+            _required(record, "submission_id", "content")
+        wanted = {record["submission_id"] for record in chunk} - set(submissions)
+        if wanted:
+            submissions.update((submission.id, submission) for submission in Submission.query
+                               .options(load_only('id', 'competition_id', 'user_id'))
+                               .filter(Submission.id.in_(wanted), Submission.competition_id == competition.id))
+        unknown = sorted({record["submission_id"] for record in chunk} - set(submissions))
+        if unknown:
+            raise ValueError(f"Submissions not in this competition: {', '.join(unknown[:10])}")
+
+        rows = [{
+            "id": record.get("comment_id") or str(uuid.uuid4()),
+            "content": record["content"],
+            "created_at": _timestamp(record.get("created_at"), now),
+            "user_id": record.get("user_id") or default_user_id or competition.admin_id,
+            "submission_id": record["submission_id"],
+            "parent_comment_id": record.get("parent_comment_id")
+        } for record in chunk]
+        _write(Comment.__table__, rows)
+        chunk_counts = Counter(row["submission_id"] for row in rows)
+        for submission_id, count in chunk_counts.items():
+            counters.record_comment(submissions[submission_id], count)
+        deltas = rollups.Deltas()
+        for row in rows:
+            submission = submissions[row["submission_id"]]
+            deltas.add(competition.id, submission.id, submission.user_id, 'comments', row["created_at"])
+        deltas.apply()
+        imported.update(chunk_counts)
+    db.session.commit()
+
+    cache.invalidate(f"competition:{competition.id}", *[f"submission:{submission_id}" for submission_id in imported])
+    return sum(imported.values())
+
+
+def _format_value(value):
+    return value.isoformat() if isinstance(value, datetime.datetime) else value
+
+# Yields the export in pieces of CHUNK_SIZE rows; run it inside stream_with_context (or an
+# app context) since it reads while the response is being sent
+def _export(statement, columns, fmt):
+    result = db.session.execute(statement.execution_options(stream_results=True))
+    try:
+        if fmt == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            yield buffer.getvalue()
+        while True:
+            rows = result.fetchmany(CHUNK_SIZE)
+            if not rows:
+                return
+            if fmt == 'csv':
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows([_format_value(value) for value in row] for row in rows)
+                yield buffer.getvalue()
+            else:
+                yield ''.join(json.dumps(dict(zip(columns, map(_format_value, row)))) + '\n' for row in rows)
+    finally:
+        result.close()
+
+def export_submissions(competition_id, fmt):
+    table = Submission.__table__
+    statement = (select([table.c.id, table.c.title, table.c.content, table.c.created_at,
+                         table.c.user_id, table.c.likes_count, table.c.comments_count])
+                 .where(table.c.competition_id == competition_id)
+                 .order_by(table.c.created_at, table.c.id))
+    return _export(statement, SUBMISSION_COLUMNS, fmt)
+
+def export_comments(competition_id, fmt):
+    comments, submissions = Comment.__table__, Submission.__table__
+    # Oldest first, so replies come after the comments they answer
+    statement = (select([comments.c.id, comments.c.submission_id, comments.c.parent_comment_id,
+                         comments.c.content, comments.c.created_at, comments.c.user_id])
+                 .where(comments.c.submission_id == submissions.c.id)
+                 .where(submissions.c.competition_id == competition_id)
+                 .order_by(comments.c.created_at, comments.c.id))
+    return _export(statement, COMMENT_COLUMNS, fmt)
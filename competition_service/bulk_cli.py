@@ -0,0 +1,38 @@
+import sys
+from app import create_app
+from models import Competition
+import bulk
+
+app = create_app()
+
+USAGE = """Usage:
+  python bulk_cli.py import submissions|comments <competition_id> <file.ndjson|file.csv>
+  python bulk_cli.py export submissions|comments <competition_id> [file.ndjson|file.csv]"""
+
+def _format(path):
+    return 'csv' if path and path.endswith('.csv') else 'ndjson'
+
+if len(sys.argv) < 4 or sys.argv[1] not in ('import', 'export') or sys.argv[2] not in ('submissions', 'comments'):
+    sys.exit(USAGE)
+action, kind, competition_id = sys.argv[1:4]
+path = sys.argv[4] if len(sys.argv) > 4 else None
+
+with app.app_context():
+    competition = Competition.query.get(competition_id)
+    if not competition:
+        sys.exit(f"Competition {competition_id} not found.")
+
+    if action == 'import':
+        if not path:
+            sys.exit(USAGE)
+        importer = bulk.import_submissions if kind == 'submissions' else bulk.import_comments
+        with open(path, encoding='utf-8', newline='') as source:
+            imported = importer(competition, bulk.read_records(source, _format(path)))
+        print(f"{imported} {kind} imported into {competition_id}.")
+    else:
+        exporter = bulk.export_submissions if kind == 'submissions' else bulk.export_comments
+        target = open(path, 'w', encoding='utf-8', newline='') if path else sys.stdout
+        for piece in exporter(competition_id, _format(path)):
+            target.write(piece)
+        if path:
+            target.close()
@@ -0,0 +1,267 @@
+import bisect
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter
+import redis
+from flask import json
+
+logger = logging.getLogger(__name__)
+
+VIRTUAL_NODES = 160
+DEFAULT_TTL = 60
+# How long past its TTL, or after an invalidation, an entry may still be served while it
+# is being reloaded
+DEFAULT_STALE_TTL = 10
+# How long one process may hold the reload of an entry before others load it themselves
+DEFAULT_LOCK_TTL = 5
+LOCK_POLL_INTERVAL = 0.025
+# How long a node that just failed is skipped before we try it again
+NODE_RETRY_AFTER = 5
+
+
+# Consistent-hash ring: each node owns `replicas` points, a key belongs to the next point clockwise
+class HashRing:
+    def __init__(self, nodes=(), replicas=VIRTUAL_NODES):
+        self.replicas = replicas
+        self._points = []
+        self._owners = {}
+        for node in nodes:
+            self.add_node(node)
+
+    @staticmethod
+    def _hash(value):
+        return int(hashlib.md5(value.encode('utf-8')).hexdigest()[:16], 16)
+
+    def add_node(self, node):
+        for i in range(self.replicas):
+            point = self._hash(f"{node}#{i}")
+            if point not in self._owners:
+                bisect.insort(self._points, point)
+            self._owners[point] = node
+
+    def remove_node(self, node):
+        for i in range(self.replicas):
+            point = self._hash(f"{node}#{i}")
+            if self._owners.get(point) == node:
+                del self._owners[point]
+                self._points.remove(point)
+
+    def get_node(self, key):
+        if not self._points:
+            raise LookupError("Hash ring is empty")
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+
+# The handful of Redis commands the cache uses, for tests and for running without Redis
+class InMemoryRedis:
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key):
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def get(self, key):
+        with self._lock:
+            return self._data[key] if self._alive(key) else None
+
+    def set(self, key, value, ex=None, px=None, nx=False):
+        with self._lock:
+            if nx and self._alive(key):
+                return None
+            self._data[key] = value if isinstance(value, bytes) else str(value).encode('utf-8')
+            if px is not None:
+                ex = px / 1000
+            if ex is not None:
+                self._expires[key] = time.time() + ex
+            else:
+                self._expires.pop(key, None)
+            return True
+
+    def incr(self, key):
+        with self._lock:
+            value = int(self._data[key]) + 1 if self._alive(key) else 1
+            self._data[key] = str(value).encode('utf-8')
+            return value
+
+    def delete(self, *keys):
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._alive(key):
+                    del self._data[key]
+                    self._expires.pop(key, None)
+                    removed += 1
+            return removed
+
+
+# One computation in progress in this process, shared by the callers that wait for it
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def wait(self, timeout):
+        if not self.done.wait(timeout):
+            raise TimeoutError
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+# Read-through JSON cache spread over several Redis nodes.
+#
+# Entries are grouped into namespaces (`competitions`, `competition:<id>`, ...). A
+# namespace and all of its entries live on the same node. Each entry records the
+# namespace's generation number when it was loaded, so invalidating a namespace is one
+# INCR that makes all of its entries stale at once. A node that errors is skipped for
+# NODE_RETRY_AFTER seconds and reads fall through to the loader, so Redis is never on the
+# critical path.
+#
+# Misses and stale entries are loaded once, however many callers ask at the same time:
+#  - within a process, concurrent callers for the same entry wait for the first one's
+#    load (single flight);
+#  - across processes, the loader holds a Redis lock (SET NX PX, lock_ttl seconds) and
+#    the other processes poll for its result instead of loading themselves;
+#  - while a load is in progress, callers that have a stale entry (invalidated, or past
+#    its TTL by less than stale_ttl seconds) are answered with it straight away.
+# So a stale read is at most one load behind, and only while someone else is loading.
+class ShardedCache:
+    def __init__(self, nodes, ttl=DEFAULT_TTL, replicas=VIRTUAL_NODES, stale_ttl=DEFAULT_STALE_TTL,
+                 lock_ttl=DEFAULT_LOCK_TTL, single_flight=True):
+        self.nodes = dict(nodes)
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.lock_ttl = lock_ttl
+        self.single_flight = single_flight
+        self.ring = HashRing(self.nodes, replicas)
+        self._down_until = {}
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self.stats = Counter()
+        # Optional callable returning an upper bound on the TTL for the current request
+        self.ttl_cap = None
+
+    @classmethod
+    def from_urls(cls, urls, **kwargs):
+        nodes = {}
+        for url in urls:
+            url = url.strip()
+            if not url:
+                continue
+            if url.startswith('memory://'):
+                nodes[url] = InMemoryRedis()
+            else:
+                nodes[url] = redis.Redis.from_url(url, socket_timeout=0.25, socket_connect_timeout=0.25)
+        return cls(nodes, **kwargs)
+
+    def _available(self, namespace):
+        return self._down_until.get(self.ring.get_node(namespace), 0) <= time.time()
+
+    def _call(self, namespace, command, *args, **kwargs):
+        node = self.ring.get_node(namespace)
+        if self._down_until.get(node, 0) > time.time():
+            return None
+        try:
+            return getattr(self.nodes[node], command)(*args, **kwargs)
+        except redis.RedisError as e:
+            logger.warning(f"Cache node {node} unavailable: {e}")
+            self._down_until[node] = time.time() + NODE_RETRY_AFTER
+            return None
+
+    def _generation(self, namespace):
+        return int(self._call(namespace, 'get', f"{namespace}:gen") or 0)
+
+    def _entry(self, namespace, key):
+        cached = self._call(namespace, 'get', key)
+        return json.loads(cached) if cached is not None else None
+
+    def get_or_load(self, namespace, args, loader, ttl=None):
+        generation = self._generation(namespace)
+        key = f"{namespace}:{args}"
+        entry = self._entry(namespace, key)
+        if entry is not None and entry["generation"] == generation and entry["fresh_until"] > time.time():
+            self.stats["hits"] += 1
+            return entry["value"]
+        if not self.single_flight:
+            return self._load(namespace, key, generation, loader, ttl)
+
+        flight_key = f"{key}:{generation}"
+        with self._flights_lock:
+            flight = self._flights.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[flight_key] = _Flight()
+        if not leader:
+            if entry is not None:
+                self.stats["stale"] += 1
+                return entry["value"]
+            try:
+                value = flight.wait(self.lock_ttl)
+                self.stats["coalesced"] += 1
+                return value
+            except TimeoutError:
+                return self._load(namespace, key, generation, loader, ttl)
+
+        try:
+            flight.value = self._refresh(namespace, key, generation, entry, loader, ttl)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                del self._flights[flight_key]
+            flight.done.set()
+
+    # This process's one caller for the entry: load it, unless another process already is
+    def _refresh(self, namespace, key, generation, entry, loader, ttl):
+        lock = f"{key}:{generation}:lock"
+        if not self._available(namespace) or self._call(namespace, 'set', lock, '1', nx=True,
+                                                        px=int(self.lock_ttl * 1000)):
+            try:
+                return self._load(namespace, key, generation, loader, ttl)
+            finally:
+                self._call(namespace, 'delete', lock)
+        if entry is not None:
+            self.stats["stale"] += 1
+            return entry["value"]
+
+        # Wait for the other process's result; load it ourselves if it gives up or times out
+        deadline = time.time() + self.lock_ttl
+        while time.time() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            entry = self._entry(namespace, key)
+            if entry is not None and entry["generation"] >= generation:
+                self.stats["coalesced"] += 1
+                return entry["value"]
+            if self._call(namespace, 'get', lock) is None:
+                break
+        return self._load(namespace, key, generation, loader, ttl)
+
+    def _load(self, namespace, key, generation, loader, ttl):
+        self.stats["loads"] += 1
+        value = loader()
+        # `None` means "nothing to cache" (e.g. not found)
+        if value is None:
+            return None
+        ttl = ttl or self.ttl
+        cap = self.ttl_cap() if self.ttl_cap else None
+        ttl = min(ttl, cap) if cap else ttl
+        # Round-trip through JSON so hits and misses serialize identically
+        encoded = json.dumps({"generation": generation, "fresh_until": time.time() + ttl, "value": value})
+        self._call(namespace, 'set', key, encoded, ex=max(1, int(ttl + self.stale_ttl)))
+        return json.loads(encoded)["value"]
+
+    def invalidate(self, *namespaces):
+        for namespace in namespaces:
+            self._call(namespace, 'incr', f"{namespace}:gen")
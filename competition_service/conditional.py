@@ -0,0 +1,81 @@
+import gzip
+import os
+from flask import Response, jsonify, request
+
+# Conditional GETs and compression for the endpoints clients poll.
+#
+# GET /competitions/<id> and /submissions/<id> carry a strong ETag built from the row's
+# version counter (bumped with every counter update, see counters.py). A request whose
+# If-None-Match still matches gets a 304 after looking up only that version, without
+# reading the submissions or rendering anything. Cache-Control: no-cache makes clients
+# and proxies revalidate on every use instead of guessing a freshness lifetime.
+#
+# JSON responses of at least GZIP_MIN_SIZE bytes are gzipped for clients that accept it.
+# The compressed variant gets its own strong ETag (suffix -gzip), as the bytes differ.
+#
+# Parts of a response that don't come from the row (e.g. usernames from the user
+# service) go into the tag as a `variant` - a version of their own that can be read as
+# cheaply as the row's - so revalidation notices when only they change.
+
+GZIP_MIN_SIZE = int(os.getenv('GZIP_MIN_SIZE', '1024'))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', '5'))
+GZIP_SUFFIX = '-gzip'
+
+
+def etag(kind, version, variant=None):
+    return f"{kind}-{version}-{variant}" if variant else f"{kind}-{version}"
+
+def _mark(response, tag):
+    response.set_etag(tag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
+
+# A 304 if the client already has the current version, else None. `version_of` is only
+# called when the request is conditional.
+def not_modified(kind, version_of, variant=None):
+    if not request.if_none_match:
+        return None
+    version = version_of()
+    if version is None:
+        return None
+    tag = etag(kind, version, variant)
+    for variant in (tag, tag + GZIP_SUFFIX):
+        if request.if_none_match.contains(variant):
+            return _mark(Response(status=304), variant)
+    return None
+
+# Tags a response built from `payload` with the payload's version
+def with_etag(response, payload, kind, variant=None):
+    # Cached before versions existed
+    if payload.get("version") is not None:
+        _mark(response, etag(kind, payload["version"], variant))
+    return response
+
+def json_response(payload, kind, variant=None):
+    return with_etag(jsonify(payload), payload, kind, variant)
+
+# For responses built from data that may be incomplete or stale (a dependency was
+# down): no ETag, and not to be stored by clients or proxies
+def uncacheable(response):
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+# after_request hook
+def compress(response):
+    if (response.status_code != 200 or response.mimetype != 'application/json'
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or 'gzip' not in request.accept_encodings):
+        return response
+    body = response.get_data()
+    if len(body) < GZIP_MIN_SIZE:
+        return response
+    response.set_data(gzip.compress(body, GZIP_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    tag, weak = response.get_etag()
+    if tag:
+        response.set_etag(tag + GZIP_SUFFIX, weak)
+    return response
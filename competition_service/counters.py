@@ -0,0 +1,97 @@
+from sqlalchemy import func
+from app import db
+from models import Competition, Submission
+from queries import submissions_with_counts
+
+# Counter updates are issued as `column = column + delta` so concurrent writers never
+# overwrite each other. They join the caller's transaction; the route commits. Each one
+# also bumps the row's version, which the read endpoints serve as their ETag.
+
+def _increment(model, id, **deltas):
+    values = {getattr(model, column): getattr(model, column) + delta for column, delta in deltas.items()}
+    values[model.version] = model.version + 1
+    db.session.query(model).filter(model.id == id).update(values, synchronize_session=False)
+
+def record_submission(competition_id, count=1):
+    _increment(Competition, competition_id, submissions_count=count)
+
+def record_like(submission, count=1):
+    _increment(Submission, submission.id, likes_count=count)
+    _increment(Competition, submission.competition_id, likes_count=count)
+
+def record_comment(submission, count=1):
+    _increment(Submission, submission.id, comments_count=count)
+    _increment(Competition, submission.competition_id, comments_count=count)
+
+def forget_submission(submission):
+    _increment(Competition, submission.competition_id,
+               submissions_count=-1,
+               likes_count=-submission.likes_count,
+               comments_count=-submission.comments_count)
+
+
+# Reconcile job: recount in batches of `batch_size` rows (keyset on id) and repair drift.
+# Each repair is a compare-and-set on the value that was read, so a like or comment that
+# commits mid-batch is never clobbered; the row is simply picked up on the next run.
+
+def _batches(model, batch_size):
+    last_id = ''
+    while True:
+        ids = [row.id for row in db.session.query(model.id)
+               .filter(model.id > last_id)
+               .order_by(model.id)
+               .limit(batch_size)]
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+def _compare_and_set(model, id, seen, actual):
+    values = {getattr(model, column): value for column, value in actual.items()}
+    values[model.version] = model.version + 1
+    return db.session.query(model).filter(
+        model.id == id,
+        *[getattr(model, column) == value for column, value in seen.items()]
+    ).update(values, synchronize_session=False)
+
+def reconcile_submissions(batch_size=500):
+    repaired = 0
+    for ids in _batches(Submission, batch_size):
+        for submission, likes, comments in submissions_with_counts(Submission.id.in_(ids)):
+            seen = {"likes_count": submission.likes_count, "comments_count": submission.comments_count}
+            actual = {"likes_count": likes, "comments_count": comments}
+            if seen != actual:
+                repaired += _compare_and_set(Submission, submission.id, seen, actual)
+        db.session.commit()
+        db.session.expunge_all()
+    return repaired
+
+def reconcile_competitions(batch_size=500):
+    repaired = 0
+    for ids in _batches(Competition, batch_size):
+        totals = {row[0]: row[1:] for row in db.session.query(
+            Submission.competition_id,
+            func.count(Submission.id),
+            func.coalesce(func.sum(Submission.likes_count), 0),
+            func.coalesce(func.sum(Submission.comments_count), 0)
+        ).filter(Submission.competition_id.in_(ids)).group_by(Submission.competition_id)}
+
+        for competition in Competition.query.filter(Competition.id.in_(ids)):
+            seen = {
+                "submissions_count": competition.submissions_count,
+                "likes_count": competition.likes_count,
+                "comments_count": competition.comments_count
+            }
+            actual = dict(zip(seen, totals.get(competition.id, (0, 0, 0))))
+            if seen != actual:
+                repaired += _compare_and_set(Competition, competition.id, seen, actual)
+        db.session.commit()
+        db.session.expunge_all()
+    return repaired
+
+def reconcile(batch_size=500):
+    # Submissions first: competition totals are summed from the submission counters
+    return {
+        "submissions": reconcile_submissions(batch_size),
+        "competitions": reconcile_competitions(batch_size)
+    }
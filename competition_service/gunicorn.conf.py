@@ -0,0 +1,21 @@
+import os
+import time
+
+# gunicorn reads this file from the working directory. The app is imported once in the
+# master and forked into the workers, so a new or restarted worker is ready almost
+# immediately instead of importing everything again. Set GUNICORN_PRELOAD=0 to import
+# in each worker instead.
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+
+
+def pre_fork(server, worker):
+    worker.forked_at = time.monotonic()
+
+def post_fork(server, worker):
+    # Connection pools must not be shared with the master or other workers
+    if server.cfg.preload_app:
+        from app import reset_after_fork
+        reset_after_fork()
+
+def post_worker_init(worker):
+    worker.log.info(f"Worker {worker.pid} ready {(time.monotonic() - worker.forked_at) * 1000:.0f} ms after fork")
@@ -0,0 +1,192 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import requests
+from requests.adapters import HTTPAdapter
+from tenacity import Retrying, wait_random_exponential
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRYABLE_STATUS = {502, 503, 504}
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    pass
+
+
+class _RetryableResponse(Exception):
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+# Token bucket that caps retries at a fraction of recent traffic (plus a small floor), so a
+# struggling service sees at most ~(1 + ratio)x its normal load instead of a retry storm
+class RetryBudget:
+    def __init__(self, ratio=0.2, min_per_second=5, max_tokens=50):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, amount):
+        self._tokens = min(self.max_tokens, self._tokens + amount)
+
+    def deposit(self):
+        with self._lock:
+            self._refill(self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refill((now - self._refilled_at) * self.min_per_second)
+            self._refilled_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+# Keep-alive HTTP client for calls to another service.
+#
+# Every call has a deadline covering all of its attempts. Failed attempts (connection
+# errors, timeouts, 502/503/504) are retried with jittered exponential backoff while the
+# deadline and the retry budget allow, but only for idempotent requests. Idempotent
+# reads can also be hedged: if the first attempt has not answered after `hedge_after`
+# seconds a second one is sent and whichever answers first wins.
+class ServiceClient:
+    def __init__(self, base_url, pool_size=20, timeout=2.0, retries=2, backoff=0.05,
+                 max_backoff=0.5, hedge_after=None, budget=None):
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_after = hedge_after
+        self.budget = budget or RetryBudget()
+        self._pid = None
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self._counts = {"requests": 0, "attempts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0,
+                        "errors": 0, "budget_exhausted": 0}
+
+    # Sessions (and their sockets) are created per process so a forked worker never
+    # shares connections with its parent
+    def _ensure_session(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+                self._adapter = adapter
+                self._executor = ThreadPoolExecutor(max_workers=self.pool_size)
+                self._pid = os.getpid()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def _send_once(self, method, url, deadline_at, kwargs):
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Deadline exceeded before {method} {url}")
+        self._count("attempts")
+        start = time.monotonic()
+        response = self._session.request(method, url, timeout=remaining, **kwargs)
+        self._latencies.append(time.monotonic() - start)
+        if response.status_code in RETRYABLE_STATUS:
+            raise _RetryableResponse(response)
+        return response
+
+    def _send_hedged(self, method, url, deadline_at, kwargs):
+        first = self._executor.submit(self._send_once, method, url, deadline_at, kwargs)
+        done, _ = wait([first], timeout=self.hedge_after)
+        if done:
+            return first.result()
+
+        self._count("hedges")
+        second = self._executor.submit(self._send_once, method, url, deadline_at, kwargs)
+        pending = [first, second]
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0, deadline_at - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded(f"Deadline exceeded waiting for {method} {url}")
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _should_retry(self, state, idempotent, deadline_at):
+        if not state.outcome.failed:
+            return False
+        error = state.outcome.exception()
+        if not idempotent or state.attempt_number > self.retries or time.monotonic() >= deadline_at:
+            return False
+        if isinstance(error, DeadlineExceeded):
+            return False
+        if not isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout, _RetryableResponse)):
+            return False
+        if not self.budget.withdraw():
+            self._count("budget_exhausted")
+            return False
+        self._count("retries")
+        return True
+
+    def request(self, method, path, deadline=None, idempotent=None, hedge=None, **kwargs):
+        self._ensure_session()
+        method = method.upper()
+        url = f"{self.base_url}{path}"
+        deadline_at = time.monotonic() + (deadline or self.timeout)
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        if hedge is None:
+            hedge = self.hedge_after is not None
+        send = self._send_hedged if hedge and idempotent else self._send_once
+
+        self._count("requests")
+        self.budget.deposit()
+        jitter = wait_random_exponential(multiplier=self.backoff, max=self.max_backoff)
+        retrying = Retrying(
+            wait=lambda retry_state: min(jitter(retry_state), max(0, deadline_at - time.monotonic())),
+            retry=lambda retry_state: self._should_retry(retry_state, idempotent, deadline_at)
+        )
+        try:
+            return retrying(send, method, url, deadline_at, kwargs)
+        except _RetryableResponse as e:
+            # Out of retries: hand the last 5xx back to the caller like any other response
+            return e.response
+        except requests.exceptions.RequestException:
+            self._count("errors")
+            raise
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+            latencies = sorted(self._latencies)
+        connections = 0
+        if self._pid == os.getpid():
+            pools = self._adapter.poolmanager.pools
+            connections = sum(pools[key].num_connections for key in pools.keys())
+        counts["connections_opened"] = connections
+        counts["connection_reuse"] = round(1 - connections / counts["attempts"], 3) if counts["attempts"] else None
+        for name, quantile in (("p50_ms", 0.5), ("p90_ms", 0.9), ("p99_ms", 0.99)):
+            counts[name] = round(latencies[int(quantile * (len(latencies) - 1))] * 1000, 2) if latencies else None
+        return counts
@@ -0,0 +1,290 @@
+import bisect
+import logging
+import os
+import threading
+import time
+import redis
+from app import db, db_router
+from models import Competition, Submission
+from queries import submissions_with_counts
+
+# Per-competition ranking of submissions by likes, kept in a Redis sorted set so top-N,
+# rank-of and around-me are all O(log n) instead of scanning the Like table.
+# The routes update it after each commit; if an update is lost (Redis down),
+# rebuild_leaderboard.py recounts from Postgres.
+#
+# Updates only apply to boards that exist. A missing board (never read, flushed or
+# evicted) is rebuilt in full on its next read; creating it from a single update would
+# leave a board with one submission that looks complete. A competition without
+# submissions still gets a board (an empty marker in Redis), so it isn't recounted on
+# every read.
+#
+# Rebuilds recount from the primary. Updates that arrive while the recount runs are
+# buffered alongside the board and added on top when the new board is swapped in, so a
+# like committed after the recount read its table isn't lost. One rebuild per board runs
+# at a time; the marker expires after REBUILD_TIMEOUT in case a worker dies mid-way.
+
+logger = logging.getLogger(__name__)
+
+# `memory://` keeps the boards in process, which is only consistent with a single worker
+LEADERBOARD_URL = os.getenv('LEADERBOARD_REDIS_URL', os.getenv('REDIS_URL', 'redis://redis:6379/0'))
+REBUILD_TIMEOUT = int(os.getenv('LEADERBOARD_REBUILD_TIMEOUT', '60'))
+# How long a read waits for a rebuild running in another worker
+REBUILD_WAIT = float(os.getenv('LEADERBOARD_REBUILD_WAIT', '2'))
+
+
+# KEYS: board, empty marker, rebuilding marker, pending updates, staging board
+
+# ZINCRBY would create the key, so the existence check runs in the same script
+INCREMENT_EXISTING = """
+if redis.call('exists', KEYS[3]) == 1 then
+    redis.call('zincrby', KEYS[4], ARGV[1], ARGV[2])
+end
+if redis.call('exists', KEYS[1]) == 1 or redis.call('exists', KEYS[2]) == 1 then
+    redis.call('del', KEYS[2])
+    return redis.call('zincrby', KEYS[1], ARGV[1], ARGV[2])
+end
+return false
+"""
+
+# Updates buffered by an abandoned rebuild are stale, so a new one starts empty
+BEGIN_REBUILD = """
+if redis.call('set', KEYS[3], 1, 'NX', 'EX', ARGV[1]) then
+    redis.call('del', KEYS[4])
+    return 1
+end
+return 0
+"""
+
+# Moves the staging board in, adds the updates buffered since the rebuild began
+SWAP_REBUILT = """
+redis.call('del', KEYS[1], KEYS[2])
+if redis.call('exists', KEYS[5]) == 1 then
+    redis.call('rename', KEYS[5], KEYS[1])
+end
+local pending = redis.call('zrange', KEYS[4], 0, -1, 'withscores')
+for i = 1, #pending, 2 do
+    redis.call('zincrby', KEYS[1], pending[i + 1], pending[i])
+end
+if redis.call('exists', KEYS[1]) == 0 then
+    redis.call('set', KEYS[2], 1)
+end
+redis.call('del', KEYS[3], KEYS[4])
+"""
+
+
+class RedisLeaderboard:
+    def __init__(self, client, prefix='leaderboard'):
+        self.client = client
+        self.prefix = prefix
+        self._increment = client.register_script(INCREMENT_EXISTING)
+        self._begin_rebuild = client.register_script(BEGIN_REBUILD)
+        self._swap = client.register_script(SWAP_REBUILT)
+
+    def _key(self, competition_id):
+        return f"{self.prefix}:{competition_id}"
+
+    def _keys(self, competition_id):
+        key = self._key(competition_id)
+        return [key, f"{key}:empty", f"{key}:rebuilding", f"{key}:pending", f"{key}:rebuild"]
+
+    def exists(self, competition_id):
+        return bool(self.client.exists(*self._keys(competition_id)[:2]))
+
+    def increment(self, competition_id, submission_id, amount=1):
+        self._increment(keys=self._keys(competition_id), args=[amount, submission_id])
+
+    def remove(self, competition_id, submission_id):
+        self.client.zrem(self._key(competition_id), submission_id)
+
+    def drop(self, competition_id):
+        self.client.delete(*self._keys(competition_id))
+
+    def top(self, competition_id, limit):
+        rows = self.client.zrevrange(self._key(competition_id), 0, limit - 1, withscores=True)
+        return [(member.decode('utf-8'), int(score)) for member, score in rows]
+
+    # 0-based rank and score, or None if the submission isn't ranked
+    def rank(self, competition_id, submission_id):
+        key = self._key(competition_id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zrevrank(key, submission_id)
+        pipe.zscore(key, submission_id)
+        rank, score = pipe.execute()
+        return None if rank is None else (rank, int(score))
+
+    def range(self, competition_id, start, stop):
+        rows = self.client.zrevrange(self._key(competition_id), start, stop, withscores=True)
+        return [(member.decode('utf-8'), int(score)) for member, score in rows]
+
+    # False if another rebuild of the board is running
+    def begin_rebuild(self, competition_id):
+        return bool(self._begin_rebuild(keys=self._keys(competition_id), args=[REBUILD_TIMEOUT]))
+
+    def cancel_rebuild(self, competition_id):
+        self.client.delete(*self._keys(competition_id)[2:])
+
+    # Swap in a freshly built board atomically, so readers never see it half-filled
+    def replace(self, competition_id, scores):
+        keys = self._keys(competition_id)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(keys[4])
+        if scores:
+            pipe.zadd(keys[4], scores)
+        self._swap(keys=keys, client=pipe)
+        pipe.execute()
+
+
+# Same interface in process memory, for tests and for running without Redis. Entries are
+# kept sorted as (-likes, submission_id) so lookups are a bisect.
+class MemoryLeaderboard:
+    def __init__(self):
+        self._boards = {}
+        # competition_id -> updates since its rebuild began
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def exists(self, competition_id):
+        return competition_id in self._boards
+
+    def increment(self, competition_id, submission_id, amount=1):
+        with self._lock:
+            pending = self._pending.get(competition_id)
+            if pending is not None:
+                pending[submission_id] = pending.get(submission_id, 0) + amount
+            if competition_id not in self._boards:
+                return
+            entries, scores = self._boards[competition_id]
+            score = scores.get(submission_id)
+            if score is not None:
+                del entries[bisect.bisect_left(entries, (-score, submission_id))]
+            scores[submission_id] = (score or 0) + amount
+            bisect.insort(entries, (-scores[submission_id], submission_id))
+
+    def remove(self, competition_id, submission_id):
+        with self._lock:
+            entries, scores = self._boards.get(competition_id, ([], {}))
+            score = scores.pop(submission_id, None)
+            if score is not None:
+                del entries[bisect.bisect_left(entries, (-score, submission_id))]
+
+    def drop(self, competition_id):
+        with self._lock:
+            self._boards.pop(competition_id, None)
+            self._pending.pop(competition_id, None)
+
+    def top(self, competition_id, limit):
+        return self.range(competition_id, 0, limit - 1)
+
+    def rank(self, competition_id, submission_id):
+        with self._lock:
+            entries, scores = self._boards.get(competition_id, ([], {}))
+            score = scores.get(submission_id)
+            if score is None:
+                return None
+            return bisect.bisect_left(entries, (-score, submission_id)), score
+
+    def range(self, competition_id, start, stop):
+        with self._lock:
+            entries, _ = self._boards.get(competition_id, ([], {}))
+            return [(submission_id, -negated) for negated, submission_id in entries[start:stop + 1]]
+
+    def begin_rebuild(self, competition_id):
+        with self._lock:
+            if competition_id in self._pending:
+                return False
+            self._pending[competition_id] = {}
+            return True
+
+    def cancel_rebuild(self, competition_id):
+        with self._lock:
+            self._pending.pop(competition_id, None)
+
+    def replace(self, competition_id, scores):
+        with self._lock:
+            scores = dict(scores)
+            for submission_id, amount in self._pending.pop(competition_id, {}).items():
+                scores[submission_id] = scores.get(submission_id, 0) + amount
+            self._boards[competition_id] = (sorted((-score, sid) for sid, score in scores.items()), scores)
+
+
+def create_leaderboard(url):
+    if url.startswith('memory://'):
+        return MemoryLeaderboard()
+    return RedisLeaderboard(redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5))
+
+board = create_leaderboard(LEADERBOARD_URL)
+
+
+# Write-side hooks, called once the change is committed. A failed update is logged rather
+# than failing the request; the board is repaired by the next rebuild.
+def _update(operation, *args):
+    try:
+        operation(*args)
+    except redis.RedisError as e:
+        logger.error(f"Leaderboard update failed: {e}")
+
+def record_submission(submission):
+    _update(board.increment, submission.competition_id, submission.id, 0)
+
+def record_like(submission, count=1):
+    _update(board.increment, submission.competition_id, submission.id, count)
+
+def forget_submission(competition_id, submission_id):
+    _update(board.remove, competition_id, submission_id)
+
+def forget_competition(competition_id):
+    _update(board.drop, competition_id)
+
+# Recovery path: recount likes from Postgres and swap the result in. Returns the number
+# of submissions ranked, or None if another rebuild of the board is already running.
+def rebuild(competition_id):
+    if not board.begin_rebuild(competition_id):
+        return None
+    try:
+        with db_router.primary():
+            rows = submissions_with_counts(Submission.competition_id == competition_id).all()
+    except Exception:
+        board.cancel_rebuild(competition_id)
+        raise
+    board.replace(competition_id, {submission.id: likes for submission, likes, _ in rows})
+    return len(rows)
+
+def _entries(rows, first_rank):
+    return [{"rank": first_rank + i + 1, "submission_id": submission_id, "likes": likes}
+            for i, (submission_id, likes) in enumerate(rows)]
+
+# Missing boards are built from Postgres when read (first read, or after a Redis flush).
+# False if the competition doesn't exist.
+def _ensure(competition_id):
+    if board.exists(competition_id):
+        return True
+    with db_router.primary():
+        if db.session.query(Competition.id).filter_by(id=competition_id).scalar() is None:
+            return False
+    if rebuild(competition_id) is None:
+        deadline = time.time() + REBUILD_WAIT
+        while not board.exists(competition_id) and time.time() < deadline:
+            time.sleep(0.05)
+    return True
+
+# None if the competition doesn't exist
+def top(competition_id, limit):
+    if not _ensure(competition_id):
+        return None
+    return _entries(board.top(competition_id, limit), 0)
+
+def standing(competition_id, submission_id, radius):
+    if not _ensure(competition_id):
+        return None
+    ranked = board.rank(competition_id, submission_id)
+    if ranked is None:
+        return None
+    rank, likes = ranked
+    start = max(0, rank - radius)
+    return {
+        "submission_id": submission_id,
+        "rank": rank + 1,
+        "likes": likes,
+        "around": _entries(board.range(competition_id, start, rank + radius), start)
+    }
@@ -0,0 +1,175 @@
+import atexit
+import logging
+import os
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+from flask import current_app
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import load_only
+from app import db, cache
+from models import Submission, Like
+import counters
+import leaderboard
+import rollups
+
+# Write-behind ingestion for likes. The route only records (user_id, submission_id) in this
+# process and answers 202; a background thread writes the pending likes as one multi-row
+# INSERT per batch, once LIKE_BUFFER_BATCH_SIZE are waiting or every LIKE_BUFFER_INTERVAL
+# seconds. Repeated clicks collapse in the buffer, and the unique constraint on Like drops
+# the ones that were already stored, so a like is counted at most once.
+#
+# Pending likes live in worker memory: a worker that is killed outright loses at most one
+# interval's worth. Normal shutdown flushes them (atexit).
+
+logger = logging.getLogger(__name__)
+
+
+# Inserts the rows, skipping (user_id, submission_id) pairs that already exist, and returns
+# (submission_id, created_at) for every row actually inserted
+def _insert_new(rows):
+    table = Like.__table__
+    if db.engine.dialect.name == 'postgresql':
+        statement = (pg_insert(table).values(rows)
+                     .on_conflict_do_nothing(index_elements=['submission_id', 'user_id'])
+                     .returning(table.c.submission_id, table.c.created_at))
+        return [(submission_id, created_at) for submission_id, created_at in db.session.execute(statement)]
+
+    # Other databases (SQLite in development): filter out stored pairs first
+    existing = set(db.session.query(Like.user_id, Like.submission_id).filter(
+        Like.user_id.in_({row["user_id"] for row in rows}),
+        Like.submission_id.in_({row["submission_id"] for row in rows})
+    ))
+    rows = [row for row in rows if (row["user_id"], row["submission_id"]) not in existing]
+    if rows:
+        db.session.execute(table.insert().prefix_with('OR IGNORE', dialect='sqlite').values(rows))
+    return [(row["submission_id"], row["created_at"]) for row in rows]
+
+# Writes one batch of {(user_id, submission_id): liked_at} in a single transaction and
+# returns the number of new likes
+def write_likes(batch):
+    submissions = {submission.id: submission for submission in Submission.query
+                   .options(load_only('id', 'competition_id', 'user_id'))
+                   .filter(Submission.id.in_({submission_id for _, submission_id in batch}))}
+    # Likes on submissions deleted in the meantime are dropped
+    rows = [{"id": str(uuid.uuid4()), "user_id": user_id, "submission_id": submission_id, "created_at": liked_at}
+            for (user_id, submission_id), liked_at in batch.items() if submission_id in submissions]
+    if not rows:
+        return 0
+
+    inserted = _insert_new(rows)
+    liked = Counter(submission_id for submission_id, _ in inserted)
+    # One counter update per submission, however many likes it got
+    for submission_id, count in liked.items():
+        counters.record_like(submissions[submission_id], count)
+    deltas = rollups.Deltas()
+    for submission_id, liked_at in inserted:
+        submission = submissions[submission_id]
+        deltas.add(submission.competition_id, submission_id, submission.user_id, 'likes', liked_at)
+    deltas.apply()
+    db.session.commit()
+
+    for submission_id, count in liked.items():
+        submission = submissions[submission_id]
+        cache.invalidate(f"competition:{submission.competition_id}", f"submission:{submission_id}")
+        leaderboard.record_like(submission, count)
+    return sum(liked.values())
+
+
+class LikeBuffer:
+    def __init__(self, batch_size=500, interval=0.5, max_pending=20000):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending = {}
+        self._condition = threading.Condition()
+        self._flusher_pid = None
+        self.stats = {
+            "accepted": 0,
+            "duplicates": 0,
+            "rejected": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "inserted": 0
+        }
+
+    # Returns False when too many likes are waiting (the database is falling behind)
+    def add(self, user_id, submission_id):
+        self._ensure_flusher()
+        key = (user_id, submission_id)
+        with self._condition:
+            if key in self._pending:
+                self.stats["duplicates"] += 1
+                return True
+            if len(self._pending) >= self.max_pending:
+                self.stats["rejected"] += 1
+                return False
+            self._pending[key] = datetime.utcnow()
+            self.stats["accepted"] += 1
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+        return True
+
+    def pending(self):
+        return len(self._pending)
+
+    def _take(self):
+        with self._condition:
+            keys = list(islice(self._pending, self.batch_size))
+            return {key: self._pending.pop(key) for key in keys}
+
+    def _restore(self, batch):
+        with self._condition:
+            for key, liked_at in batch.items():
+                self._pending.setdefault(key, liked_at)
+
+    # Writes everything pending, one batch per transaction. Needs an app context.
+    def flush(self):
+        inserted = 0
+        while True:
+            batch = self._take()
+            if not batch:
+                return inserted
+            try:
+                count = write_likes(batch)
+            except Exception as e:
+                db.session.rollback()
+                self._restore(batch)
+                self.stats["failed_flushes"] += 1
+                logger.error(f"Like flush failed, retrying next interval: {e}")
+                return inserted
+            self.stats["flushes"] += 1
+            self.stats["inserted"] += count
+            inserted += count
+
+    def _run(self, app):
+        while True:
+            with self._condition:
+                if len(self._pending) < self.batch_size:
+                    self._condition.wait(self.interval)
+            with app.app_context():
+                self.flush()
+
+    def _flush_on_exit(self, app):
+        with app.app_context():
+            self.flush()
+
+    # Started on first use so each gunicorn worker gets its own flusher
+    def _ensure_flusher(self):
+        if self._flusher_pid == os.getpid():
+            return
+        with self._condition:
+            if self._flusher_pid != os.getpid():
+                app = current_app._get_current_object()
+                threading.Thread(target=self._run, args=(app,), daemon=True).start()
+                atexit.register(self._flush_on_exit, app)
+                self._flusher_pid = os.getpid()
+
+
+like_buffer = LikeBuffer(
+    batch_size=int(os.getenv('LIKE_BUFFER_BATCH_SIZE', '500')),
+    interval=float(os.getenv('LIKE_BUFFER_INTERVAL', '0.5')),
+    max_pending=int(os.getenv('LIKE_BUFFER_MAX_PENDING', '20000'))
+)
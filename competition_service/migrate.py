@@ -1,8 +1,9 @@
-from app import create_app, db
-from models import Competition, Submission, Like, Comment
+from flask_migrate import upgrade
+from app import create_app
 
-app = create_app()
+app = create_app(migrations=True)
 
+# Applies every pending revision in migrations/versions
 with app.app_context():
-    db.create_all()
-    print("Database tables created successfully.")
\ No newline at end of file
+    upgrade()
+    print("Database migrated successfully.")
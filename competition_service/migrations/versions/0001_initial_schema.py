@@ -0,0 +1,126 @@
+"""Initial competition schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+Databases created earlier with `db.create_all()` are brought to the same state instead of
+being recreated: missing columns are added, key columns that were declared Integer
+become VARCHAR(36), like the UUID keys they reference, and missing unique constraints
+are added once the duplicate rows they would reject are removed (the oldest id is kept).
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# name -> columns, per table
+UNIQUE_CONSTRAINTS = {
+    'like': {'uq_like_submission_user': ('submission_id', 'user_id')},
+}
+
+
+def _counter(name):
+    return sa.Column(name, sa.Integer(), server_default='0', nullable=False)
+
+def _competition():
+    return [
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=False),
+        sa.Column('admin_id', sa.String(length=36), nullable=False),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('end_date', sa.Date(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        _counter('submissions_count'),
+        _counter('likes_count'),
+        _counter('comments_count'),
+        sa.PrimaryKeyConstraint('id')
+    ]
+
+def _submission():
+    return [
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('competition_id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        _counter('likes_count'),
+        _counter('comments_count'),
+        sa.ForeignKeyConstraint(['competition_id'], ['competition.id']),
+        sa.PrimaryKeyConstraint('id')
+    ]
+
+def _like():
+    return [
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('submission_id', sa.String(length=36), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['submission_id'], ['submission.id']),
+        sa.PrimaryKeyConstraint('id'),
+        *[sa.UniqueConstraint(*columns, name=name) for name, columns in UNIQUE_CONSTRAINTS['like'].items()]
+    ]
+
+def _comment():
+    return [
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('submission_id', sa.String(length=36), nullable=False),
+        sa.Column('parent_comment_id', sa.String(length=36), nullable=True),
+        sa.ForeignKeyConstraint(['parent_comment_id'], ['comment.id']),
+        sa.ForeignKeyConstraint(['submission_id'], ['submission.id']),
+        sa.PrimaryKeyConstraint('id')
+    ]
+
+TABLES = [('competition', _competition), ('submission', _submission), ('like', _like), ('comment', _comment)]
+
+
+def _bring_up_to_date(inspector, table, columns):
+    existing = {column['name']: column['type'] for column in inspector.get_columns(table)}
+    for column in columns:
+        if not isinstance(column, sa.Column):
+            continue
+        if column.name not in existing:
+            op.add_column(table, column)
+        elif isinstance(column.type, sa.String) and not isinstance(existing[column.name], sa.String):
+            # SQLite doesn't enforce column types, only Postgres needs the conversion
+            if op.get_bind().dialect.name == 'postgresql':
+                op.alter_column(table, column.name, type_=column.type, existing_type=existing[column.name],
+                                postgresql_using=f'{column.name}::varchar(36)')
+
+    present = {constraint['name'] for constraint in inspector.get_unique_constraints(table)}
+    for name, columns in UNIQUE_CONSTRAINTS.get(table, {}).items():
+        if name in present:
+            continue
+        rows = sa.table(table, sa.column('id'), *[sa.column(column) for column in columns])
+        keep = sa.select([sa.func.min(rows.c.id)]).group_by(*[rows.c[column] for column in columns])
+        op.execute(rows.delete().where(rows.c.id.notin_(keep)))
+        # SQLite can only add constraints by rebuilding the table, which batch mode does
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.create_unique_constraint(name, list(columns))
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for name, definition in TABLES:
+        if name in tables:
+            _bring_up_to_date(inspector, name, definition())
+        else:
+            op.create_table(name, *definition())
+
+
+def downgrade():
+    for name, _ in reversed(TABLES):
+        op.drop_table(name)
@@ -0,0 +1,51 @@
+"""Indexes for the filters the routes run
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:30:00.000000
+
+On Postgres the indexes are built CONCURRENTLY, so a live database stays writable, and the
+submission index carries the list fields as INCLUDE columns so a projected page
+(`fields=` without content) is answered from the index alone.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+# name, table, key columns, INCLUDE columns (Postgres only)
+INDEXES = [
+    # GET /competitions keyset pages
+    ('ix_competition_created_at_id', 'competition', ['created_at', 'id'], []),
+    # GET /competitions/<id> pages, leaderboard rebuilds, counter reconciliation
+    ('ix_submission_competition_created', 'submission', ['competition_id', 'created_at', 'id'],
+     ['title', 'user_id', 'likes_count', 'comments_count']),
+    # Comment tree pages, reply lookups and per-submission comment counts
+    ('ix_comment_thread', 'comment', ['submission_id', 'parent_comment_id', 'created_at', 'id'], []),
+]
+# Per-submission like counts use uq_like_submission_user, which leads with submission_id
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        for name, table, columns, _ in INDEXES:
+            op.create_index(name, table, columns)
+        return
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, include in INDEXES:
+            include_clause = f" INCLUDE ({', '.join(include)})" if include else ''
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON "{table}" ({", ".join(columns)}){include_clause}')
+        op.execute('ANALYZE competition, submission, "like", comment')
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
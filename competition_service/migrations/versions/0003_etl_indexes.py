@@ -0,0 +1,42 @@
+"""Indexes for incremental ETL extraction
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 18:00:00.000000
+
+The warehouse ETL (etl/ at the repository root) reads each table in (created_at, id) order
+from its last watermark, so a run with nothing new is a single index probe per table
+instead of a scan. competition already has ix_competition_created_at_id.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_submission_created_at_id', 'submission'),
+    ('ix_like_created_at_id', 'like'),
+    ('ix_comment_created_at_id', 'comment'),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        for name, table in INDEXES:
+            op.create_index(name, table, ['created_at', 'id'])
+        return
+
+    with op.get_context().autocommit_block():
+        for name, table in INDEXES:
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON "{table}" (created_at, id)')
+
+
+def downgrade():
+    for name, table in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,50 @@
+"""Activity rollups for competition stats
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 19:00:00.000000
+
+Creates the rollup tables empty; fill them for existing competitions with
+`python backfill_rollups.py`.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def _metrics():
+    return [sa.Column(name, sa.Integer(), server_default='0', nullable=False)
+            for name in ('submissions', 'likes', 'comments')]
+
+
+def upgrade():
+    op.create_table(
+        'activity_rollup',
+        sa.Column('competition_id', sa.String(length=36), nullable=False),
+        sa.Column('submission_id', sa.String(length=36), nullable=False),
+        sa.Column('granularity', sa.String(length=4), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        *_metrics(),
+        sa.PrimaryKeyConstraint('competition_id', 'submission_id', 'granularity', 'bucket_start')
+    )
+    op.create_table(
+        'submitter_rollup',
+        sa.Column('competition_id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        *_metrics(),
+        sa.PrimaryKeyConstraint('competition_id', 'user_id')
+    )
+    op.create_index('ix_submitter_rollup_top', 'submitter_rollup', ['competition_id', 'likes', 'submissions'])
+
+
+def downgrade():
+    op.drop_index('ix_submitter_rollup_top', table_name='submitter_rollup')
+    op.drop_table('submitter_rollup')
+    op.drop_table('activity_rollup')
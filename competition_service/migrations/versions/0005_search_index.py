@@ -0,0 +1,53 @@
+"""Full-text search index
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 20:00:00.000000
+
+Creates search_document (see search.py) and fills it from the existing submissions and
+competitions. On Postgres the indexes are built after the fill, which is faster than
+maintaining them row by row; nothing reads the new table until the release that uses it.
+
+"""
+import os
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+# The text search configuration search.py uses; changing it later means rebuilding the index
+LANGUAGE = os.getenv('SEARCH_LANGUAGE', 'english')
+
+
+def _vector(title, body):
+    return (f"setweight(to_tsvector('{LANGUAGE}', coalesce({title}, '')), 'A') || "
+            f"setweight(to_tsvector('{LANGUAGE}', coalesce({body}, '')), 'B')")
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        op.execute("CREATE VIRTUAL TABLE search_document USING fts5("
+                   "kind UNINDEXED, doc_id UNINDEXED, competition_id UNINDEXED, title, body, "
+                   "tokenize='porter unicode61')")
+        op.execute("INSERT INTO search_document (kind, doc_id, competition_id, title, body) "
+                   "SELECT 'competition', id, id, title, description FROM competition")
+        op.execute("INSERT INTO search_document (kind, doc_id, competition_id, title, body) "
+                   "SELECT 'submission', id, competition_id, title, content FROM submission")
+        return
+
+    op.execute("CREATE TABLE search_document (kind VARCHAR(16) NOT NULL, doc_id VARCHAR(36) NOT NULL, "
+               "competition_id VARCHAR(36) NOT NULL, vector TSVECTOR NOT NULL, PRIMARY KEY (kind, doc_id))")
+    op.execute(f"INSERT INTO search_document (kind, doc_id, competition_id, vector) "
+               f"SELECT 'competition', id, id, {_vector('title', 'description')} FROM competition")
+    op.execute(f"INSERT INTO search_document (kind, doc_id, competition_id, vector) "
+               f"SELECT 'submission', id, competition_id, {_vector('title', 'content')} FROM submission")
+    op.execute("CREATE INDEX ix_search_document_vector ON search_document USING GIN (vector)")
+    op.execute("CREATE INDEX ix_search_document_competition ON search_document (competition_id)")
+
+
+def downgrade():
+    op.execute("DROP TABLE search_document")
@@ -0,0 +1,32 @@
+"""Version counters for conditional GETs
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 21:00:00.000000
+
+Adds competition.version and submission.version (see conditional.py). A constant default
+makes this a catalog-only change on Postgres 11+, without rewriting either table.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+TABLES = ('competition', 'submission')
+
+
+def upgrade():
+    for table in TABLES:
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('version')
@@ -0,0 +1,83 @@
+"""Submission excerpts and content lengths
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 22:00:00.000000
+
+Adds submission.excerpt and submission.content_length, so lists no longer read the
+content column, and fills them in for existing submissions BATCH_SIZE rows at a time. On
+Postgres each batch commits on its own, so no long transaction holds every row. Lengths
+are computed in SQL and only a PREFIX_LENGTH prefix of each entry is read, so a batch of
+long entries stays small.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+EXCERPT_LENGTH = 280
+# Enough for the excerpt unless whitespace collapses most of it; those entries are read whole
+PREFIX_LENGTH = 4 * EXCERPT_LENGTH
+
+submission = sa.table('submission', sa.column('id'), sa.column('content'), sa.column('excerpt'),
+                      sa.column('content_length'))
+
+
+# As models.make_excerpt at the time of this revision
+def make_excerpt(content, length=EXCERPT_LENGTH):
+    text = ' '.join(content.split())
+    if len(text) <= length:
+        return text
+    cut = text[:length]
+    if ' ' in cut:
+        cut = cut.rsplit(' ', 1)[0]
+    return cut + '...'
+
+
+def _backfill(bind):
+    update = (submission.update().where(submission.c.id == sa.bindparam('submission_id'))
+              .values(excerpt=sa.bindparam('new_excerpt'), content_length=sa.bindparam('new_length')))
+    last_id = ''
+    while True:
+        rows = bind.execute(sa.select([submission.c.id,
+                                       sa.func.substr(submission.c.content, 1, PREFIX_LENGTH),
+                                       sa.func.length(submission.c.content)])
+                            .where(submission.c.id > last_id)
+                            .order_by(submission.c.id)
+                            .limit(BATCH_SIZE)).fetchall()
+        if not rows:
+            return
+        values = []
+        for id, prefix, length in rows:
+            prefix, length = prefix or '', length or 0
+            # The excerpt only depends on the first EXCERPT_LENGTH characters once
+            # whitespace is collapsed, and on whether there are more
+            if length > PREFIX_LENGTH and len(' '.join(prefix.split())) <= EXCERPT_LENGTH:
+                prefix = bind.execute(sa.select([submission.c.content]).where(submission.c.id == id)).scalar()
+            values.append({"submission_id": id, "new_excerpt": make_excerpt(prefix), "new_length": length})
+        bind.execute(update, values)
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    op.add_column('submission', sa.Column('excerpt', sa.String(length=EXCERPT_LENGTH + 3), server_default='',
+                                          nullable=False))
+    op.add_column('submission', sa.Column('content_length', sa.Integer(), server_default='0', nullable=False))
+    if op.get_bind().dialect.name != 'postgresql':
+        _backfill(op.get_bind())
+        return
+    with op.get_context().autocommit_block():
+        _backfill(op.get_bind())
+
+
+def downgrade():
+    with op.batch_alter_table('submission') as batch_op:
+        batch_op.drop_column('content_length')
+        batch_op.drop_column('excerpt')
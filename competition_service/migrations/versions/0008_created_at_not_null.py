@@ -0,0 +1,38 @@
+"""Require created_at on paged tables
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 23:00:00.000000
+
+Submissions, likes and comments are paged on (created_at, id). A NULL created_at
+compares as unknown, so such a row was skipped by every cursor. Rows without one get
+the migration time, which also makes the warehouse ETL pick them up on its next run.
+The columns are then made NOT NULL, as competition.created_at already is.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+TABLES = ('submission', 'like', 'comment')
+
+
+def upgrade():
+    for table in TABLES:
+        created_at = sa.table(table, sa.column('created_at', sa.DateTime()))
+        op.execute(created_at.update().where(created_at.c.created_at.is_(None))
+                   .values(created_at=sa.func.current_timestamp()))
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
@@ -2,9 +2,12 @@ from app import db
 import uuid
 from datetime import datetime
 from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship, validates
 
 class Competition(db.Model):
+    # Keyset pagination of GET /competitions
+    __table_args__ = (db.Index('ix_competition_created_at_id', 'created_at', 'id'),)
+
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()), nullable=False)
     title = db.Column(String(255), nullable=False)
     description = db.Column(Text, nullable=False)
@@ -12,39 +15,120 @@ class Competition(db.Model):
     start_date = db.Column(Date, nullable=False)
     end_date = db.Column(Date, nullable=False)
     created_at = db.Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Denormalized counters, kept in step by the write routes (see counters.py)
+    submissions_count = db.Column(Integer, default=0, server_default='0', nullable=False)
+    likes_count = db.Column(Integer, default=0, server_default='0', nullable=False)
+    comments_count = db.Column(Integer, default=0, server_default='0', nullable=False)
+    # Bumped with every counter update, so it changes whenever GET /competitions/<id> would
+    # (see conditional.py)
+    version = db.Column(Integer, default=1, server_default='1', nullable=False)
 
     def __repr__(self):
         return f"<Competition {self.title}>"
 
 
+EXCERPT_LENGTH = 280
+
+# The start of the text with whitespace collapsed, cut at a word boundary
+def make_excerpt(content, length=EXCERPT_LENGTH):
+    text = ' '.join(content.split())
+    if len(text) <= length:
+        return text
+    cut = text[:length]
+    if ' ' in cut:
+        cut = cut.rsplit(' ', 1)[0]
+    return cut + '...'
+
+
 class Submission(db.Model):
+    # A competition's submissions, newest first; the migration adds the counters and
+    # list fields as INCLUDE columns on Postgres
+    __table_args__ = (
+        db.Index('ix_submission_competition_created', 'competition_id', 'created_at', 'id'),
+        # Incremental warehouse extraction (etl/)
+        db.Index('ix_submission_created_at_id', 'created_at', 'id'),
+    )
+
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()), nullable=False)
     title = db.Column(String(255), nullable=False)
-    content = db.Column(Text, nullable=False)
-    created_at = db.Column(DateTime, default=datetime.utcnow)
-    competition_id = db.Column(Integer, ForeignKey('competition.id'), nullable=False)
+    # Entries can run to hundreds of KB, so the text is only loaded when asked for
+    # (queries.iter_submission_content); lists show the excerpt, set with content_length
+    # whenever the content is
+    content = deferred(db.Column(Text, nullable=False))
+    excerpt = db.Column(String(EXCERPT_LENGTH + 3), default='', server_default='', nullable=False)
+    content_length = db.Column(Integer, default=0, server_default='0', nullable=False)
+    created_at = db.Column(DateTime, default=datetime.utcnow, nullable=False)
+    competition_id = db.Column(String(36), ForeignKey('competition.id'), nullable=False)
     user_id = db.Column(String(36), nullable=False)
+    likes_count = db.Column(Integer, default=0, server_default='0', nullable=False)
+    comments_count = db.Column(Integer, default=0, server_default='0', nullable=False)
+    # Bumped with every counter update; the ETag of GET /submissions/<id>
+    version = db.Column(Integer, default=1, server_default='1', nullable=False)
+
+    @validates('content')
+    def _summarize(self, key, content):
+        self.excerpt = make_excerpt(content)
+        self.content_length = len(content)
+        return content
 
     def __repr__(self):
         return f"<Submission {self.title}>"
 
 class Like(db.Model):
+    # One like per user per submission; the like buffer relies on it to drop duplicates.
+    # submission_id leads so the same index serves the per-submission like counts.
+    __table_args__ = (
+        db.UniqueConstraint('submission_id', 'user_id', name='uq_like_submission_user'),
+        db.Index('ix_like_created_at_id', 'created_at', 'id'),
+    )
+
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()), nullable=False)
     user_id = db.Column(String(36), nullable=False)
-    submission_id = db.Column(Integer, ForeignKey('submission.id'), nullable=False)
-    created_at = db.Column(DateTime, default=datetime.utcnow)
+    submission_id = db.Column(String(36), ForeignKey('submission.id'), nullable=False)
+    created_at = db.Column(DateTime, default=datetime.utcnow, nullable=False)
 
     def __repr__(self):
         return f"<Like by {self.user_id} on {self.submission_id}>"
 
 
 class Comment(db.Model):
+    # Serves comment pages and the reply lookups of the comment tree query
+    __table_args__ = (
+        db.Index('ix_comment_thread', 'submission_id', 'parent_comment_id', 'created_at', 'id'),
+        db.Index('ix_comment_created_at_id', 'created_at', 'id'),
+    )
+
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()), nullable=False)
     content = db.Column(Text, nullable=False)
-    created_at = db.Column(DateTime, default=datetime.utcnow)
+    created_at = db.Column(DateTime, default=datetime.utcnow, nullable=False)
     user_id = db.Column(String(36), nullable=False)
-    submission_id = db.Column(Integer, ForeignKey('submission.id'), nullable=False)
-    parent_comment_id = db.Column(Integer, ForeignKey('comment.id'), nullable=True)
+    submission_id = db.Column(String(36), ForeignKey('submission.id'), nullable=False)
+    parent_comment_id = db.Column(String(36), ForeignKey('comment.id'), nullable=True)
 
     def __repr__(self):
-        return f"<Comment by {self.user_id} on {self.submission_id}>"
\ No newline at end of file
+        return f"<Comment by {self.user_id} on {self.submission_id}>"
+
+# Pre-aggregated activity for GET /competitions/<id>/stats (see rollups.py). One row per
+# competition (submission_id '') or submission, per hour or day bucket.
+class ActivityRollup(db.Model):
+    __tablename__ = 'activity_rollup'
+
+    competition_id = db.Column(String(36), primary_key=True)
+    submission_id = db.Column(String(36), primary_key=True, default='')
+    granularity = db.Column(String(4), primary_key=True)
+    bucket_start = db.Column(DateTime, primary_key=True)
+    submissions = db.Column(Integer, default=0, server_default='0', nullable=False)
+    likes = db.Column(Integer, default=0, server_default='0', nullable=False)
+    comments = db.Column(Integer, default=0, server_default='0', nullable=False)
+
+
+# Running totals per submitter in a competition, for the top submitters list
+class SubmitterRollup(db.Model):
+    __tablename__ = 'submitter_rollup'
+    __table_args__ = (db.Index('ix_submitter_rollup_top', 'competition_id', 'likes', 'submissions'),)
+
+    competition_id = db.Column(String(36), primary_key=True)
+    user_id = db.Column(String(36), primary_key=True)
+    submissions = db.Column(Integer, default=0, server_default='0', nullable=False)
+    likes = db.Column(Integer, default=0, server_default='0', nullable=False)
+    comments = db.Column(Integer, default=0, server_default='0', nullable=False)
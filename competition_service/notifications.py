@@ -0,0 +1,29 @@
+import json
+import logging
+import os
+import redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://redis:6379/0')
+# Every notification process (websocket_server.py) subscribes to this channel
+NOTIFICATIONS_CHANNEL = 'notifications:competitions'
+
+redis_client = redis.Redis.from_url(REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+
+def new_submission_message(data):
+    return json.dumps({"message": "New submission received", "data": data})
+
+# Called from Flask request threads: one PUBLISH to Redis, the notification processes do
+# the fan-out to subscribers
+def publish_submission(competition_id, submission):
+    data = {
+        "action": "new_submission",
+        "competition_id": competition_id,
+        "submission": submission
+    }
+    try:
+        redis_client.publish(NOTIFICATIONS_CHANNEL, json.dumps(data))
+    except redis.RedisError as e:
+        logger.error(f"WebSocket notification failed: {e}")
@@ -0,0 +1,235 @@
+import base64
+import datetime
+import json
+from sqlalchemy import case, func, literal, select, tuple_
+from sqlalchemy.orm import load_only
+from app import db
+from models import Competition, Submission, Like, Comment
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+DEFAULT_COMMENT_DEPTH = 3
+MAX_COMMENT_DEPTH = 10
+# Replies expanded under each comment of the tree; the rest are paged with parent_id
+REPLIES_PER_COMMENT = 3
+
+# Response field -> model column, for the `fields=` projection on list endpoints
+COMPETITION_FIELDS = {
+    "competition_id": "id",
+    "title": "title",
+    "description": "description",
+    "start_date": "start_date",
+    "end_date": "end_date"
+}
+
+# The full content is only served by GET /submissions/<id>
+SUBMISSION_FIELDS = {
+    "submission_id": "id",
+    "title": "title",
+    "excerpt": "excerpt",
+    "content_length": "content_length",
+    "created_at": "created_at",
+    "user_id": "user_id",
+    "likes_count": "likes_count",
+    "comments_count": "comments_count"
+}
+
+
+# Likes/comments grouped per submission, limited to the submissions matched by `criterion`
+def _counts_by_submission(model, criterion):
+    return (db.session.query(model.submission_id.label('submission_id'),
+                             func.count().label('total'))
+            .join(Submission, Submission.id == model.submission_id)
+            .filter(criterion)
+            .group_by(model.submission_id)
+            .subquery())
+
+
+# One query returning (submission, likes_count, comments_count) rows counted from the
+# Like/Comment tables. Reads use the denormalized counters; this is the source of truth
+# the reconcile job compares them against.
+def submissions_with_counts(criterion):
+    likes = _counts_by_submission(Like, criterion)
+    comments = _counts_by_submission(Comment, criterion)
+    return (db.session.query(Submission,
+                             func.coalesce(likes.c.total, 0),
+                             func.coalesce(comments.c.total, 0))
+            .outerjoin(likes, likes.c.submission_id == Submission.id)
+            .outerjoin(comments, comments.c.submission_id == Submission.id)
+            .filter(criterion))
+
+
+# Cursors are opaque to clients: base64 of the (created_at, id) of the last row served
+def encode_cursor(row):
+    raw = json.dumps([row.created_at.isoformat(), row.id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        created_at, id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.datetime.fromisoformat(created_at), id
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+def parse_limit(raw):
+    if raw is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise ValueError("Invalid limit")
+    if limit < 1:
+        raise ValueError("Invalid limit")
+    return min(limit, MAX_PAGE_SIZE)
+
+def parse_fields(raw, field_map):
+    if not raw:
+        return list(field_map)
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = sorted(set(fields) - set(field_map))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+def serialize(obj, field_map, fields):
+    result = {}
+    for field in fields:
+        value = getattr(obj, field_map[field])
+        # Calendar dates go out as ISO strings; datetimes are left to jsonify
+        if isinstance(value, datetime.date) and not isinstance(value, datetime.datetime):
+            value = value.isoformat()
+        result[field] = value
+    return result
+
+# Newest first, resuming strictly after the cursor row. Only the projected columns
+# (plus the keyset columns) are loaded, so dropped Text columns never leave Postgres.
+def keyset_page(query, model, field_map, fields, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    columns = {field_map[field] for field in fields} | {'id', 'created_at'}
+    query = query.options(load_only(*columns)).order_by(model.created_at.desc(), model.id.desc())
+    if cursor:
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(*decode_cursor(cursor)))
+    rows = query.limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def get_competitions(fields, cursor=None, limit=DEFAULT_PAGE_SIZE, active_only=True):
+    query = Competition.query
+    if active_only:
+        today = datetime.datetime.utcnow().date()
+        query = query.filter(Competition.start_date <= today, Competition.end_date >= today)
+    return keyset_page(query, Competition, COMPETITION_FIELDS, fields, cursor, limit)
+
+def get_competition_submissions(competition_id, fields, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    query = Submission.query.filter_by(competition_id=competition_id)
+    return keyset_page(query, Submission, SUBMISSION_FIELDS, fields, cursor, limit)
+
+
+def get_submission(submission_id):
+    return Submission.query.get(submission_id)
+
+# The text of one submission in pieces of `chunk_size` characters, one query each, so
+# a large entry never has to be held whole
+def iter_submission_content(submission_id, chunk_size):
+    start = 1
+    while True:
+        chunk = db.session.query(func.substr(Submission.content, start, chunk_size)) \
+            .filter(Submission.id == submission_id).scalar()
+        if chunk:
+            yield chunk
+        if not chunk or len(chunk) < chunk_size:
+            return
+        start += chunk_size
+
+# Only the version column, for conditional GETs: a primary key lookup on the one row
+def get_version(model, id):
+    return db.session.query(model.version).filter(model.id == id).scalar()
+
+
+def parse_depth(raw):
+    if raw is None:
+        return DEFAULT_COMMENT_DEPTH
+    if not raw.isdigit() or int(raw) > MAX_COMMENT_DEPTH:
+        raise ValueError("Invalid depth")
+    return int(raw)
+
+# A page of comments (top-level, or the replies to `parent_id`), oldest first, with the
+# first REPLIES_PER_COMMENT replies of each down to `depth` levels, all in one recursive
+# query. Every comment carries its number of direct replies; one with more than were
+# expanded also carries a replies_cursor, to fetch the rest with parent_id.
+#
+# The recursion walks siblings one at a time: each step moves from a comment to its
+# first reply, or to its next sibling while under the cap, both single index seeks on
+# ix_comment_thread. A comment with 50k replies costs the same as one with three.
+def get_comment_tree(submission_id, parent_id=None, cursor=None, limit=DEFAULT_PAGE_SIZE, depth=DEFAULT_COMMENT_DEPTH):
+    comment = Comment.__table__
+    page = (select([comment.c.id, comment.c.parent_comment_id, comment.c.content, comment.c.user_id,
+                    comment.c.created_at,
+                    func.row_number().over(order_by=(comment.c.created_at, comment.c.id)).label('position')])
+            .where(comment.c.submission_id == submission_id)
+            .where(comment.c.parent_comment_id == parent_id))
+    if cursor:
+        page = page.where(tuple_(comment.c.created_at, comment.c.id) > tuple_(*decode_cursor(cursor)))
+    # One row past the page tells whether there is a next one; its replies are not expanded
+    page = page.order_by(comment.c.created_at, comment.c.id).limit(limit + 1).alias('page')
+
+    tree = select([page, literal(0).label('depth'), literal(0).label('sibling')]).cte('comment_tree', recursive=True)
+    first_reply = comment.alias('first_reply')
+    first_reply = (select([first_reply.c.id])
+                   .where(first_reply.c.submission_id == submission_id)
+                   .where(first_reply.c.parent_comment_id == tree.c.id)
+                   .where(tree.c.depth < depth)
+                   .where(tree.c.position <= limit)
+                   .order_by(first_reply.c.created_at, first_reply.c.id)
+                   .limit(1).as_scalar())
+    next_sibling = comment.alias('next_sibling')
+    next_sibling = (select([next_sibling.c.id])
+                    .where(next_sibling.c.submission_id == submission_id)
+                    .where(next_sibling.c.parent_comment_id == tree.c.parent_comment_id)
+                    .where(tuple_(next_sibling.c.created_at, next_sibling.c.id) > tuple_(tree.c.created_at, tree.c.id))
+                    .where(tree.c.depth > 0)
+                    .where(tree.c.sibling < REPLIES_PER_COMMENT)
+                    .order_by(next_sibling.c.created_at, next_sibling.c.id)
+                    .limit(1).as_scalar())
+    reply = comment.alias('reply')
+    is_child = reply.c.parent_comment_id == tree.c.id
+    tree = tree.union_all(
+        select([reply.c.id, reply.c.parent_comment_id, reply.c.content, reply.c.user_id, reply.c.created_at,
+                tree.c.position,
+                case([(is_child, tree.c.depth + 1)], else_=tree.c.depth),
+                case([(is_child, 1)], else_=tree.c.sibling + 1)])
+        .where(reply.c.id.in_([first_reply, next_sibling]))
+    )
+    child = comment.alias('child')
+    reply_count = (select([func.count(child.c.id)])
+                   .where(child.c.submission_id == submission_id)
+                   .where(child.c.parent_comment_id == tree.c.id)
+                   .as_scalar())
+    rows = db.session.execute(
+        select([tree, reply_count.label('reply_count')]).order_by(tree.c.depth, tree.c.created_at, tree.c.id)
+    ).fetchall()
+
+    comments, nodes, last, has_more = [], {}, None, False
+    for row in rows:
+        if row.position > limit:
+            has_more = True
+            continue
+        node = {
+            "comment_id": row.id,
+            "user_id": row.user_id,
+            "content": row.content,
+            "created_at": row.created_at,
+            "reply_count": row.reply_count,
+            "replies": []
+        }
+        nodes[row.id] = node
+        if row.depth == 0:
+            comments.append(node)
+            last = row
+        else:
+            parent = nodes[row.parent_comment_id]
+            parent["replies"].append(node)
+            if len(parent["replies"]) < parent["reply_count"]:
+                parent["replies_cursor"] = encode_cursor(row)
+            else:
+                parent.pop("replies_cursor", None)
+    return comments, encode_cursor(last) if has_more else None
@@ -0,0 +1,16 @@
+import sys
+from app import create_app
+from models import Competition
+import leaderboard
+
+app = create_app()
+
+# Usage: python rebuild_leaderboard.py [competition_id ...]   (all competitions by default)
+with app.app_context():
+    competition_ids = sys.argv[1:] or [competition_id for competition_id, in Competition.query.with_entities(Competition.id)]
+    for competition_id in competition_ids:
+        ranked = leaderboard.rebuild(competition_id)
+        if ranked is None:
+            print(f"Leaderboard for {competition_id} is already being rebuilt.")
+        else:
+            print(f"Leaderboard for {competition_id} rebuilt: {ranked} submissions ranked.")
@@ -0,0 +1,12 @@
+import sys
+from app import create_app
+from counters import reconcile
+
+app = create_app()
+
+# Usage: python reconcile.py [batch_size]
+batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+with app.app_context():
+    repaired = reconcile(batch_size)
+    print(f"Counters reconciled: {repaired['submissions']} submissions, {repaired['competitions']} competitions repaired.")
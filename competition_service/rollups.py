@@ -0,0 +1,176 @@
+import datetime
+from collections import Counter, defaultdict
+from sqlalchemy import and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app import db
+from models import Submission, Like, Comment, ActivityRollup, SubmitterRollup
+
+# Hourly and daily activity buckets per competition and per submission, plus running
+# totals per submitter, so GET /competitions/<id>/stats reads a bounded number of rows
+# however much activity there has been.
+#
+# The write paths collect their changes in a Deltas and apply them in the transaction
+# that makes the change: one upsert per distinct bucket, `column = column + delta`, so concurrent
+# writers add up instead of overwriting each other. backfill_rollups.py rebuilds a
+# competition's rollups from the raw rows.
+
+GRANULARITIES = ('hour', 'day')
+METRICS = ('submissions', 'likes', 'comments')
+# Buckets returned by default, and at most, per granularity
+DEFAULT_BUCKETS = {'hour': 48, 'day': 30}
+MAX_BUCKETS = {'hour': 24 * 31, 'day': 366}
+TOP_SUBMITTERS = 10
+# The competition-wide rows have no submission
+COMPETITION = ''
+
+
+def bucket_start(at, granularity):
+    if granularity == 'hour':
+        return at.replace(minute=0, second=0, microsecond=0)
+    return at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _step(granularity):
+    return datetime.timedelta(hours=1) if granularity == 'hour' else datetime.timedelta(days=1)
+
+
+class Deltas:
+    def __init__(self):
+        self.buckets = defaultdict(Counter)
+        self.submitters = defaultdict(Counter)
+
+    def add(self, competition_id, submission_id, submitter_id, metric, at, count=1):
+        at = at or datetime.datetime.utcnow()
+        for granularity in GRANULARITIES:
+            start = bucket_start(at, granularity)
+            self.buckets[(competition_id, COMPETITION, granularity, start)][metric] += count
+            self.buckets[(competition_id, submission_id, granularity, start)][metric] += count
+        self.submitters[(competition_id, submitter_id)][metric] += count
+
+    # Joins the caller's transaction; the caller commits
+    def apply(self):
+        bucket_keys = ('competition_id', 'submission_id', 'granularity', 'bucket_start')
+        _upsert(ActivityRollup, bucket_keys, self.buckets)
+        _upsert(SubmitterRollup, ('competition_id', 'user_id'), self.submitters)
+        self.buckets.clear()
+        self.submitters.clear()
+
+
+def _upsert(model, keys, deltas):
+    if not deltas:
+        return
+    table = model.__table__
+    # Sorted so concurrent writers lock rows in the same order
+    rows = [dict(zip(keys, key), **{metric: changes[metric] for metric in METRICS})
+            for key, changes in sorted(deltas.items())]
+    if db.engine.dialect.name == 'postgresql':
+        statement = pg_insert(table).values(rows)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={metric: table.c[metric] + statement.excluded[metric] for metric in METRICS}
+        ))
+        return
+
+    # Other databases (SQLite in development): update, and insert the buckets that are new
+    for row in rows:
+        updated = db.session.execute(table.update().where(
+            and_(*[table.c[key] == row[key] for key in keys])
+        ).values({metric: table.c[metric] + row[metric] for metric in METRICS}))
+        if updated.rowcount == 0:
+            db.session.execute(table.insert().values(row))
+
+
+def record(competition_id, submission_id, submitter_id, metric, at=None, count=1):
+    deltas = Deltas()
+    deltas.add(competition_id, submission_id, submitter_id, metric, at, count)
+    deltas.apply()
+
+def record_submission(submission):
+    record(submission.competition_id, submission.id, submission.user_id, 'submissions', submission.created_at)
+
+def record_comment(submission, comment):
+    record(submission.competition_id, submission.id, submission.user_id, 'comments', comment.created_at)
+
+
+# A deleted submission takes its activity out of the competition's buckets and its
+# submitter's totals, using its own buckets as the record of what to subtract
+def forget_submission(submission):
+    rows = ActivityRollup.query.filter_by(competition_id=submission.competition_id, submission_id=submission.id).all()
+    negated = defaultdict(Counter)
+    totals = Counter()
+    for row in rows:
+        for metric in METRICS:
+            negated[(row.competition_id, COMPETITION, row.granularity, row.bucket_start)][metric] -= getattr(row, metric)
+            if row.granularity == 'day':
+                totals[metric] -= getattr(row, metric)
+    _upsert(ActivityRollup, ('competition_id', 'submission_id', 'granularity', 'bucket_start'), negated)
+    if totals:
+        _upsert(SubmitterRollup, ('competition_id', 'user_id'), {(submission.competition_id, submission.user_id): totals})
+    ActivityRollup.query.filter_by(competition_id=submission.competition_id, submission_id=submission.id) \
+        .delete(synchronize_session=False)
+
+def forget_competition(competition_id):
+    ActivityRollup.query.filter_by(competition_id=competition_id).delete(synchronize_session=False)
+    SubmitterRollup.query.filter_by(competition_id=competition_id).delete(synchronize_session=False)
+
+
+# Backfill: recount a competition from the raw rows in one transaction, streaming them
+def rebuild(competition_id, chunk_size=1000):
+    forget_competition(competition_id)
+    deltas = Deltas()
+    submissions = {}
+    for submission in (Submission.query.with_entities(Submission.id, Submission.user_id, Submission.created_at)
+                       .filter(Submission.competition_id == competition_id).yield_per(chunk_size)):
+        submissions[submission.id] = submission.user_id
+        deltas.add(competition_id, submission.id, submission.user_id, 'submissions', submission.created_at)
+    for model, metric in ((Like, 'likes'), (Comment, 'comments')):
+        for submission_id, created_at in (db.session.query(model.submission_id, model.created_at)
+                                          .join(Submission, Submission.id == model.submission_id)
+                                          .filter(Submission.competition_id == competition_id)
+                                          .yield_per(chunk_size)):
+            deltas.add(competition_id, submission_id, submissions[submission_id], metric, created_at)
+    buckets = len(deltas.buckets)
+    deltas.apply()
+    db.session.commit()
+    return buckets
+
+
+# Read side
+
+def parse_granularity(raw):
+    granularity = raw or 'hour'
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Invalid granularity: must be one of {', '.join(GRANULARITIES)}")
+    return granularity
+
+def parse_buckets(raw, granularity):
+    if raw is None:
+        return DEFAULT_BUCKETS[granularity]
+    if not raw.isdigit() or not 1 <= int(raw) <= MAX_BUCKETS[granularity]:
+        raise ValueError(f"Invalid buckets: must be between 1 and {MAX_BUCKETS[granularity]}")
+    return int(raw)
+
+# The last `buckets` buckets up to now, oldest first, with empty ones filled in
+def series(competition_id, granularity, buckets, submission_id=None):
+    step = _step(granularity)
+    last = bucket_start(datetime.datetime.utcnow(), granularity)
+    first = last - step * (buckets - 1)
+    stored = {row.bucket_start: row for row in ActivityRollup.query.filter(
+        ActivityRollup.competition_id == competition_id,
+        ActivityRollup.submission_id == (submission_id or COMPETITION),
+        ActivityRollup.granularity == granularity,
+        ActivityRollup.bucket_start >= first
+    )}
+    points = []
+    for i in range(buckets):
+        start = first + step * i
+        row = stored.get(start)
+        points.append(dict({"start": start}, **{metric: getattr(row, metric) if row else 0 for metric in METRICS}))
+    return points
+
+def top_submitters(competition_id, limit=TOP_SUBMITTERS):
+    rows = (SubmitterRollup.query
+            .filter(SubmitterRollup.competition_id == competition_id)
+            .order_by(SubmitterRollup.likes.desc(), SubmitterRollup.submissions.desc())
+            .limit(limit))
+    return [{"user_id": row.user_id, "submissions": row.submissions, "likes": row.likes, "comments": row.comments}
+            for row in rows]
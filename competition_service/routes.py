@@ -1,32 +1,56 @@
-import asyncio
-import websockets
-import requests
-from flask import Blueprint, request, jsonify
-from app import db
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from app import db, cache, db_router
 from models import Competition, Submission, Like, Comment
+import queries
+import counters
+import bulk
+import leaderboard
+import rollups
+import search
+import conditional
+from like_buffer import like_buffer
+import notifications
+from users import existing_user_required, user_service, names_version
+from user_rpc import user_rpc, UserRpcError
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from flask_socketio import emit, join_room
 import datetime
+import io
+import os
+import redis
 import json
+import logging
 import time
 
+logger = logging.getLogger(__name__)
+
 competition_routes = Blueprint('competition_routes', __name__)
+# Large JSON bodies are gzipped for clients that accept it (see conditional.py)
+competition_routes.after_request(conditional.compress)
 
-def validate_user(headers):
-    try:
-        response = requests.post(
-            "http://user_management_service:5000/users/validate",
-            headers=headers
-        )
-        return response.status_code == 200
-    except requests.exceptions.RequestException as e:
-        current_app.logger.error(f"Error validating user: {e}")
-        return False
+# GET /submissions/<id> streams entries longer than this many characters instead of caching them
+INLINE_CONTENT_LENGTH = int(os.getenv('INLINE_CONTENT_LENGTH', '65536'))
+CONTENT_CHUNK_SIZE = 65536
 
 @competition_routes.route('/status', methods=['GET'])
 def status():
     return jsonify({"status": "Competition Service is running"}), 200
 
+@competition_routes.route('/status/clients', methods=['GET'])
+def client_stats():
+    return jsonify({"user_management_service": user_service.stats()}), 200
+
+@competition_routes.route('/status/cache', methods=['GET'])
+def cache_stats():
+    return jsonify(cache.stats), 200
+
+@competition_routes.route('/status/db', methods=['GET'])
+def db_status():
+    return jsonify(db_router.status()), 200
+
+@competition_routes.route('/status/likes', methods=['GET'])
+def like_buffer_stats():
+    return jsonify(dict(like_buffer.stats, pending=like_buffer.pending())), 200
+
 @competition_routes.route('/long-task', methods=['GET'])
 def long_task():
     time.sleep(70)
@@ -34,11 +58,8 @@ def long_task():
 
 @competition_routes.route('/competitions', methods=['POST'])
 @jwt_required()
+@existing_user_required
 def create_competition():
-    headers = {"Authorization": request.headers.get("Authorization")}
-    if not validate_user(headers):
-        return jsonify({"error": "User validation failed"}), 401
-
     # Retrieve the user ID from the JWT token
     user_id = get_jwt_identity()
 
@@ -68,7 +89,10 @@ def create_competition():
 
         # Save the new competition to the database
         db.session.add(new_competition)
+        db.session.flush()
+        search.index_competition(new_competition)
         db.session.commit()
+        cache.invalidate("competitions")
 
         return jsonify({
             "competition_id": new_competition.id,
@@ -80,45 +104,162 @@ def create_competition():
 
 @competition_routes.route('/competitions', methods=['GET'])
 def get_active_competitions():
-    competitions = Competition.query.all()
-    result = [{
-        "competition_id": comp.id,
-        "title": comp.title,
-        "description": comp.description,
-        "start_date": comp.start_date.isoformat() if comp.start_date else None,
-        "end_date": comp.end_date.isoformat() if comp.end_date else None
-    } for comp in competitions]
-    return jsonify(result), 200
+    try:
+        fields = queries.parse_fields(request.args.get('fields'), queries.COMPETITION_FIELDS)
+        limit = queries.parse_limit(request.args.get('limit'))
+        active_only = request.args.get('active', 'true').lower() != 'false'
+        cursor = request.args.get('cursor')
+
+        def load():
+            competitions, next_cursor = queries.get_competitions(fields, cursor, limit, active_only)
+            result = [queries.serialize(comp, queries.COMPETITION_FIELDS, fields) for comp in competitions]
+            return {"competitions": result, "next_cursor": next_cursor}
+
+        payload = cache.get_or_load("competitions", (active_only, limit, cursor, fields), load)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(payload), 200
+
+# Authors' usernames for a cached page of submissions, from one GetUsers call. They are
+# looked up per request rather than cached with the page, so renames and deletions show
+# up right away. Returns the page and whether the names could be looked up; when the user
+# service can't be reached, every username is None.
+def _add_usernames(payload):
+    entries = payload["submissions"]
+    if not entries or "user_id" not in entries[0]:
+        return payload, True
+    try:
+        names = user_rpc.usernames([entry["user_id"] for entry in entries])
+    except UserRpcError as e:
+        logger.warning(f"Could not look up usernames: {e}")
+        names = None
+    found = names or {}
+    payload = dict(payload, submissions=[dict(entry, username=found.get(entry["user_id"])) for entry in entries])
+    return payload, names is not None
 
 @competition_routes.route('/competitions/<id>', methods=['GET'])
 def get_competition_details(id):
-    competition = Competition.query.get(id)
-    if competition:
-        submissions = Submission.query.filter_by(competition_id=id).all()
-        submission_details = [{
-            "submission_id": sub.id,
-            "title": sub.title,
-            "content": sub.content,
-            "created_at": sub.created_at,
-            "user_id": sub.user_id,
-            "likes_count": Like.query.filter_by(submission_id=sub.id).count(),
-            "comments_count": Comment.query.filter_by(submission_id=sub.id).count()
-        } for sub in submissions]
+    # With usernames in the page, its ETag also covers the version of users' names, which
+    # is read without looking any of them up. If that can't be read, nothing is tagged.
+    names = None
+    if user_rpc.enabled:
+        version = names_version()
+        names = f"names{version}" if version is not None else None
+    if names or not user_rpc.enabled:
+        unchanged = conditional.not_modified('competition', lambda: queries.get_version(Competition, id), names)
+        if unchanged:
+            return unchanged
+    try:
+        fields = queries.parse_fields(request.args.get('fields'), queries.SUBMISSION_FIELDS)
+        limit = queries.parse_limit(request.args.get('limit'))
+        cursor = request.args.get('cursor')
 
-        return jsonify({
-            "competition_id": competition.id,
-            "title": competition.title,
-            "description": competition.description,
-            "start_date": competition.start_date.isoformat() if competition.start_date else None,
-            "end_date": competition.end_date.isoformat() if competition.end_date else None,
-            "created_at": competition.created_at,
-            "submissions": submission_details
-        }), 200
+        def load():
+            competition = Competition.query.get(id)
+            if not competition:
+                return None
+            submissions, next_cursor = queries.get_competition_submissions(id, fields, cursor, limit)
+            return {
+                "competition_id": competition.id,
+                "title": competition.title,
+                "description": competition.description,
+                "start_date": competition.start_date.isoformat() if competition.start_date else None,
+                "end_date": competition.end_date.isoformat() if competition.end_date else None,
+                "created_at": competition.created_at,
+                "version": competition.version,
+                "submissions": [queries.serialize(sub, queries.SUBMISSION_FIELDS, fields) for sub in submissions],
+                "next_cursor": next_cursor
+            }
+
+        payload = cache.get_or_load(f"competition:{id}", (limit, cursor, fields), load)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not payload:
+        return jsonify({"error": "Competition not found"}), 404
+    if not user_rpc.enabled:
+        return conditional.json_response(payload, 'competition'), 200
+    payload, named = _add_usernames(payload)
+    if not named or names is None:
+        return conditional.uncacheable(jsonify(payload)), 200
+    return conditional.json_response(payload, 'competition', names), 200
+
+@competition_routes.route('/competitions/<id>/leaderboard', methods=['GET'])
+def get_leaderboard(id):
+    try:
+        limit = queries.parse_limit(request.args.get('limit', '10'))
+        ranking = leaderboard.top(id, limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except redis.RedisError as e:
+        return jsonify({"error": str(e)}), 503
+    if ranking is None:
+        return jsonify({"error": "Competition not found"}), 404
+    return jsonify({"competition_id": id, "leaderboard": ranking}), 200
+
+@competition_routes.route('/competitions/<id>/leaderboard/<submission_id>', methods=['GET'])
+def get_submission_rank(id, submission_id):
+    radius = request.args.get('radius', '2')
+    if not radius.isdigit() or int(radius) > queries.MAX_PAGE_SIZE:
+        return jsonify({"error": "Invalid radius"}), 400
+    try:
+        standing = leaderboard.standing(id, submission_id, int(radius))
+    except redis.RedisError as e:
+        return jsonify({"error": str(e)}), 503
+    if standing:
+        return jsonify(dict(standing, competition_id=id)), 200
+    return jsonify({"error": "Submission not ranked in this competition"}), 404
+
+
+# Activity curves and top submitters, from the pre-aggregated rollups (see rollups.py)
+@competition_routes.route('/competitions/<id>/stats', methods=['GET'])
+def get_competition_stats(id):
+    try:
+        granularity = rollups.parse_granularity(request.args.get('granularity'))
+        buckets = rollups.parse_buckets(request.args.get('buckets'), granularity)
+        submission_id = request.args.get('submission_id')
+
+        def load():
+            competition = Competition.query.get(id)
+            if not competition:
+                return None
+            return {
+                "competition_id": id,
+                "totals": {
+                    "submissions": competition.submissions_count,
+                    "likes": competition.likes_count,
+                    "comments": competition.comments_count
+                },
+                "granularity": granularity,
+                "submission_id": submission_id,
+                "activity": rollups.series(id, granularity, buckets, submission_id),
+                "top_submitters": rollups.top_submitters(id)
+            }
+
+        payload = cache.get_or_load(f"competition:{id}", ("stats", granularity, buckets, submission_id), load)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if payload:
+        return jsonify(payload), 200
     return jsonify({"error": "Competition not found"}), 404
 
+# Ranked full-text search over submissions and competitions (see search.py)
+@competition_routes.route('/search', methods=['GET'])
+def search_submissions():
+    try:
+        kind = search.parse_type(request.args.get('type'))
+        limit, offset = search.parse_page(request.args.get('limit'), request.args.get('offset'))
+        results = search.search(request.args.get('q'), request.args.get('competition_id'), kind, limit, offset)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "query": request.args.get('q'),
+        "results": results,
+        "next_offset": offset + limit if len(results) == limit else None
+    }), 200
 
 @competition_routes.route('/competitions/<id>/submit', methods=['POST'])
 @jwt_required()
+@existing_user_required
 def submit_entry(id):
     user_id = get_jwt_identity()
     try:
@@ -129,27 +270,23 @@ def submit_entry(id):
     new_submission = Submission(title=data['title'], content=data['content'], competition_id=id, user_id=user_id)
     try:
         db.session.add(new_submission)
+        db.session.flush()
+        counters.record_submission(id)
+        rollups.record_submission(new_submission)
+        search.index_submission(new_submission)
         db.session.commit()
+        cache.invalidate(f"competition:{id}")
+        leaderboard.record_submission(new_submission)
 
-        # Notify subscribers via WebSocket server
-        async def notify_websocket():
-            try:
-                async with websockets.connect("ws://localhost:6480") as websocket:
-                    await websocket.send(json.dumps({
-                        "action": "new_submission",
-                        "competition_id": id,
-                        "submission": {
-                            "submission_id": new_submission.id,
-                            "title": new_submission.title,
-                            "content": new_submission.content,
-                            "user_id": user_id,
-                            "timestamp": str(datetime.datetime.utcnow())
-                        }
-                    }))
-            except Exception as e:
-                current_app.logger.error(f"WebSocket notification failed: {e}")
-
-        asyncio.run(notify_websocket())
+        # Notify subscribers via WebSocket server, without waiting for delivery
+        notifications.publish_submission(id, {
+            "submission_id": new_submission.id,
+            "title": new_submission.title,
+            "excerpt": new_submission.excerpt,
+            "content_length": new_submission.content_length,
+            "user_id": user_id,
+            "timestamp": str(datetime.datetime.utcnow())
+        })
 
         return jsonify({"submission_id": new_submission.id, "message": "Submission successful"}), 201
     except Exception as e:
@@ -157,34 +294,99 @@ def submit_entry(id):
 
 @competition_routes.route('/competitions/<id>/like/<submission_id>', methods=['POST'])
 @jwt_required()
+@existing_user_required
 def like_submission(id, submission_id):
     user_id = get_jwt_identity()
-    new_like = Like(user_id=user_id, submission_id=submission_id)
-    try:
-        db.session.add(new_like)
-        db.session.commit()
-        return jsonify({"message": "Like added"}), 201
-    except Exception as e:
-        return jsonify({"error": str(e)}), 400
+    if not _submission_payload(submission_id):
+        return jsonify({"error": "Submission not found"}), 404
+
+    # Written to the database in the next batch (see like_buffer.py)
+    if not like_buffer.add(user_id, submission_id):
+        return jsonify({"error": "Too many pending likes, try again later"}), 503
+    return jsonify({"message": "Like accepted"}), 202
 
 
 @competition_routes.route('/competitions/<id>/comment/<submission_id>', methods=['POST'])
 @jwt_required()
+@existing_user_required
 def comment_on_submission(id, submission_id):
     user_id = get_jwt_identity()
     try:
         data = request.get_json()
     except:
         data = json.loads(request.data.decode('utf-8'))
-    new_comment = Comment(content=data['content'], user_id=user_id, submission_id=submission_id)
+    submission = Submission.query.get(submission_id)
+    if not submission:
+        return jsonify({"error": "Submission not found"}), 404
+
+    # Replies name the comment they answer, which must be on the same submission
+    parent_comment_id = data.get('parent_comment_id')
+    if parent_comment_id:
+        parent = Comment.query.get(parent_comment_id)
+        if not parent or parent.submission_id != submission_id:
+            return jsonify({"error": "Invalid parent_comment_id"}), 400
+
+    new_comment = Comment(content=data['content'], user_id=user_id, submission_id=submission_id,
+                          parent_comment_id=parent_comment_id)
     try:
         db.session.add(new_comment)
+        counters.record_comment(submission)
+        rollups.record_comment(submission, new_comment)
         db.session.commit()
+        cache.invalidate(f"competition:{submission.competition_id}", f"submission:{submission_id}")
 
         return jsonify({"comment_id": new_comment.id, "message": "Comment added"}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+# Bulk import/export (see bulk.py). Imports are restricted to the competition's admin.
+def _bulk_import(id, importer, label):
+    user_id = get_jwt_identity()
+    competition = Competition.query.get(id)
+    if not competition:
+        return jsonify({"error": "Competition not found"}), 404
+    if competition.admin_id != user_id:
+        return jsonify({"error": "Only the competition admin can import"}), 403
+    try:
+        fmt = bulk.parse_format(request.args.get('format'), request.mimetype)
+        # Read the body as it arrives rather than loading it whole
+        records = bulk.read_records(io.TextIOWrapper(request.stream, encoding='utf-8', newline=''), fmt)
+        imported = importer(competition, records, default_user_id=user_id)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"imported": imported, "message": f"{label} imported successfully"}), 201
+
+def _bulk_export(id, exporter):
+    try:
+        fmt = bulk.parse_format(request.args.get('format', 'ndjson'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not Competition.query.get(id):
+        return jsonify({"error": "Competition not found"}), 404
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(exporter(id, fmt)), mimetype=mimetype)
+
+@competition_routes.route('/competitions/<id>/submissions/import', methods=['POST'])
+@jwt_required()
+@existing_user_required
+def import_submissions(id):
+    return _bulk_import(id, bulk.import_submissions, "Submissions")
+
+@competition_routes.route('/competitions/<id>/comments/import', methods=['POST'])
+@jwt_required()
+@existing_user_required
+def import_comments(id):
+    return _bulk_import(id, bulk.import_comments, "Comments")
+
+@competition_routes.route('/competitions/<id>/submissions/export', methods=['GET'])
+def export_submissions(id):
+    return _bulk_export(id, bulk.export_submissions)
+
+@competition_routes.route('/competitions/<id>/comments/export', methods=['GET'])
+def export_comments(id):
+    return _bulk_export(id, bulk.export_comments)
+
 @competition_routes.route('/competitions/<id>', methods=['DELETE'])
 @jwt_required()
 def delete_competition(id):
@@ -193,8 +395,12 @@ def delete_competition(id):
         return jsonify({"error": "Competition not found"}), 404
 
     try:
+        rollups.forget_competition(id)
+        search.remove_competition(id)
         db.session.delete(competition)
         db.session.commit()
+        cache.invalidate("competitions", f"competition:{id}")
+        leaderboard.forget_competition(id)
         return jsonify({"message": "Competition deleted successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -206,27 +412,81 @@ def delete_submission(submission_id):
     if not submission:
         return jsonify({"error": "Submission not found"}), 404
 
+    competition_id = submission.competition_id
     try:
+        Like.query.filter_by(submission_id=submission_id).delete(synchronize_session=False)
+        Comment.query.filter_by(submission_id=submission_id).delete(synchronize_session=False)
+        counters.forget_submission(submission)
+        rollups.forget_submission(submission)
+        search.remove_submission(submission_id)
         db.session.delete(submission)
         db.session.commit()
+        cache.invalidate(f"competition:{competition_id}", f"submission:{submission_id}")
+        leaderboard.forget_submission(competition_id, submission_id)
         return jsonify({"message": "Submission deleted successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
-@competition_routes.route('/submissions/<id>', methods=['GET'])
-def get_submission(id):
-    submission = Submission.query.get(id)
-    if submission:
-        like_count = Like.query.filter_by(submission_id=id).count()
-        comment_count = Comment.query.filter_by(submission_id=id).count()
-        return jsonify({
+# Cached, so it also serves as a cheap existence check for likes
+def _submission_payload(id):
+    def load():
+        submission = queries.get_submission(id)
+        if not submission:
+            return None
+        return {
             "submission_id": submission.id,
             "title": submission.title,
-            "content": submission.content,
+            "excerpt": submission.excerpt,
+            "content_length": submission.content_length,
             "created_at": submission.created_at,
             "competition_id": submission.competition_id,
             "user_id": submission.user_id,
-            "likes": like_count,
-            "comments": comment_count
-        }), 200
-    return jsonify({"error": "Submission not found"}), 404
\ No newline at end of file
+            "likes": submission.likes_count,
+            "comments": submission.comments_count,
+            "version": submission.version
+        }
+
+    return cache.get_or_load(f"submission:{id}", (), load)
+
+@competition_routes.route('/submissions/<id>', methods=['GET'])
+def get_submission(id):
+    unchanged = conditional.not_modified('submission', lambda: queries.get_version(Submission, id))
+    if unchanged:
+        return unchanged
+    payload = _submission_payload(id)
+    if not payload:
+        return jsonify({"error": "Submission not found"}), 404
+    if payload.get("content_length", 0) <= INLINE_CONTENT_LENGTH:
+        # Submissions never change their text, so it is cached as long as the rest
+        content = cache.get_or_load(f"submission:{id}", ("content",),
+                                    lambda: ''.join(queries.iter_submission_content(id, CONTENT_CHUNK_SIZE)))
+        return conditional.json_response(dict(payload, content=content), 'submission'), 200
+    response = Response(stream_with_context(_stream_submission(id, payload)), mimetype='application/json')
+    return conditional.with_etag(response, payload, 'submission')
+
+# The payload followed by the content, read and escaped a chunk at a time
+def _stream_submission(id, payload):
+    yield json.dumps(payload)[:-1] + ', "content": "'
+    for chunk in queries.iter_submission_content(id, CONTENT_CHUNK_SIZE):
+        yield json.dumps(chunk)[1:-1]
+    yield '"}'
+
+@competition_routes.route('/submissions/<id>/comments', methods=['GET'])
+def get_submission_comments(id):
+    if not _submission_payload(id):
+        return jsonify({"error": "Submission not found"}), 404
+    try:
+        limit = queries.parse_limit(request.args.get('limit'))
+        depth = queries.parse_depth(request.args.get('depth'))
+        parent_id = request.args.get('parent_id')
+        cursor = request.args.get('cursor')
+
+        def load():
+            comments, next_cursor = queries.get_comment_tree(id, parent_id, cursor, limit, depth)
+            return {"submission_id": id, "comments": comments, "next_cursor": next_cursor}
+
+        # Same namespace as the submission, so a new comment invalidates it
+        payload = cache.get_or_load(f"submission:{id}", ("comments", parent_id, cursor, limit, depth), load)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(payload), 200
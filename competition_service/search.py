@@ -0,0 +1,188 @@
+import html
+import os
+import re
+from sqlalchemy import DDL, event, text
+from app import db
+
+# Full-text search over submissions (title + content) and competitions (title +
+# description), for GET /search.
+#
+# The inverted index is the search_document table, one row per indexed object, kept up to
+# date by the write routes and bulk imports in the same transaction as the change:
+#  - Postgres: a weighted tsvector per document (title A, body B) under a GIN index.
+#    Queries use websearch_to_tsquery, so "quoted phrases", OR and -word work; results are
+#    ranked with ts_rank_cd and snippets come from ts_headline on the page of results only.
+#  - SQLite (development and tests): an FTS5 table ranked with bm25(), matching all words.
+#
+# Snippets are HTML: the text is escaped and matches are wrapped in <mark>. The database
+# marks matches with private-use characters, which become tags only after escaping, so
+# submitted markup always comes out as text.
+#
+# The table isn't a model: the migration creates it, and so does db.create_all() through
+# the DDL hooks at the bottom of this file.
+
+LANGUAGE = os.getenv('SEARCH_LANGUAGE', 'english')
+TYPES = ('submission', 'competition')
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+MAX_OFFSET = 1000
+SNIPPET_START, SNIPPET_STOP = '<mark>', '</mark>'
+_MATCH_START, _MATCH_STOP = '\ue000', '\ue001'
+# Relative weight of a title match over a body match, as Postgres' default A/B weights
+TITLE_WEIGHT = 2.5
+
+_VECTOR = (f"setweight(to_tsvector('{LANGUAGE}', :title), 'A') || "
+           f"setweight(to_tsvector('{LANGUAGE}', :body), 'B')")
+
+
+def _postgres():
+    return db.engine.dialect.name == 'postgresql'
+
+
+# Write side. Everything joins the caller's transaction; the caller commits.
+
+def index_documents(documents):
+    rows = [{"kind": kind, "doc_id": doc_id, "competition_id": competition_id, "title": title, "body": body or ''}
+            for kind, doc_id, competition_id, title, body in documents]
+    if not rows:
+        return
+    if _postgres():
+        db.session.execute(text(
+            f"INSERT INTO search_document (kind, doc_id, competition_id, vector) "
+            f"VALUES (:kind, :doc_id, :competition_id, {_VECTOR}) "
+            f"ON CONFLICT (kind, doc_id) DO UPDATE "
+            f"SET competition_id = excluded.competition_id, vector = excluded.vector"
+        ), rows)
+        return
+    # FTS5 has no upsert
+    db.session.execute(text("DELETE FROM search_document WHERE kind = :kind AND doc_id = :doc_id"), rows)
+    db.session.execute(text(
+        "INSERT INTO search_document (kind, doc_id, competition_id, title, body) "
+        "VALUES (:kind, :doc_id, :competition_id, :title, :body)"
+    ), rows)
+
+def index_submission(submission):
+    index_documents([('submission', submission.id, submission.competition_id, submission.title, submission.content)])
+
+def index_competition(competition):
+    index_documents([('competition', competition.id, competition.id, competition.title, competition.description)])
+
+def remove_submission(submission_id):
+    db.session.execute(text("DELETE FROM search_document WHERE kind = 'submission' AND doc_id = :doc_id"),
+                       {"doc_id": submission_id})
+
+# The competition's own document and all of its submissions'
+def remove_competition(competition_id):
+    db.session.execute(text("DELETE FROM search_document WHERE competition_id = :competition_id"),
+                       {"competition_id": competition_id})
+
+
+# Read side
+
+def parse_type(raw):
+    if raw and raw not in TYPES:
+        raise ValueError(f"Invalid type: must be one of {', '.join(TYPES)}")
+    return raw or None
+
+def parse_page(raw_limit, raw_offset):
+    try:
+        limit = int(raw_limit) if raw_limit is not None else DEFAULT_LIMIT
+        offset = int(raw_offset) if raw_offset is not None else 0
+    except ValueError:
+        raise ValueError("Invalid limit or offset")
+    if limit < 1 or not 0 <= offset <= MAX_OFFSET:
+        raise ValueError(f"Invalid limit or offset: offset can be at most {MAX_OFFSET}")
+    return min(limit, MAX_LIMIT), offset
+
+# Best matches first. Scores are only comparable within one backend.
+def search(query, competition_id=None, kind=None, limit=DEFAULT_LIMIT, offset=0):
+    if not query or not query.strip():
+        raise ValueError("Missing search query")
+    params = {"query": query, "competition_id": competition_id, "kind": kind, "limit": limit, "offset": offset}
+    filters = ''
+    if competition_id:
+        filters += " AND competition_id = :competition_id"
+    if kind:
+        filters += " AND kind = :kind"
+    if _postgres():
+        rows = _search_postgres(params, filters)
+    else:
+        rows = _search_sqlite(params, filters)
+    return [{"type": row.kind, "id": row.doc_id, "competition_id": row.competition_id, "title": row.title,
+             "snippet": _highlight(row.snippet), "score": round(float(row.score), 6)} for row in rows]
+
+# Escapes the snippet and turns the match markers into tags, always balanced, so stray
+# markers in the submitted text can at worst add a highlight
+def _highlight(snippet):
+    parts, inside = [], False
+    for piece in re.split(f'([{_MATCH_START}{_MATCH_STOP}])', snippet or ''):
+        if piece in (_MATCH_START, _MATCH_STOP):
+            opening = piece == _MATCH_START
+            if opening != inside:
+                parts.append(SNIPPET_START if opening else SNIPPET_STOP)
+                inside = opening
+        else:
+            parts.append(html.escape(piece))
+    if inside:
+        parts.append(SNIPPET_STOP)
+    return ''.join(parts)
+
+def _search_postgres(params, filters):
+    params = dict(params, options=f"StartSel={_MATCH_START}, StopSel={_MATCH_STOP}, "
+                                  f"MaxWords=30, MinWords=10, MaxFragments=2")
+    # Ranked in the index first; the text is only fetched and highlighted for the page served
+    return db.session.execute(text(f"""
+        WITH q AS (SELECT websearch_to_tsquery('{LANGUAGE}', :query) AS query),
+        hits AS (
+            SELECT d.kind, d.doc_id, d.competition_id, ts_rank_cd(d.vector, q.query) AS score
+            FROM search_document d, q
+            WHERE d.vector @@ q.query{filters}
+            ORDER BY score DESC, d.doc_id
+            LIMIT :limit OFFSET :offset
+        )
+        SELECT hits.kind, hits.doc_id, hits.competition_id, hits.score,
+               coalesce(s.title, c.title) AS title,
+               ts_headline('{LANGUAGE}', coalesce(s.content, c.description), q.query, :options) AS snippet
+        FROM hits CROSS JOIN q
+        LEFT JOIN submission s ON hits.kind = 'submission' AND s.id = hits.doc_id
+        LEFT JOIN competition c ON hits.kind = 'competition' AND c.id = hits.doc_id
+        ORDER BY hits.score DESC, hits.doc_id
+    """), params).fetchall()
+
+def _search_sqlite(params, filters):
+    # Every word must match; quoting keeps FTS5 query syntax out of user input
+    words = re.findall(r'\w+', params["query"])
+    if not words:
+        raise ValueError("Missing search query")
+    params = dict(params, query=' '.join(f'"{word}"' for word in words), match_start=_MATCH_START,
+                  match_stop=_MATCH_STOP)
+    return db.session.execute(text(f"""
+        SELECT kind, doc_id, competition_id, title,
+               snippet(search_document, 4, :match_start, :match_stop, '...', 20) AS snippet,
+               -bm25(search_document, 0, 0, 0, {TITLE_WEIGHT}, 1) AS score
+        FROM search_document
+        WHERE search_document MATCH :query{filters}
+        ORDER BY score DESC, doc_id
+        LIMIT :limit OFFSET :offset
+    """), params).fetchall()
+
+
+# Schema, for db.create_all()/drop_all(); migration 0005 creates the same on deployed databases
+
+_CREATE = {
+    'postgresql': [
+        "CREATE TABLE IF NOT EXISTS search_document (kind VARCHAR(16) NOT NULL, doc_id VARCHAR(36) NOT NULL, "
+        "competition_id VARCHAR(36) NOT NULL, vector TSVECTOR NOT NULL, PRIMARY KEY (kind, doc_id))",
+        "CREATE INDEX IF NOT EXISTS ix_search_document_vector ON search_document USING GIN (vector)",
+        "CREATE INDEX IF NOT EXISTS ix_search_document_competition ON search_document (competition_id)",
+    ],
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_document USING fts5("
+        "kind UNINDEXED, doc_id UNINDEXED, competition_id UNINDEXED, title, body, tokenize='porter unicode61')",
+    ],
+}
+
+for dialect, statements in _CREATE.items():
+    for statement in statements:
+        event.listen(db.metadata, 'after_create', DDL(statement).execute_if(dialect=dialect))
+    event.listen(db.metadata, 'before_drop', DDL("DROP TABLE IF EXISTS search_document").execute_if(dialect=dialect))
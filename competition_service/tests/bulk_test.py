@@ -0,0 +1,72 @@
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Run against a throwaway SQLite file unless DATABASE_URL points elsewhere (COPY is used on Postgres)
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{tempfile.mkdtemp()}/bulk.db")
+os.environ.setdefault('CACHE_REDIS_URLS', 'memory://a')
+os.environ.setdefault('LEADERBOARD_REDIS_URL', 'memory://')
+os.environ.setdefault('JWT_SECRET_KEY', 'bulk-test')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+from app import app, db
+from models import Competition, Submission, Comment
+import users
+
+NUM_SUBMISSIONS = 5000
+
+def create_competition(client, headers, title):
+    response = client.post('/competitions', headers=headers, json={
+        "title": title, "description": "Bulk", "start_date": "2020-01-01", "end_date": "2099-01-01"
+    })
+    return response.get_json()["competition_id"]
+
+def test_import_and_export_round_trip():
+    users._fetch_user_validity = lambda user_id, authorization: True
+    client = app.test_client()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        headers = {"Authorization": f"Bearer {create_access_token(identity='admin')}"}
+        intruder = {"Authorization": f"Bearer {create_access_token(identity='someone-else')}"}
+
+    archive = create_competition(client, headers, "Archive")
+    body = ''.join(json.dumps({"title": f"Entry {i}", "content": f"Chapter {i}", "user_id": f"author-{i % 50}"}) + '\n'
+                   for i in range(NUM_SUBMISSIONS))
+    assert client.post(f'/competitions/{archive}/submissions/import', headers=intruder, data=body).status_code == 403
+
+    start = time.time()
+    response = client.post(f'/competitions/{archive}/submissions/import', headers=headers, data=body,
+                           content_type='application/x-ndjson')
+    print(f"Imported {NUM_SUBMISSIONS} submissions in {(time.time() - start) * 1000:.0f} ms")
+    assert response.status_code == 201 and response.get_json()["imported"] == NUM_SUBMISSIONS
+
+    exported = client.get(f'/competitions/{archive}/submissions/export?format=csv').get_data(as_text=True)
+    assert len(exported.splitlines()) == NUM_SUBMISSIONS + 1
+
+    # Comments referencing a submission of another competition roll the whole import back
+    first = json.loads(client.get(f'/competitions/{archive}/submissions/export').get_data(as_text=True).splitlines()[0])
+    comments = json.dumps({"submission_id": first["submission_id"], "content": "Splendid"}) + '\n'
+    response = client.post(f'/competitions/{archive}/comments/import', headers=headers,
+                           data=comments + json.dumps({"submission_id": "missing", "content": "?"}) + '\n')
+    assert response.status_code == 400
+    assert client.post(f'/competitions/{archive}/comments/import', headers=headers, data=comments).status_code == 201
+
+    # The CSV export loads into another competition; submission ids are kept, so clear the originals first
+    copy = create_competition(client, headers, "Copy")
+    with app.app_context():
+        Comment.query.delete()
+        Submission.query.filter_by(competition_id=archive).delete()
+        db.session.commit()
+    response = client.post(f'/competitions/{copy}/submissions/import?format=csv', headers=headers, data=exported)
+    assert response.get_json()["imported"] == NUM_SUBMISSIONS
+    with app.app_context():
+        assert Competition.query.get(copy).submissions_count == NUM_SUBMISSIONS
+        assert Submission.query.filter_by(competition_id=copy, title="Entry 42").one().user_id == "author-42"
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_import_and_export_round_trip()
@@ -0,0 +1,113 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import HashRing, InMemoryRedis, ShardedCache
+
+# Set to e.g. "redis://localhost:6379/0,redis://localhost:6380/0" to run against real redis-server instances
+REDIS_URLS = os.getenv('CACHE_TEST_REDIS_URLS', 'memory://a,memory://b,memory://c').split(',')
+NUM_KEYS = 10000
+
+def test_keys_spread_evenly():
+    ring = HashRing(["node-a", "node-b", "node-c"])
+    owners = Counter(ring.get_node(f"competition:{i}") for i in range(NUM_KEYS))
+    print(f"Keys per node: {dict(owners)}")
+    for count in owners.values():
+        assert abs(count - NUM_KEYS / 3) < NUM_KEYS * 0.1
+
+def test_adding_a_node_moves_few_keys():
+    ring = HashRing(["node-a", "node-b", "node-c"])
+    before = {i: ring.get_node(f"competition:{i}") for i in range(NUM_KEYS)}
+    ring.add_node("node-d")
+    moved = [i for i in range(NUM_KEYS) if ring.get_node(f"competition:{i}") != before[i]]
+    print(f"Keys moved after adding a 4th node: {len(moved) / NUM_KEYS:.1%}")
+    # Ideally 1/4; only keys that now belong to the new node may move
+    assert len(moved) < NUM_KEYS * 0.35
+    assert all(ring.get_node(f"competition:{i}") == "node-d" for i in moved)
+
+def test_read_through_and_invalidate():
+    cache = ShardedCache.from_urls(REDIS_URLS, ttl=30)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return {"title": "Great Expectations", "count": len(loads)}
+
+    assert cache.get_or_load("competition:42", ("page", 1), load) == {"title": "Great Expectations", "count": 1}
+    assert cache.get_or_load("competition:42", ("page", 1), load)["count"] == 1
+    assert len(loads) == 1
+
+    cache.invalidate("competition:42")
+    assert cache.get_or_load("competition:42", ("page", 1), load)["count"] == 2
+    assert len(loads) == 2
+
+def test_missing_values_are_not_cached():
+    cache = ShardedCache.from_urls(REDIS_URLS, ttl=30)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return None
+
+    cache.get_or_load("submission:missing", (), load)
+    cache.get_or_load("submission:missing", (), load)
+    assert len(loads) == 2
+
+def test_unreachable_node_falls_through_to_loader():
+    cache = ShardedCache.from_urls(["redis://localhost:1/0"], ttl=30)
+    assert cache.get_or_load("competitions", (), lambda: {"ok": True}) == {"ok": True}
+    cache.invalidate("competitions")
+
+def test_concurrent_misses_load_once():
+    cache = ShardedCache.from_urls(REDIS_URLS, ttl=30)
+    loads = []
+
+    def load():
+        loads.append(1)
+        time.sleep(0.2)
+        return {"loads": len(loads)}
+
+    results = []
+    readers = [threading.Thread(target=lambda: results.append(cache.get_or_load("competition:7", (), load)))
+               for _ in range(50)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+    assert len(loads) == 1 and results == [{"loads": 1}] * 50
+
+def test_stale_entry_served_while_another_process_reloads():
+    # Two workers sharing one Redis node
+    node = InMemoryRedis()
+    worker_a, worker_b = ShardedCache({"a": node}, ttl=30), ShardedCache({"a": node}, ttl=30)
+    release = threading.Event()
+    worker_a.get_or_load("competition:7", (), lambda: {"likes": 1})
+    worker_a.invalidate("competition:7")
+
+    def slow_load():
+        release.wait()
+        return {"likes": 2}
+
+    reloading = threading.Thread(target=lambda: worker_a.get_or_load("competition:7", (), slow_load))
+    reloading.start()
+    time.sleep(0.05)
+    # Worker B doesn't load while A holds the lock, and answers from the stale entry
+    assert worker_b.get_or_load("competition:7", (), lambda: {"likes": 3}) == {"likes": 1}
+    release.set()
+    reloading.join()
+    assert worker_b.get_or_load("competition:7", (), lambda: {"likes": 3}) == {"likes": 2}
+    assert worker_b.stats["loads"] == 0
+
+if __name__ == "__main__":
+    test_keys_spread_evenly()
+    test_adding_a_node_moves_few_keys()
+    test_read_through_and_invalidate()
+    test_missing_values_are_not_cached()
+    test_unreachable_node_falls_through_to_loader()
+    test_concurrent_misses_load_once()
+    test_stale_entry_served_while_another_process_reloads()
+    print("All cache tests passed.")
@@ -0,0 +1,121 @@
+import os
+import sys
+import tempfile
+import time
+import uuid
+import datetime
+
+# Run against a throwaway SQLite file unless DATABASE_URL points elsewhere
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{tempfile.mkdtemp()}/comments.db")
+os.environ.setdefault('CACHE_REDIS_URLS', 'memory://a')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import Competition, Submission, Comment
+from queries import get_comment_tree, REPLIES_PER_COMMENT
+
+NUM_COMMENTS = 50000
+NUM_THREADS = 5000
+NUM_HOT_REPLIES = 50000
+
+# NUM_THREADS top-level comments, each with a chain of replies four levels deep, and the
+# rest spread as direct replies to the top-level ones
+def seed_submission():
+    competition = Competition(title="Threads", description="Comment tree", admin_id="admin",
+                              start_date=datetime.date.today(), end_date=datetime.date.today())
+    db.session.add(competition)
+    db.session.flush()
+    submission = Submission(title="Pip", content="...", competition_id=competition.id, user_id="author")
+    db.session.add(submission)
+    db.session.flush()
+    return submission.id
+
+def seed():
+    submission_id = seed_submission()
+    start = datetime.datetime(2024, 1, 1)
+    rows, top_level = [], []
+    for i in range(NUM_COMMENTS):
+        if i < NUM_THREADS:
+            parent = None
+        elif i < NUM_THREADS * 5:
+            parent = rows[i - NUM_THREADS]["id"]
+        else:
+            parent = top_level[i % NUM_THREADS]
+        rows.append({"id": str(uuid.uuid4()), "content": f"Comment {i}", "user_id": "reader",
+                     "submission_id": submission_id, "parent_comment_id": parent,
+                     "created_at": start + datetime.timedelta(seconds=i)})
+        if parent is None:
+            top_level.append(rows[-1]["id"])
+    db.session.execute(Comment.__table__.insert(), rows)
+    db.session.commit()
+    return submission_id
+
+def depth_of(node):
+    return 1 + max((depth_of(reply) for reply in node["replies"]), default=0)
+
+def test_first_page_of_a_large_thread():
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        submission_id = seed()
+
+        start = time.time()
+        comments, cursor = get_comment_tree(submission_id, limit=20, depth=2)
+        print(f"First page of {NUM_COMMENTS} comments in {(time.time() - start) * 1000:.1f} ms")
+        assert len(comments) == 20 and cursor
+        assert [c["content"] for c in comments[:2]] == ["Comment 0", "Comment 1"]
+        # Depth 2 shows two reply levels; the third level is only counted
+        assert all(depth_of(comment) == 3 for comment in comments)
+        deepest = comments[0]["replies"][0]["replies"][0]
+        assert deepest["replies"] == [] and deepest["reply_count"] == 1
+        assert comments[0]["reply_count"] == (NUM_COMMENTS - NUM_THREADS * 5) // NUM_THREADS + 1
+        assert len(comments[0]["replies"]) == REPLIES_PER_COMMENT and comments[0]["replies_cursor"]
+
+        following, _ = get_comment_tree(submission_id, cursor=cursor, limit=20, depth=0)
+        assert following[0]["content"] == "Comment 20"
+
+        # Expanding the unexpanded replies
+        replies, _ = get_comment_tree(submission_id, parent_id=deepest["comment_id"], depth=0)
+        assert len(replies) == 1
+        # Ends the read transaction, whose locks would block DROP on Postgres
+        db.session.remove()
+        db.drop_all()
+
+# One comment with NUM_HOT_REPLIES direct replies, each answered once
+def test_comment_with_many_replies():
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        submission_id = seed_submission()
+        start = datetime.datetime(2024, 1, 1)
+        hot = {"id": "hot", "content": "Hot take", "user_id": "reader", "submission_id": submission_id,
+               "parent_comment_id": None, "created_at": start}
+        replies = [{"id": f"reply-{i:05d}", "content": f"Reply {i}", "user_id": "reader",
+                    "submission_id": submission_id, "parent_comment_id": "hot",
+                    "created_at": start + datetime.timedelta(seconds=i + 1)} for i in range(NUM_HOT_REPLIES)]
+        answers = [dict(reply, id=f"answer-{i:05d}", content=f"Answer {i}", parent_comment_id=reply["id"])
+                   for i, reply in enumerate(replies[:100])]
+        db.session.execute(Comment.__table__.insert(), [hot] + replies + answers)
+        db.session.commit()
+
+        begin = time.time()
+        comments, cursor = get_comment_tree(submission_id, limit=20, depth=3)
+        print(f"First page under a comment with {NUM_HOT_REPLIES} replies in {(time.time() - begin) * 1000:.1f} ms")
+        assert cursor is None and len(comments) == 1
+        shown = comments[0]["replies"]
+        assert comments[0]["reply_count"] == NUM_HOT_REPLIES
+        assert [reply["content"] for reply in shown] == [f"Reply {i}" for i in range(REPLIES_PER_COMMENT)]
+        assert [reply["replies"][0]["content"] for reply in shown] == [f"Answer {i}" for i in range(REPLIES_PER_COMMENT)]
+
+        # The rest of the replies, a page at a time, from where the tree stopped
+        rest, next_cursor = get_comment_tree(submission_id, parent_id="hot", cursor=comments[0]["replies_cursor"],
+                                             limit=20, depth=0)
+        assert [reply["content"] for reply in rest] == [f"Reply {i}" for i in range(REPLIES_PER_COMMENT, REPLIES_PER_COMMENT + 20)]
+        assert next_cursor
+        # Ends the read transaction, whose locks would block DROP on Postgres
+        db.session.remove()
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_first_page_of_a_large_thread()
+    test_comment_with_many_replies()
@@ -0,0 +1,68 @@
+import gzip
+import json
+import os
+import sys
+import datetime
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('CACHE_REDIS_URLS', 'memory://a')
+os.environ.setdefault('LEADERBOARD_REDIS_URL', 'memory://')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from app import app, db
+from models import Competition, Submission
+from like_buffer import write_likes
+
+NUM_SUBMISSIONS = 100
+
+def test_etags_and_compression():
+    with app.app_context():
+        db.create_all()
+        today = datetime.date.today()
+        competition = Competition(title="Polled", description="...", admin_id="admin", start_date=today, end_date=today)
+        db.session.add(competition)
+        db.session.flush()
+        submissions = [Submission(title=f"Entry {i}", content="x" * 100, competition_id=competition.id, user_id="u")
+                       for i in range(NUM_SUBMISSIONS)]
+        db.session.add_all(submissions)
+        db.session.commit()
+
+        client = app.test_client()
+        url = f"/competitions/{competition.id}"
+        first = client.get(url)
+        tag = first.headers['ETag']
+        assert first.status_code == 200 and first.headers['Cache-Control'] == 'no-cache'
+
+        statements = []
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', record)
+        unchanged = client.get(url, headers={'If-None-Match': tag})
+        event.remove(db.engine, 'before_cursor_execute', record)
+        assert unchanged.status_code == 304 and unchanged.headers['ETag'] == tag and unchanged.data == b''
+        # Only the version lookup, on the competition row
+        assert len(statements) == 1 and 'submission' not in statements[0]
+
+        # A like bumps both versions
+        submission_tag = client.get(f"/submissions/{submissions[0].id}").headers['ETag']
+        write_likes({("fan", submissions[0].id): datetime.datetime.utcnow()})
+        changed = client.get(url, headers={'If-None-Match': tag})
+        assert changed.status_code == 200 and changed.headers['ETag'] != tag
+        liked = client.get(f"/submissions/{submissions[0].id}", headers={'If-None-Match': submission_tag})
+        assert liked.status_code == 200 and liked.get_json()["likes"] == 1
+
+        # Large bodies are gzipped, with their own ETag that revalidates the same way
+        compressed = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        assert compressed.headers['Content-Encoding'] == 'gzip'
+        assert compressed.headers['ETag'].endswith('-gzip"')
+        body = json.loads(gzip.decompress(compressed.data))
+        assert len(body["submissions"]) == 50
+        print(f"Competition page: {len(changed.data)} bytes, {len(compressed.data)} gzipped")
+        assert client.get(url, headers={'Accept-Encoding': 'gzip',
+                                        'If-None-Match': compressed.headers['ETag']}).status_code == 304
+        assert client.get("/competitions/missing", headers={'If-None-Match': tag}).status_code == 404
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_etags_and_compression()
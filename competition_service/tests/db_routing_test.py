@@ -0,0 +1,104 @@
+import os
+import sys
+import tempfile
+import time
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from flask import Flask, jsonify
+from db_routing import ReplicaRouter, RoutingSQLAlchemy
+
+# SQLite files stand in for the primary and two replicas; set ROUTING_TEST_DATABASE_URLS
+# to "primary,replica1,replica2" URLs of independent Postgres servers instead. Each gets a
+# marker row so responses show which one served them.
+DIRECTORY = tempfile.mkdtemp()
+URLS = os.getenv('ROUTING_TEST_DATABASE_URLS', ','.join(
+    f"sqlite:///{DIRECTORY}/{name}.db" for name in ("primary", "replica-1", "replica-2")
+)).split(',')
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = URLS[0]
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+db = RoutingSQLAlchemy(app)
+router = ReplicaRouter(URLS[1:], max_lag=1, sticky_seconds=0.5)
+router.init_app(app)
+# The test measures lag itself (check_replicas) instead of running the monitor thread
+router._monitor_pid = os.getpid()
+
+
+class Note(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    text = db.Column(db.String(50), nullable=False)
+
+
+@app.route('/notes', methods=['GET'])
+def list_notes():
+    return jsonify([note.text for note in Note.query.order_by(Note.id)]), 200
+
+@app.route('/notes', methods=['POST'])
+def add_note():
+    db.session.add(Note(text="written"))
+    db.session.commit()
+    # Read back in the same request: must see its own write
+    return jsonify([note.text for note in Note.query.order_by(Note.id)]), 201
+
+@app.route('/notes/primary', methods=['GET'])
+def list_notes_from_primary():
+    with router.primary():
+        return jsonify([note.text for note in Note.query.order_by(Note.id)]), 200
+
+def served_by(response):
+    return response.get_json()[0]
+
+def setup_databases():
+    with app.app_context():
+        engines = [db.engine] + [replica.engine for replica in router.replicas]
+        for engine, name in zip(engines, ("primary", "replica-1", "replica-2")):
+            db.metadata.drop_all(engine)
+            db.metadata.create_all(engine)
+            with engine.begin() as connection:
+                connection.execute(Note.__table__.insert(), {"text": name})
+
+def test_reads_go_to_healthy_replicas():
+    setup_databases()
+    client = app.test_client()
+
+    # Lag not measured yet: nothing in rotation
+    assert served_by(client.get('/notes')) == "primary"
+
+    router.check_replicas()
+    assert sorted(served_by(client.get('/notes')) for _ in range(4)) == ["replica-1", "replica-1", "replica-2", "replica-2"]
+    assert served_by(client.get('/notes/primary')) == "primary"
+
+    # A write goes to the primary and pins this client there for the stickiness window
+    assert client.post('/notes').get_json() == ["primary", "written"]
+    assert served_by(client.get('/notes')) == "primary"
+    time.sleep(0.6)
+    assert served_by(client.get('/notes')).startswith("replica")
+
+    # A lagging replica leaves the rotation, and comes back once it has caught up
+    router.measure_lag = lambda replica: 10.0 if replica is router.replicas[0] else 0.0
+    router.check_replicas()
+    assert {served_by(client.get('/notes')) for _ in range(4)} == {"replica-2"}
+    del router.measure_lag
+    router.check_replicas()
+    assert {served_by(client.get('/notes')) for _ in range(4)} == {"replica-1", "replica-2"}
+
+    # No replica available: reads fall back to the primary
+    for replica in router.replicas:
+        replica.healthy = False
+    assert served_by(client.get('/notes')) == "primary"
+    print(router.status())
+
+def test_user_service_copy_matches():
+    copy = os.path.join(os.path.dirname(SERVICE_DIR), 'user_management_service', 'db_routing.py')
+    if not os.path.exists(copy):
+        print("user_management_service not checked out alongside, skipping")
+        return
+    with open(os.path.join(SERVICE_DIR, 'db_routing.py'), 'rb') as ours, open(copy, 'rb') as theirs:
+        assert ours.read() == theirs.read(), "db_routing.py differs between the services"
+
+if __name__ == "__main__":
+    test_reads_go_to_healthy_replicas()
+    test_user_service_copy_matches()
@@ -0,0 +1,54 @@
+import json
+import os
+import re
+import sys
+import datetime
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('CACHE_REDIS_URLS', 'memory://a')
+os.environ.setdefault('LEADERBOARD_REDIS_URL', 'memory://')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from app import app, db
+from models import Competition, Submission
+
+# A literary entry well past the inline limit, with text that needs escaping
+NOVEL = ''.join(f'Chapter {i}: "Call me Ishmael."\n\tSome years ago — never mind how long. ' for i in range(5000))
+
+def test_lists_skip_content_and_large_entries_stream():
+    with app.app_context():
+        db.create_all()
+        today = datetime.date.today()
+        competition = Competition(title="Novels", description="...", admin_id="admin", start_date=today, end_date=today)
+        db.session.add(competition)
+        db.session.flush()
+        novel = Submission(title="Moby", content=NOVEL, competition_id=competition.id, user_id="herman")
+        poem = Submission(title="Haiku", content="An old silent pond", competition_id=competition.id, user_id="basho")
+        db.session.add_all([novel, poem])
+        db.session.commit()
+        assert novel.content_length == len(NOVEL) and novel.excerpt.startswith('Chapter 0: "Call me Ishmael." Some')
+        assert len(novel.excerpt) <= 283 and novel.excerpt.endswith('...')
+
+        statements = []
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', record)
+        client = app.test_client()
+        listed = client.get(f"/competitions/{competition.id}").get_json()["submissions"]
+        event.remove(db.engine, 'before_cursor_execute', record)
+        assert {entry["title"]: entry["content_length"] for entry in listed} == {"Moby": len(NOVEL), "Haiku": 18}
+        assert not any(re.search(r'submission\.content\b', statement) for statement in statements)
+        assert client.get(f"/competitions/{competition.id}?fields=content").status_code == 400
+
+        assert client.get(f"/submissions/{poem.id}").get_json()["content"] == "An old silent pond"
+        large = client.get(f"/submissions/{novel.id}", buffered=False)
+        chunks = list(large.response)
+        assert len(chunks) > 2 and large.headers['ETag']
+        body = json.loads(b''.join(chunk if isinstance(chunk, bytes) else chunk.encode() for chunk in chunks))
+        print(f"{len(NOVEL)} characters streamed in {len(chunks)} pieces")
+        assert body["content"] == NOVEL and body["title"] == "Moby" and body["likes"] == 0
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_lists_skip_content_and_large_entries_stream()
@@ -0,0 +1,108 @@
+import json
+import os
+import sys
+
+# Needs a throwaway Postgres database: its tables are dropped and rebuilt from the migrations.
+# Run it on its own: python tests/explain_plan_test.py
+DATABASE_URL = os.getenv('EXPLAIN_TEST_DATABASE_URL', '')
+if DATABASE_URL:
+    os.environ['DATABASE_URL'] = DATABASE_URL
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('CACHE_REDIS_URLS', 'memory://a')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_migrate import upgrade
+from sqlalchemy import event
+from app import app, db, init_migrations
+from models import Submission
+import queries
+
+init_migrations(app)
+
+HOT_TABLES = {'competition', 'submission', 'like', 'comment'}
+
+# Enough rows that a sequential scan is clearly the wrong plan
+SEED = [
+    """INSERT INTO competition (id, title, description, admin_id, start_date, end_date, created_at)
+       SELECT 'c' || g, 'Competition ' || g, 'Seeded', 'admin', current_date - 30, current_date + 30 - g % 60,
+              now() - g * interval '1 minute'
+       FROM generate_series(1, 20000) g""",
+    """INSERT INTO submission (id, title, content, created_at, competition_id, user_id)
+       SELECT 's' || g, 'Entry ' || g, repeat('Great expectations. ', 20), now() - g * interval '1 second',
+              'c' || (g % 20000 + 1), 'u' || g % 1000
+       FROM generate_series(1, 200000) g""",
+    """INSERT INTO "like" (id, user_id, submission_id, created_at)
+       SELECT 'l' || g, 'u' || g / 200000, 's' || (g % 200000 + 1), now()
+       FROM generate_series(0, 399999) g""",
+    """INSERT INTO comment (id, content, created_at, user_id, submission_id)
+       SELECT 'm' || g, 'Comment', now() - g * interval '1 second', 'u1', 's' || (g % 200000 + 1)
+       FROM generate_series(1, 200000) g""",
+    """INSERT INTO comment (id, content, created_at, user_id, submission_id, parent_comment_id)
+       SELECT 'r' || g, 'Reply', now(), 'u2', 's' || (g % 200000 + 1), 'm' || g
+       FROM generate_series(1, 100000) g""",
+    "ANALYZE"
+]
+
+def rebuild_schema():
+    db.drop_all()
+    db.session.execute("DROP TABLE IF EXISTS alembic_version")
+    db.session.commit()
+    upgrade()
+    for statement in SEED:
+        db.session.execute(statement)
+    db.session.commit()
+
+# Runs the same code paths as the routes and records the SQL they send
+def hot_queries():
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", capture)
+    try:
+        all_fields = list(queries.SUBMISSION_FIELDS)
+        queries.get_competitions(list(queries.COMPETITION_FIELDS))
+        _, cursor = queries.get_competition_submissions('c2', all_fields, limit=3)
+        queries.get_competition_submissions('c2', all_fields, cursor=cursor, limit=3)
+        queries.get_competition_submissions('c2', ['submission_id', 'title', 'likes_count'])
+        queries.submissions_with_counts(Submission.competition_id == 'c2').all()
+        queries.get_comment_tree('s1')
+        queries.get_submission('s1')
+    finally:
+        event.remove(db.engine, "before_cursor_execute", capture)
+    return captured
+
+def sequential_scans(plan):
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in HOT_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found += sequential_scans(child)
+    return found
+
+def test_hot_queries_use_indexes():
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            print("EXPLAIN_TEST_DATABASE_URL is not a Postgres database, skipping.")
+            return
+        rebuild_schema()
+        failures = []
+        for statement, parameters in hot_queries():
+            cursor = db.session.connection().connection.cursor()
+            cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+            plan = cursor.fetchone()[0]
+            plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+            scans = sequential_scans(plan)
+            if scans:
+                failures.append(f"Seq Scan on {', '.join(scans)}:\n{statement}")
+        # Ends the read transaction, whose locks would block the DROPs
+        db.session.remove()
+        db.drop_all()
+        db.session.execute("DROP TABLE IF EXISTS alembic_version")
+        db.session.commit()
+
+    assert not failures, "\n\n".join(failures)
+
+if __name__ == "__main__":
+    test_hot_queries_use_indexes()
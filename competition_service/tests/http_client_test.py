@@ -0,0 +1,124 @@
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_client import ServiceClient, RetryBudget
+
+# Local stub standing in for user_management_service
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    calls = {}
+
+    def _reply(self, status, body=b'{"ok": true}'):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        count = StubHandler.calls.get(self.path, 0) + 1
+        StubHandler.calls[self.path] = count
+        if self.path == "/slow":
+            time.sleep(1)
+        elif self.path == "/flaky" and count <= 2:
+            return self._reply(503, b'{"error": "unavailable"}')
+        elif self.path == "/down":
+            return self._reply(503, b'{"error": "unavailable"}')
+        elif self.path == "/tail" and count % 2 == 1:
+            # Every other request hits a slow replica
+            time.sleep(1)
+        self._reply(200)
+
+    do_POST = do_GET
+
+    def log_message(self, *args):
+        pass
+
+class StubServer(ThreadingHTTPServer):
+    # Clients that hit their deadline hang up mid-response; that is expected here
+    def handle_error(self, request, client_address):
+        pass
+
+def start_stub():
+    server = StubServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def test_connections_are_reused():
+    server, url = start_stub()
+    client = ServiceClient(url)
+    for _ in range(100):
+        assert client.get("/ok").status_code == 200
+    stats = client.stats()
+    print(f"Connection reuse: {stats}")
+    assert stats["connections_opened"] == 1
+    server.shutdown()
+
+def test_deadline_bounds_the_call():
+    server, url = start_stub()
+    client = ServiceClient(url, retries=5)
+    start = time.monotonic()
+    try:
+        client.get("/slow", deadline=0.3)
+        assert False, "expected a timeout"
+    except requests.exceptions.Timeout:
+        pass
+    elapsed = time.monotonic() - start
+    print(f"Deadline 0.3s, gave up after {elapsed:.2f}s")
+    assert elapsed < 0.6
+    server.shutdown()
+
+def test_retries_transient_errors():
+    server, url = start_stub()
+    client = ServiceClient(url, retries=3)
+    assert client.get("/flaky").status_code == 200
+    assert client.stats()["retries"] == 2
+    server.shutdown()
+
+def test_non_idempotent_requests_are_not_retried():
+    server, url = start_stub()
+    client = ServiceClient(url, retries=3)
+    assert client.post("/down").status_code == 503
+    assert client.stats()["attempts"] == 1
+    server.shutdown()
+
+def test_retry_budget_caps_retries():
+    server, url = start_stub()
+    client = ServiceClient(url, retries=3, backoff=0.001, budget=RetryBudget(ratio=0.1, min_per_second=0, max_tokens=5))
+    for _ in range(20):
+        assert client.get("/down").status_code == 503
+    stats = client.stats()
+    print(f"Retry budget: {stats['retries']} retries for {stats['requests']} requests")
+    assert stats["retries"] <= 7
+    assert stats["budget_exhausted"] > 0
+    server.shutdown()
+
+def test_hedging_cuts_tail_latency():
+    server, url = start_stub()
+    client = ServiceClient(url, hedge_after=0.05)
+    start = time.monotonic()
+    for _ in range(10):
+        assert client.get("/tail").status_code == 200
+    elapsed = time.monotonic() - start
+    stats = client.stats()
+    print(f"10 hedged requests in {elapsed:.2f}s: {stats['hedges']} hedges, {stats['hedge_wins']} won")
+    assert elapsed < 3
+    assert stats["hedge_wins"] > 0
+    server.shutdown()
+
+if __name__ == "__main__":
+    test_connections_are_reused()
+    test_deadline_bounds_the_call()
+    test_retries_transient_errors()
+    test_non_idempotent_requests_are_not_retried()
+    test_retry_budget_caps_retries()
+    test_hedging_cuts_tail_latency()
+    print("All HTTP client tests passed.")
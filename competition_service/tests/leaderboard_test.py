@@ -0,0 +1,132 @@
+import os
+import random
+import sys
+import datetime
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+# Set to e.g. "redis://localhost:6379/0" to run against a real redis-server
+os.environ.setdefault('LEADERBOARD_REDIS_URL', 'memory://')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import Competition, Submission, Like
+import leaderboard
+
+NUM_SUBMISSIONS = 500
+NUM_LIKES = 5000
+
+def test_incremental_updates_match_a_full_sort():
+    likes = {f"s-{i:04d}": 0 for i in range(NUM_SUBMISSIONS)}
+    leaderboard.board.replace("competition-1", dict(likes))
+    for _ in range(NUM_LIKES):
+        submission_id = random.choice(list(likes))
+        likes[submission_id] += 1
+        leaderboard.board.increment("competition-1", submission_id, 1)
+
+    expected = sorted(likes.values(), reverse=True)
+    assert [entry["likes"] for entry in leaderboard.top("competition-1", 10)] == expected[:10]
+    for submission_id in random.sample(list(likes), 20):
+        standing = leaderboard.standing("competition-1", submission_id, 2)
+        # Ties may come in either order, but the score at that rank must agree
+        assert expected[standing["rank"] - 1] == likes[submission_id]
+        assert submission_id in [entry["submission_id"] for entry in standing["around"]]
+
+    leaderboard.board.remove("competition-1", "s-0000")
+    assert leaderboard.standing("competition-1", "s-0000", 2) is None
+    leaderboard.board.drop("competition-1")
+
+def test_rebuild_from_database():
+    with app.app_context():
+        db.create_all()
+        competition = Competition(title="Leaderboard", description="Rebuild", admin_id="admin",
+                                  start_date=datetime.date.today(), end_date=datetime.date.today())
+        db.session.add(competition)
+        db.session.flush()
+        submissions = [Submission(title=f"Entry {i}", content="...", competition_id=competition.id, user_id="u")
+                       for i in range(3)]
+        db.session.add_all(submissions)
+        db.session.flush()
+        for i, submission in enumerate(submissions):
+            db.session.add_all([Like(user_id=f"u-{n}", submission_id=submission.id) for n in range(i * 2)])
+        db.session.commit()
+
+        # Nothing in the board yet: the first read rebuilds it from the Like table
+        leaderboard.board.drop(competition.id)
+        ranking = leaderboard.top(competition.id, 10)
+        assert [entry["submission_id"] for entry in ranking] == [s.id for s in reversed(submissions)]
+        assert [entry["likes"] for entry in ranking] == [4, 2, 0]
+        leaderboard.board.drop(competition.id)
+
+        # A like landing on a flushed board must not leave a board of just that submission
+        db.session.add(Like(user_id="u-new", submission_id=submissions[0].id))
+        db.session.commit()
+        leaderboard.record_like(submissions[0])
+        ranking = leaderboard.top(competition.id, 10)
+        assert [entry["likes"] for entry in ranking] == [4, 2, 1]
+        leaderboard.record_submission(Submission(id="late", competition_id=competition.id))
+        assert leaderboard.standing(competition.id, "late", 1)["likes"] == 0
+        leaderboard.board.drop(competition.id)
+        db.drop_all()
+
+def test_empty_and_unknown_competitions():
+    with app.app_context():
+        db.create_all()
+        competition = Competition(title="Leaderboard", description="Empty", admin_id="admin",
+                                  start_date=datetime.date.today(), end_date=datetime.date.today())
+        db.session.add(competition)
+        db.session.commit()
+        client = app.test_client()
+
+        # Built once, then served without recounting
+        leaderboard.board.drop(competition.id)
+        assert client.get(f"/competitions/{competition.id}/leaderboard").get_json()["leaderboard"] == []
+        assert leaderboard.board.exists(competition.id)
+        submission = Submission(title="First", content="...", competition_id=competition.id, user_id="u")
+        db.session.add(submission)
+        db.session.commit()
+        leaderboard.record_submission(submission)
+        assert [entry["submission_id"] for entry in leaderboard.top(competition.id, 10)] == [submission.id]
+
+        assert client.get("/competitions/no-such-competition/leaderboard").status_code == 404
+        assert not leaderboard.board.exists("no-such-competition")
+        leaderboard.board.drop(competition.id)
+        db.session.remove()
+        db.drop_all()
+
+def test_likes_during_a_rebuild_are_kept():
+    with app.app_context():
+        db.create_all()
+        competition = Competition(title="Leaderboard", description="Race", admin_id="admin",
+                                  start_date=datetime.date.today(), end_date=datetime.date.today())
+        db.session.add(competition)
+        db.session.flush()
+        submission = Submission(title="Entry", content="...", competition_id=competition.id, user_id="u")
+        db.session.add(submission)
+        db.session.commit()
+
+        # A like committed after the recount read the Like table, before the swap
+        recount = leaderboard.submissions_with_counts
+        def racing(criterion):
+            rows = recount(criterion).all()
+            # Only one rebuild at a time
+            assert leaderboard.rebuild(competition.id) is None
+            db.session.add(Like(user_id="u-late", submission_id=submission.id))
+            db.session.commit()
+            leaderboard.record_like(submission)
+            return type("Rows", (), {"all": lambda self: rows})()
+        leaderboard.submissions_with_counts = racing
+        try:
+            leaderboard.board.drop(competition.id)
+            assert leaderboard.rebuild(competition.id) == 1
+        finally:
+            leaderboard.submissions_with_counts = recount
+        assert [entry["likes"] for entry in leaderboard.top(competition.id, 10)] == [1]
+        leaderboard.board.drop(competition.id)
+        db.session.remove()
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_incremental_updates_match_a_full_sort()
+    test_rebuild_from_database()
+    test_empty_and_unknown_competitions()
+    test_likes_during_a_rebuild_are_kept()
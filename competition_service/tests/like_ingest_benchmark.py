@@ -0,0 +1,86 @@
+import os
+import random
+import sys
+import tempfile
+import time
+import datetime
+
+# Run against a throwaway SQLite file unless DATABASE_URL points elsewhere (e.g. Postgres)
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{tempfile.mkdtemp()}/likes.db")
+os.environ.setdefault('CACHE_REDIS_URLS', 'memory://a')
+os.environ.setdefault('LEADERBOARD_REDIS_URL', 'memory://')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import Competition, Submission, Like
+import counters
+from like_buffer import like_buffer
+
+NUM_SUBMISSIONS = 20
+NUM_LIKES = 5000
+# Share of clicks that repeat an earlier like from the same user
+DUPLICATE_RATIO = 0.1
+
+def seed():
+    competition = Competition(title="Final hours", description="Like benchmark", admin_id="admin",
+                              start_date=datetime.date.today(), end_date=datetime.date.today())
+    db.session.add(competition)
+    db.session.flush()
+    submissions = [Submission(title=f"Entry {i}", content="...", competition_id=competition.id, user_id="author")
+                   for i in range(NUM_SUBMISSIONS)]
+    db.session.add_all(submissions)
+    db.session.commit()
+    return competition.id, [submission.id for submission in submissions]
+
+def clicks(prefix, submission_ids):
+    likes = [(f"{prefix}-{i}", random.choice(submission_ids)) for i in range(NUM_LIKES)]
+    likes += random.sample(likes, int(NUM_LIKES * DUPLICATE_RATIO))
+    random.shuffle(likes)
+    return likes
+
+# What like_submission used to do: one INSERT and one COMMIT per click
+def direct(likes):
+    submissions = {submission.id: submission for submission in Submission.query}
+    start = time.time()
+    for user_id, submission_id in likes:
+        try:
+            db.session.add(Like(user_id=user_id, submission_id=submission_id))
+            counters.record_like(submissions[submission_id])
+            db.session.commit()
+        except Exception:
+            # Duplicate like, rejected by the unique constraint
+            db.session.rollback()
+    return time.time() - start
+
+def buffered(likes):
+    start = time.time()
+    for user_id, submission_id in likes:
+        like_buffer.add(user_id, submission_id)
+    while like_buffer.pending():
+        time.sleep(0.005)
+    # The last batch may still be committing
+    while like_buffer.stats["inserted"] < NUM_LIKES:
+        time.sleep(0.005)
+    return time.time() - start
+
+def test_buffered_likes_outpace_direct_inserts():
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        competition_id, submission_ids = seed()
+
+        direct_time = direct(clicks("direct", submission_ids))
+        buffered_time = buffered(clicks("buffered", submission_ids))
+        print(f"direct:   {NUM_LIKES / direct_time:8.0f} likes/s")
+        print(f"buffered: {NUM_LIKES / buffered_time:8.0f} likes/s ({like_buffer.stats['flushes']} flushes)")
+
+        # Every distinct like is stored and counted exactly once on both paths
+        db.session.remove()
+        assert Like.query.count() == 2 * NUM_LIKES
+        assert sum(submission.likes_count for submission in Submission.query) == 2 * NUM_LIKES
+        assert Competition.query.get(competition_id).likes_count == 2 * NUM_LIKES
+        assert buffered_time < direct_time
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_buffered_likes_outpace_direct_inserts()
@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import datetime
+
+# Run against a throwaway SQLite database unless DATABASE_URL points elsewhere
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from app import app, db
+from models import Competition, Submission, Like, Comment
+from counters import reconcile
+
+SUBMISSION_COUNTS = [10, 100, 1000, 2000]
+LIKES_PER_SUBMISSION = 3
+COMMENTS_PER_SUBMISSION = 2
+PAGE_SIZE = 200
+
+def seed(num_submissions):
+    competition = Competition(
+        title="Benchmark",
+        description="Query count benchmark",
+        admin_id="admin",
+        start_date=datetime.date.today(),
+        end_date=datetime.date.today()
+    )
+    db.session.add(competition)
+    db.session.flush()
+    for i in range(num_submissions):
+        submission = Submission(title=f"Entry {i}", content="...", competition_id=competition.id, user_id=f"user-{i}")
+        db.session.add(submission)
+        db.session.flush()
+        db.session.add_all([Like(user_id=f"liker-{j}", submission_id=submission.id) for j in range(LIKES_PER_SUBMISSION)])
+        db.session.add_all([Comment(content="Nice", user_id=f"reader-{j}", submission_id=submission.id) for j in range(COMMENTS_PER_SUBMISSION)])
+    db.session.commit()
+    competition_id = competition.id
+    # Rows were inserted behind the routes' back, so let the reconcile job fill in the counters
+    reconcile()
+    return competition_id
+
+def test_query_count_is_constant():
+    client = app.test_client()
+    statements = []
+
+    with app.app_context():
+        db.create_all()
+        engine = db.get_engine()
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        for num_submissions in SUBMISSION_COUNTS:
+            competition_id = seed(num_submissions)
+            db.session.remove()
+
+            statements.clear()
+            start_time = time.time()
+            response = client.get(f"/competitions/{competition_id}?limit={PAGE_SIZE}")
+            elapsed = time.time() - start_time
+
+            submissions = response.get_json()["submissions"]
+            assert len(submissions) == min(num_submissions, PAGE_SIZE)
+            assert all(sub["likes_count"] == LIKES_PER_SUBMISSION for sub in submissions)
+            assert all(sub["comments_count"] == COMMENTS_PER_SUBMISSION for sub in submissions)
+            print(f"{num_submissions} submissions: {len(statements)} queries in {elapsed * 1000:.1f} ms")
+            assert len(statements) <= 2
+
+if __name__ == "__main__":
+    test_query_count_is_constant()
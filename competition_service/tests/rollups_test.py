@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import datetime
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('CACHE_REDIS_URLS', 'memory://a')
+os.environ.setdefault('LEADERBOARD_REDIS_URL', 'memory://')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import Competition, Submission, Like, Comment, ActivityRollup
+from like_buffer import write_likes
+import rollups
+
+NUM_LIKES = 20000
+
+# Buckets emptied by a deletion stay behind with zeros, which reads the same as no bucket
+def stored_rollups(competition_id):
+    return sorted((row.submission_id, row.granularity, row.bucket_start, row.submissions, row.likes, row.comments)
+                  for row in ActivityRollup.query.filter_by(competition_id=competition_id)
+                  if row.submissions or row.likes or row.comments)
+
+def test_rollups_follow_writes_and_match_a_backfill():
+    with app.app_context():
+        db.create_all()
+        now = datetime.datetime.utcnow()
+        competition = Competition(title="Curves", description="Rollups", admin_id="admin",
+                                  start_date=now.date(), end_date=now.date())
+        db.session.add(competition)
+        db.session.flush()
+        submissions = []
+        for author in ("ann", "bob", "bob"):
+            submission = Submission(title="Entry", content="...", competition_id=competition.id, user_id=author)
+            db.session.add(submission)
+            db.session.flush()
+            rollups.record_submission(submission)
+            submissions.append(submission)
+        db.session.commit()
+
+        # Likes over the last five hours, in like buffer batches
+        likes = [((f"fan-{i}", submissions[i % 3].id), now - datetime.timedelta(minutes=i * 300 / NUM_LIKES))
+                 for i in range(NUM_LIKES)]
+        for first in range(0, NUM_LIKES, 500):
+            write_likes(dict(likes[first:first + 500]))
+        comment = Comment(content="Nice", user_id="fan-1", submission_id=submissions[0].id)
+        db.session.add(comment)
+        rollups.record_comment(submissions[0], comment)
+        db.session.commit()
+
+        client = app.test_client()
+        start = time.time()
+        stats = client.get(f"/competitions/{competition.id}/stats?granularity=hour&buckets=6").get_json()
+        print(f"Stats over {NUM_LIKES} likes in {(time.time() - start) * 1000:.1f} ms")
+        assert len(stats["activity"]) == 6
+        assert sum(point["likes"] for point in stats["activity"]) == NUM_LIKES
+        assert stats["activity"][-1]["submissions"] == 3 and stats["activity"][-1]["comments"] == 1
+        assert stats["top_submitters"][0]["user_id"] == "bob"
+        assert stats["top_submitters"][0]["likes"] == Like.query.filter(
+            Like.submission_id.in_([submissions[1].id, submissions[2].id])).count()
+        daily = client.get(f"/competitions/{competition.id}/stats?granularity=day&buckets=2"
+                           f"&submission_id={submissions[0].id}").get_json()
+        assert sum(point["likes"] for point in daily["activity"]) == Like.query.filter_by(submission_id=submissions[0].id).count()
+        assert client.get(f"/competitions/{competition.id}/stats?granularity=week").status_code == 400
+        assert client.get("/competitions/missing/stats").status_code == 404
+
+        # The backfill recomputes exactly what the write paths maintained
+        incremental = stored_rollups(competition.id)
+        rollups.rebuild(competition.id)
+        assert stored_rollups(competition.id) == incremental
+
+        # Deleting a submission takes its activity out of the competition's buckets
+        rollups.forget_submission(submissions[0])
+        Like.query.filter_by(submission_id=submissions[0].id).delete(synchronize_session=False)
+        Comment.query.filter_by(submission_id=submissions[0].id).delete(synchronize_session=False)
+        db.session.delete(submissions[0])
+        db.session.commit()
+        after_delete = stored_rollups(competition.id)
+        rollups.rebuild(competition.id)
+        assert stored_rollups(competition.id) == after_delete
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_rollups_follow_writes_and_match_a_backfill()
@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import datetime
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('CACHE_REDIS_URLS', 'memory://a')
+os.environ.setdefault('LEADERBOARD_REDIS_URL', 'memory://')
+os.environ.setdefault('JWT_SECRET_KEY', 'search-test')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+from app import app, db
+from models import Competition
+import bulk
+import users
+
+NUM_SUBMISSIONS = 5000
+WORDS = ["river", "mountain", "sunset", "forest", "harbour", "desert", "glacier", "meadow"]
+
+def add_competition(client, headers, title, description):
+    today = datetime.date.today().isoformat()
+    response = client.post("/competitions", headers=headers, json={
+        "title": title, "description": description, "start_date": today, "end_date": today})
+    return response.get_json()["competition_id"]
+
+# The index is kept in sync by the write routes themselves
+def test_search_ranks_filters_and_follows_writes():
+    users._fetch_user_validity = lambda user_id, authorization: True
+    client = app.test_client()
+    with app.app_context():
+        db.create_all()
+        headers = {"Authorization": f"Bearer {create_access_token(identity='admin')}"}
+        photos = add_competition(client, headers, "Landscape photography", "Rivers and mountains at dawn")
+        poems = add_competition(client, headers, "Poetry slam", "Short poems about anything")
+        records = ({"title": f"{WORDS[i % 8].title()} study {i}",
+                    "content": f"A {WORDS[i % 8]} seen from the {WORDS[(i + 3) % 8]}, entry {i}"}
+                   for i in range(NUM_SUBMISSIONS))
+        bulk.import_submissions(Competition.query.get(photos), records)
+        db.session.commit()
+        poem = client.post(f"/competitions/{poems}/submit", headers=headers, json={
+            "title": "Ode", "content": "The river runs <img src=x onerror=alert(1)> past the mill and the mountain"
+        }).get_json()["submission_id"]
+
+        start = time.time()
+        found = client.get("/search?q=glacier&limit=5").get_json()
+        print(f"Search over {NUM_SUBMISSIONS} submissions in {(time.time() - start) * 1000:.1f} ms")
+        assert len(found["results"]) == 5 and found["next_offset"] == 5
+        # Title matches outrank body-only matches
+        assert all(result["title"].startswith("Glacier") for result in found["results"])
+        assert "<mark>glacier</mark>" in found["results"][0]["snippet"]
+
+        # Stemmed, and scoped to a competition or a type
+        rivers = client.get(f"/search?q=rivers&competition_id={poems}").get_json()["results"]
+        assert [result["id"] for result in rivers] == [poem]
+        competitions = client.get("/search?q=mountains&type=competition").get_json()["results"]
+        assert [result["id"] for result in competitions] == [photos]
+        # Submitted markup comes back as text; only the highlighting is HTML
+        snippet = rivers[0]["snippet"]
+        assert "<img" not in snippet and "&lt;img src=x onerror=alert(1)&gt;" in snippet
+        assert "<mark>river</mark>" in snippet
+
+        # Deleting takes documents out of the index in the same transaction
+        assert client.delete(f"/submissions/{poem}", headers=headers).status_code == 200
+        assert client.get(f"/search?q=river&competition_id={poems}").get_json()["results"] == []
+        assert client.get("/search?q=poems&type=competition").get_json()["results"]
+        assert client.delete(f"/competitions/{poems}", headers=headers).status_code == 200
+        assert client.get("/search?q=poems&type=competition").get_json()["results"] == []
+
+        assert client.get("/search?q=").status_code == 400
+        assert client.get("/search?q=river&type=user").status_code == 400
+        assert client.get("/search?q=river&offset=-1").status_code == 400
+        db.session.remove()
+        db.drop_all()
+
+if __name__ == "__main__":
+    test_search_ranks_filters_and_follows_writes()
@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import datetime
+
+# Run against a throwaway SQLite file unless DATABASE_URL points elsewhere (e.g. Postgres)
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{tempfile.mkdtemp()}/hot.db")
+os.environ.setdefault('CACHE_REDIS_URLS', 'memory://a')
+os.environ.setdefault('LEADERBOARD_REDIS_URL', 'memory://')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from app import app, db, cache
+from models import Competition, Submission
+
+# A freshly announced competition: every reader polls the same page while likes keep
+# invalidating it
+READERS = [1, 10, 50, 100, 500]
+DURATION = 3
+INVALIDATE_EVERY = 0.05
+NUM_SUBMISSIONS = 200
+
+def seed():
+    competition = Competition(title="Launch day", description="Hot read benchmark", admin_id="admin",
+                              start_date=datetime.date.today(), end_date=datetime.date.today())
+    db.session.add(competition)
+    db.session.flush()
+    db.session.add_all([Submission(title=f"Entry {i}", content="..." * 50, competition_id=competition.id,
+                                   user_id="author") for i in range(NUM_SUBMISSIONS)])
+    db.session.commit()
+    return competition.id
+
+def run(competition_id, readers):
+    queries = []
+    def count(*args):
+        queries.append(1)
+    event.listen(db.engine, 'before_cursor_execute', count)
+    stop = threading.Event()
+    served = []
+
+    def read():
+        client = app.test_client()
+        while not stop.is_set():
+            assert client.get(f"/competitions/{competition_id}").status_code == 200
+            served.append(1)
+
+    def write():
+        while not stop.is_set():
+            cache.invalidate(f"competition:{competition_id}")
+            time.sleep(INVALIDATE_EVERY)
+
+    threads = [threading.Thread(target=read) for _ in range(readers)] + [threading.Thread(target=write)]
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    event.remove(db.engine, 'before_cursor_execute', count)
+    return len(queries) / DURATION, len(served) / DURATION
+
+def main():
+    with app.app_context():
+        db.create_all()
+        competition_id = seed()
+        for single_flight in (False, True):
+            cache.single_flight = single_flight
+            print(f"single flight {'on' if single_flight else 'off'}:")
+            for readers in READERS:
+                queries, requests = run(competition_id, readers)
+                print(f"  {readers:>3} readers: {requests:7.0f} requests/s, {queries:6.0f} DB queries/s")
+        db.drop_all()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import websocket_server
+from websocket_server import Subscriber, broadcast, rooms, stats
+
+NUM_SUBSCRIBERS = 2000
+NUM_SLOW = 5
+NUM_DEAD = 2
+NUM_NOTIFICATIONS = 300
+QUEUE_SIZE = 50
+
+# Stand-in for a browser connection: fast clients take the frame immediately, slow ones
+# take 200 ms per frame and dead ones never acknowledge it
+class FakeWebSocket:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.received = 0
+        self.closed = False
+        self.last_received_at = None
+
+    async def send(self, frame):
+        if self.delay is None:
+            await asyncio.sleep(3600)
+        elif self.delay:
+            await asyncio.sleep(self.delay)
+        if '"count"' in frame:
+            data = json.loads(frame)
+            self.received += sum(summary["count"] for summary in data.get("messages", [data]))
+        else:
+            self.received += frame.count('"New submission received"')
+        self.last_received_at = time.monotonic()
+
+    async def close(self, code=1000, reason=""):
+        self.closed = True
+
+async def run(policy):
+    websocket_server.SEND_TIMEOUT = 1
+    rooms.clear()
+    for name in stats:
+        stats[name] = 0
+
+    clients = ([FakeWebSocket() for _ in range(NUM_SUBSCRIBERS - NUM_SLOW - NUM_DEAD)]
+               + [FakeWebSocket(0.2) for _ in range(NUM_SLOW)]
+               + [FakeWebSocket(None) for _ in range(NUM_DEAD)])
+    subscribers = [Subscriber(client, queue_size=QUEUE_SIZE, policy=policy) for client in clients]
+    rooms["competition-1"] = set(subscribers)
+    writers = [asyncio.ensure_future(subscriber.run()) for subscriber in subscribers]
+
+    start = time.monotonic()
+    for i in range(NUM_NOTIFICATIONS):
+        broadcast("competition-1", json.dumps({"message": "New submission received", "data": {"n": i}}))
+        # Notifications trickle in rather than arriving in one burst
+        if i % 10 == 0:
+            await asyncio.sleep(0.001)
+    published = time.monotonic() - start
+
+    fast = clients[:NUM_SUBSCRIBERS - NUM_SLOW - NUM_DEAD]
+    while any(client.received < NUM_NOTIFICATIONS for client in fast):
+        await asyncio.sleep(0.01)
+    fast_done = max(client.last_received_at for client in fast) - start
+
+    print(f"{policy}: {len(fast)} fast subscribers got all {NUM_NOTIFICATIONS} notifications in {fast_done * 1000:.0f} ms "
+          f"(published in {published * 1000:.0f} ms), slow got {[c.received for c in clients[len(fast):len(fast) + NUM_SLOW]]}, "
+          f"dead closed: {[c.closed for c in clients[-NUM_DEAD:]]}")
+    print(f"  stats: {stats}")
+
+    # Fast subscribers finish right after the last notification, whatever the slow ones do
+    assert fast_done - published < 1
+    for writer in writers:
+        writer.cancel()
+    return stats
+
+def test_slow_consumers_do_not_stall_others():
+    for policy in ('drop_oldest', 'coalesce', 'disconnect'):
+        result = asyncio.run(run(policy))
+        if policy == 'drop_oldest':
+            assert result["dropped"] > 0
+        elif policy == 'coalesce':
+            assert result["coalesced"] > 0
+        else:
+            assert result["disconnected_slow"] >= NUM_SLOW
+
+def test_coalesce_counts_each_room():
+    async def check():
+        subscriber = Subscriber(FakeWebSocket(), queue_size=4, policy='coalesce')
+        subscriber.offer(json.dumps({"status": "subscribed", "competition_id": "a"}))
+        for competition_id in ("a", "b", "b"):
+            subscriber.offer(json.dumps({"message": "New submission received"}), competition_id)
+        # Full: the three notifications fold into per-room counts, the ack stays queued
+        subscriber.offer(json.dumps({"message": "New submission received"}), "b")
+        summary, count = subscriber._next_frame()
+        assert count == 2 and {entry["competition_id"]: entry["count"] for entry in json.loads(summary)["messages"]} == {"a": 1, "b": 3}
+        assert json.loads(subscriber._next_frame()[0])["status"] == "subscribed"
+        subscriber.discard()
+    asyncio.run(check())
+
+if __name__ == "__main__":
+    test_slow_consumers_do_not_stall_others()
+    test_coalesce_counts_each_room()
@@ -0,0 +1,75 @@
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import requests
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENV = dict(os.environ, DATABASE_URL=os.getenv('DATABASE_URL', f"sqlite:///{tempfile.mkdtemp()}/startup.db"),
+           CACHE_REDIS_URLS=os.getenv('CACHE_REDIS_URLS', 'memory://a'),
+           SECRET_KEY=os.getenv('SECRET_KEY', 'benchmark'), JWT_SECRET_KEY=os.getenv('JWT_SECRET_KEY', 'benchmark'),
+           PYTHONWARNINGS='ignore')
+WORKERS = 4
+IMPORT_RUNS = 5
+
+# Fresh interpreter each time, so nothing is already imported
+def import_time():
+    script = "import time; start = time.perf_counter(); import app; print(time.perf_counter() - start)"
+    runs = [float(subprocess.run([sys.executable, "-c", script], cwd=SERVICE_DIR, env=ENV,
+                                 capture_output=True, text=True, check=True).stdout)
+            for _ in range(IMPORT_RUNS)]
+    return statistics.median(runs) * 1000
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+# Starts gunicorn with gunicorn.conf.py and reports the time until /status first answers
+# and how long each worker took from fork to ready (logged by post_worker_init)
+def boot(preload):
+    port = free_port()
+    log = tempfile.NamedTemporaryFile(suffix=".log", delete=False)
+    start = time.monotonic()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-b", f"127.0.0.1:{port}", "--workers", str(WORKERS), "app:app"],
+        cwd=SERVICE_DIR, env=dict(ENV, GUNICORN_PRELOAD="1" if preload else "0"), stdout=log, stderr=log
+    )
+    try:
+        while True:
+            try:
+                requests.get(f"http://127.0.0.1:{port}/status", timeout=10).raise_for_status()
+                break
+            except requests.exceptions.RequestException:
+                if time.monotonic() - start > 60:
+                    raise
+                time.sleep(0.01)
+        first_response = (time.monotonic() - start) * 1000
+        ready = []
+        while len(ready) < WORKERS and time.monotonic() - start < 60:
+            time.sleep(0.1)
+            with open(log.name) as output:
+                ready = [int(ms) for ms in re.findall(r"ready (\d+) ms after fork", output.read())]
+        return first_response, ready
+    finally:
+        server.terminate()
+        server.wait()
+        os.unlink(log.name)
+
+def test_worker_startup():
+    if subprocess.run([sys.executable, "-m", "gunicorn", "--version"], capture_output=True).returncode != 0:
+        print("gunicorn is not installed, skipping.")
+        return
+    print(f"import app: {import_time():.0f} ms (median of {IMPORT_RUNS})")
+    for preload in (False, True):
+        first_response, ready = boot(preload)
+        print(f"preload={str(preload):5}  first response {first_response:5.0f} ms  "
+              f"worker ready after fork: {', '.join(f'{ms} ms' for ms in sorted(ready))}")
+    assert first_response and ready
+
+if __name__ == "__main__":
+    test_worker_startup()
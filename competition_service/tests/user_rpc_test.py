@@ -0,0 +1,127 @@
+import os
+import sys
+import uuid
+import datetime
+
+# Against a running user gRPC server (user_management_service/grpc_server.py), e.g.
+#
+#   cd user_management_service && python grpc_server.py
+#   USER_GRPC_TARGET=localhost:50051 python tests/user_rpc_test.py
+#
+# Skipped when nothing answers at USER_GRPC_TARGET. The caching test below stands in its
+# own lookups for the server's and runs without one.
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('CACHE_REDIS_URLS', 'memory://a')
+os.environ.setdefault('LEADERBOARD_REDIS_URL', 'memory://')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import grpc
+from app import app, db
+import routes
+from models import Competition, Submission
+from user_rpc import user_rpc, UserRpcError
+
+TARGET = os.getenv('USER_GRPC_TARGET', 'localhost:50051')
+NUM_AUTHORS = 30
+
+def reachable():
+    try:
+        grpc.channel_ready_future(grpc.insecure_channel(TARGET)).result(timeout=1)
+        return True
+    except grpc.FutureTimeoutError:
+        return False
+
+def test_submission_list_names_authors_in_one_call():
+    if not reachable():
+        print(f"No user gRPC server at {TARGET}, skipping")
+        return
+    target, user_rpc.target = user_rpc.target, TARGET
+    calls = []
+    call = user_rpc._call
+    user_rpc._call = lambda method, ids: calls.append((method, len(ids))) or call(method, ids)
+    try:
+        missing = str(uuid.uuid4())
+        assert user_rpc.validate([missing]) == {missing: False}
+
+        with app.app_context():
+            db.create_all()
+            today = datetime.date.today()
+            competition = Competition(title="Named", description="...", admin_id="admin", start_date=today, end_date=today)
+            db.session.add(competition)
+            db.session.flush()
+            db.session.add_all([Submission(title=f"Entry {i}", content="...", competition_id=competition.id,
+                                           user_id=f"user-{i % NUM_AUTHORS}") for i in range(2 * NUM_AUTHORS)])
+            db.session.commit()
+
+            calls.clear()
+            listed = app.test_client().get(f"/competitions/{competition.id}?limit=50").get_json()["submissions"]
+            assert len(listed) == 50 and all("username" in entry for entry in listed)
+            assert calls == [('GetUsers', 50)]
+            named = sum(entry["username"] is not None for entry in listed)
+            print(f"{named} of {len(listed)} entries named by {TARGET} in one GetUsers call")
+            # Without user_id there is nobody to name
+            listed = app.test_client().get(f"/competitions/{competition.id}?fields=title").get_json()["submissions"]
+            assert "username" not in listed[0]
+            db.drop_all()
+    finally:
+        user_rpc.target, user_rpc._pid = target, None
+        del user_rpc._call
+
+def test_usernames_are_not_cached_with_the_page():
+    names = {}
+    def usernames(user_ids):
+        lookups.append(user_ids)
+        if names is None:
+            raise UserRpcError("GetUsers failed: StatusCode.UNAVAILABLE")
+        return {id: names[id] for id in user_ids if id in names}
+    lookups = []
+    # Stands in for the users:names_version counter in Redis
+    names_version = [0]
+    target, user_rpc.target = user_rpc.target, "unused:50051"
+    user_rpc.usernames = usernames
+    read_version, routes.names_version = routes.names_version, lambda: names_version[0]
+    try:
+        with app.app_context():
+            db.create_all()
+            today = datetime.date.today()
+            competition = Competition(title="Cached", description="...", admin_id="admin", start_date=today, end_date=today)
+            db.session.add(competition)
+            db.session.flush()
+            db.session.add(Submission(title="Entry", content="...", competition_id=competition.id, user_id="u-1"))
+            db.session.commit()
+            client = app.test_client()
+            url = f"/competitions/{competition.id}"
+
+            # User service down: names are null, and the page can't be revalidated later
+            names = None
+            degraded = client.get(url)
+            assert degraded.get_json()["submissions"][0]["username"] is None
+            assert "ETag" not in degraded.headers and degraded.headers["Cache-Control"] == "no-store"
+
+            # Back up: the cached page gets names, and its ETag covers their version
+            names = {"u-1": "melville"}
+            named = client.get(url)
+            assert named.get_json()["submissions"][0]["username"] == "melville"
+            lookups.clear()
+            assert client.get(url, headers={"If-None-Match": named.headers["ETag"]}).status_code == 304
+            assert lookups == []
+
+            # The user was deleted
+            names, names_version[0] = {}, 1
+            deleted = client.get(url, headers={"If-None-Match": named.headers["ETag"]})
+            assert deleted.status_code == 200 and deleted.get_json()["submissions"][0]["username"] is None
+
+            # Redis down: no way to tell whether names changed
+            names_version[0] = None
+            unknown = client.get(url, headers={"If-None-Match": deleted.headers["ETag"]})
+            assert unknown.status_code == 200 and "ETag" not in unknown.headers
+            db.session.remove()
+            db.drop_all()
+    finally:
+        user_rpc.target = target
+        routes.names_version = read_version
+        del user_rpc.usernames
+
+if __name__ == "__main__":
+    test_submission_list_names_authors_in_one_call()
+    test_usernames_are_not_cached_with_the_page()
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import redis
+import websockets
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+# Needs a local redis-server
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+os.environ['REDIS_URL'] = REDIS_URL
+PORTS = [6581, 6582]
+
+def start_notification_process(port):
+    env = dict(os.environ, REDIS_URL=REDIS_URL, WEBSOCKET_HOST='127.0.0.1', WEBSOCKET_PORT=str(port))
+    return subprocess.Popen([sys.executable, "websocket_server.py"], cwd=SERVICE_DIR, env=env)
+
+async def subscribe(port, competition_id):
+    for _ in range(50):
+        try:
+            websocket = await websockets.connect(f"ws://127.0.0.1:{port}")
+            break
+        except OSError:
+            await asyncio.sleep(0.1)
+    await websocket.send(json.dumps({"action": "subscribe", "competition_id": competition_id}))
+    assert json.loads(await websocket.recv())["status"] == "subscribed"
+    return websocket
+
+async def check_delivery_across_processes():
+    from notifications import publish_submission
+
+    subscribers = [await subscribe(port, "competition-1") for port in PORTS]
+    # Give both processes time to attach to the Redis channel
+    await asyncio.sleep(0.5)
+
+    # Published from this process, standing in for an API worker
+    start = time.time()
+    publish_submission("competition-1", {"submission_id": "s-1", "title": "Pip"})
+    for websocket in subscribers:
+        message = json.loads(await asyncio.wait_for(websocket.recv(), timeout=5))
+        assert message["data"]["submission"]["submission_id"] == "s-1"
+    print(f"Delivered to {len(subscribers)} notification processes in {(time.time() - start) * 1000:.1f} ms")
+
+    # A subscriber of another competition receives nothing
+    other = await subscribe(PORTS[0], "competition-2")
+    publish_submission("competition-1", {"submission_id": "s-2", "title": "Estella"})
+    try:
+        await asyncio.wait_for(other.recv(), timeout=0.5)
+        assert False, "competition-2 subscriber got a competition-1 notification"
+    except asyncio.TimeoutError:
+        pass
+
+    for websocket in subscribers + [other]:
+        await websocket.close()
+
+def test_delivery_across_processes():
+    try:
+        redis.Redis.from_url(REDIS_URL).ping()
+    except redis.RedisError:
+        print(f"Redis is not reachable at {REDIS_URL}, skipping.")
+        return
+
+    processes = [start_notification_process(port) for port in PORTS]
+    try:
+        asyncio.run(check_delivery_across_processes())
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+if __name__ == "__main__":
+    test_delivery_across_processes()
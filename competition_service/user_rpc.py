@@ -0,0 +1,85 @@
+import os
+import threading
+
+# Client for the user service's gRPC API (protos/users.proto), enabled by setting
+# USER_GRPC_TARGET (host:port of user_management_service/grpc_server.py).
+#
+# Each process opens one channel on first use and keeps it: calls are multiplexed over a
+# single HTTP/2 connection, kept alive between bursts. Channels don't survive a fork, so
+# the pid is checked, like the other lazily started clients. grpc is only imported then,
+# which keeps it out of worker startup when gRPC is off.
+
+USER_GRPC_TARGET = os.getenv('USER_GRPC_TARGET', '')
+USER_GRPC_TIMEOUT = float(os.getenv('USER_GRPC_TIMEOUT', '2'))
+# Ids per call, as the server allows
+MAX_IDS = 1000
+
+
+class UserRpcError(Exception):
+    pass
+
+
+class UserRpcClient:
+    def __init__(self, target, timeout=USER_GRPC_TIMEOUT):
+        self.target = target
+        self.timeout = timeout
+        self._stub = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.target)
+
+    def _users(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    import grpc
+                    import users_pb2_grpc
+                    channel = grpc.insecure_channel(self.target, options=[
+                        ('grpc.keepalive_time_ms', 30000),
+                        ('grpc.keepalive_permit_without_calls', 1),
+                    ])
+                    self._stub = users_pb2_grpc.UsersStub(channel)
+                    self._pid = os.getpid()
+        return self._stub
+
+    @staticmethod
+    def _batches(user_ids):
+        ids = list(dict.fromkeys(user_ids))
+        for start in range(0, len(ids), MAX_IDS):
+            yield ids[start:start + MAX_IDS]
+
+    # Failed calls raise UserRpcError, so callers don't need grpc imported
+    def _call(self, method, user_ids):
+        import grpc
+        import users_pb2
+        replies = []
+        for ids in self._batches(user_ids):
+            try:
+                replies.append(getattr(self._users(), method)(users_pb2.UserIds(user_ids=ids), timeout=self.timeout))
+            except grpc.RpcError as e:
+                raise UserRpcError(f"{method} failed: {e.code()}") from e
+        return replies
+
+    # user_id -> whether the user still exists
+    def validate(self, user_ids):
+        return {id: exists for reply in self._call('ValidateUsers', user_ids) for id, exists in reply.exists.items()}
+
+    # user_id -> username, for the users that exist
+    def usernames(self, user_ids):
+        return {user.id: user.username for reply in self._call('GetUsers', user_ids) for user in reply.users}
+
+    # Ids of users as they are deleted; blocks until the stream ends or fails
+    def watch_deletions(self):
+        import grpc
+        import users_pb2
+        try:
+            for deletion in self._users().WatchUserDeletions(users_pb2.WatchUserDeletionsRequest()):
+                yield deletion.user_id
+        except grpc.RpcError as e:
+            raise UserRpcError(f"WatchUserDeletions failed: {e.code()}") from e
+
+
+user_rpc = UserRpcClient(USER_GRPC_TARGET)
@@ -0,0 +1,155 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+import redis
+import requests
+from http_client import ServiceClient
+from user_rpc import user_rpc, UserRpcError
+from flask import request, jsonify
+from flask_jwt_extended import get_jwt_identity
+
+logger = logging.getLogger(__name__)
+
+USER_SERVICE_URL = os.getenv('USER_SERVICE_URL', 'http://user_management_service:5000')
+REDIS_URL = os.getenv('REDIS_URL', 'redis://redis:6379/0')
+# Published by user_management_service when a profile is deleted
+USER_DELETED_CHANNEL = 'users:deleted'
+# Counter user_management_service bumps whenever a username changes or goes away, so
+# pages that show usernames can be revalidated without looking them up
+USER_NAMES_VERSION_KEY = 'users:names_version'
+
+
+# Bounded LRU of user_id -> exists, with a shorter TTL for users that were not found
+class UserValidityCache:
+    def __init__(self, max_size=10000, ttl=300, negative_ttl=30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            valid, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return valid
+
+    def put(self, user_id, valid):
+        with self._lock:
+            self._entries[user_id] = (valid, time.time() + (self.ttl if valid else self.negative_ttl))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def evict(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+# Shared keep-alive client for user_management_service; /users/validate is read-only so
+# it is safe to retry and hedge even though it is a POST
+user_service = ServiceClient(
+    USER_SERVICE_URL,
+    timeout=float(os.getenv('USER_SERVICE_TIMEOUT', '2')),
+    hedge_after=float(os.getenv('USER_SERVICE_HEDGE_AFTER', '0.2')) or None
+)
+
+validity_cache = UserValidityCache(
+    max_size=int(os.getenv('USER_CACHE_SIZE', '10000')),
+    ttl=int(os.getenv('USER_CACHE_TTL', '300')),
+    negative_ttl=int(os.getenv('USER_CACHE_NEGATIVE_TTL', '30'))
+)
+
+_names_client = redis.Redis.from_url(REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+# Current USER_NAMES_VERSION_KEY, or None when Redis can't be reached
+def names_version():
+    try:
+        return int(_names_client.get(USER_NAMES_VERSION_KEY) or 0)
+    except redis.RedisError as e:
+        logger.warning(f"Could not read the usernames version: {e}")
+        return None
+
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+# With USER_GRPC_TARGET set, deletions arrive over the user service's gRPC stream
+# instead of a Redis subscription of our own
+def _watch_deletions():
+    while True:
+        try:
+            for user_id in user_rpc.watch_deletions():
+                validity_cache.evict(user_id)
+        except UserRpcError as e:
+            logger.warning(f"User deletion stream disconnected: {e}")
+            time.sleep(5)
+
+def _listen_for_deletions():
+    while True:
+        try:
+            pubsub = redis.Redis.from_url(REDIS_URL).pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(USER_DELETED_CHANNEL)
+            for message in pubsub.listen():
+                validity_cache.evict(message['data'].decode('utf-8'))
+        except redis.RedisError as e:
+            logger.warning(f"User deletion listener disconnected: {e}")
+            time.sleep(5)
+
+# Started on first use rather than at import so each gunicorn worker gets its own thread
+def _ensure_listener():
+    global _listener_pid
+    if _listener_pid == os.getpid():
+        return
+    with _listener_lock:
+        if _listener_pid != os.getpid():
+            listener = _watch_deletions if user_rpc.enabled else _listen_for_deletions
+            threading.Thread(target=listener, daemon=True).start()
+            _listener_pid = os.getpid()
+
+def _fetch_user_validity(user_id, authorization):
+    if user_rpc.enabled:
+        return user_rpc.validate([user_id]).get(user_id, False)
+    response = user_service.post(
+        "/users/validate",
+        headers={"Authorization": authorization},
+        idempotent=True
+    )
+    if response.status_code == 200:
+        return True
+    if response.status_code == 404:
+        return False
+    response.raise_for_status()
+    return False
+
+# The JWT signature is already checked locally by flask_jwt_extended; this only answers
+# "does the user still exist", from the cache when possible.
+def user_exists(user_id, authorization):
+    _ensure_listener()
+    valid = validity_cache.get(user_id)
+    if valid is not None:
+        return valid
+    try:
+        valid = _fetch_user_validity(user_id, authorization)
+    except (requests.exceptions.RequestException, UserRpcError) as e:
+        logger.error(f"Error validating user: {e}")
+        return False
+    validity_cache.put(user_id, valid)
+    return valid
+
+# Use below @jwt_required()
+def existing_user_required(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not user_exists(get_jwt_identity(), request.headers.get("Authorization")):
+            return jsonify({"error": "User validation failed"}), 401
+        return fn(*args, **kwargs)
+    return wrapper
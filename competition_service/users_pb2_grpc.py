@@ -0,0 +1,135 @@
+# Generated by the gRPC Python protocol compiler plugin. DO NOT EDIT!
+"""Client and server classes corresponding to protobuf-defined services."""
+import grpc
+
+import users_pb2 as users__pb2
+
+
+class UsersStub(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.ValidateUsers = channel.unary_unary(
+                '/users.Users/ValidateUsers',
+                request_serializer=users__pb2.UserIds.SerializeToString,
+                response_deserializer=users__pb2.ValidateUsersReply.FromString,
+                )
+        self.GetUsers = channel.unary_unary(
+                '/users.Users/GetUsers',
+                request_serializer=users__pb2.UserIds.SerializeToString,
+                response_deserializer=users__pb2.GetUsersReply.FromString,
+                )
+        self.WatchUserDeletions = channel.unary_stream(
+                '/users.Users/WatchUserDeletions',
+                request_serializer=users__pb2.WatchUserDeletionsRequest.SerializeToString,
+                response_deserializer=users__pb2.UserDeletion.FromString,
+                )
+
+
+class UsersServicer(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def ValidateUsers(self, request, context):
+        """Whether each of the given users still exists
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetUsers(self, request, context):
+        """Public profile of each of the given users; unknown ids are left out
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def WatchUserDeletions(self, request, context):
+        """Every user deleted from now on, for as long as the caller keeps the stream open
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_UsersServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'ValidateUsers': grpc.unary_unary_rpc_method_handler(
+                    servicer.ValidateUsers,
+                    request_deserializer=users__pb2.UserIds.FromString,
+                    response_serializer=users__pb2.ValidateUsersReply.SerializeToString,
+            ),
+            'GetUsers': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetUsers,
+                    request_deserializer=users__pb2.UserIds.FromString,
+                    response_serializer=users__pb2.GetUsersReply.SerializeToString,
+            ),
+            'WatchUserDeletions': grpc.unary_stream_rpc_method_handler(
+                    servicer.WatchUserDeletions,
+                    request_deserializer=users__pb2.WatchUserDeletionsRequest.FromString,
+                    response_serializer=users__pb2.UserDeletion.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'users.Users', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+
+
+ # This class is part of an EXPERIMENTAL API.
+class Users(object):
+    """Missing associated documentation comment in .proto file."""
+
+    @staticmethod
+    def ValidateUsers(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/users.Users/ValidateUsers',
+            users__pb2.UserIds.SerializeToString,
+            users__pb2.ValidateUsersReply.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def GetUsers(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/users.Users/GetUsers',
+            users__pb2.UserIds.SerializeToString,
+            users__pb2.GetUsersReply.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def WatchUserDeletions(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/users.Users/WatchUserDeletions',
+            users__pb2.WatchUserDeletionsRequest.SerializeToString,
+            users__pb2.UserDeletion.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
@@ -1,14 +1,175 @@
 import asyncio
-import websockets
 import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from http import HTTPStatus
 import redis
+import websockets
+from notifications import NOTIFICATIONS_CHANNEL, new_submission_message
+
+# Dedicated notification process. API workers publish to Redis (see notifications.py);
+# every process running this module receives each message and fans it out to its own
+# subscribers, so it doesn't matter which replica or worker handled the submission.
+#
+# Each connection has a bounded outbound queue drained by its own writer task, so a slow
+# or half-dead browser only ever delays itself. When a queue is full the overflow policy
+# decides what happens:
+#   drop_oldest - discard the oldest queued notification
+#   coalesce    - fold the queued submission notifications into one "N new submissions"
+#                 summary per competition
+#   disconnect  - close the connection; the client can reconnect and refetch
+#
+# Run with: python websocket_server.py   (GET /stats on the same port returns counters)
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://redis:6379/0')
+WEBSOCKET_HOST = os.getenv('WEBSOCKET_HOST', '0.0.0.0')
+WEBSOCKET_PORT = int(os.getenv('WEBSOCKET_PORT', '6480'))
+QUEUE_SIZE = int(os.getenv('WEBSOCKET_QUEUE_SIZE', '100'))
+OVERFLOW_POLICY = os.getenv('WEBSOCKET_OVERFLOW_POLICY', 'drop_oldest')
+# Up to this many queued notifications go out together in one frame
+BATCH_SIZE = int(os.getenv('WEBSOCKET_BATCH_SIZE', '20'))
+# A send that takes longer than this means the client is gone
+SEND_TIMEOUT = float(os.getenv('WEBSOCKET_SEND_TIMEOUT', '10'))
+
+OVERFLOW_POLICIES = ('drop_oldest', 'coalesce', 'disconnect')
+
+redis_client = redis.Redis.from_url(REDIS_URL)
+
+# competition_id -> subscribers in that room, and websocket -> its subscriber
+rooms = {}
+subscribers = {}
+
+stats = {
+    "connections": 0,
+    "queued": 0,
+    "max_queue_depth": 0,
+    "messages_sent": 0,
+    "frames_sent": 0,
+    "dropped": 0,
+    "coalesced": 0,
+    "disconnected_slow": 0
+}
+
+
+class Subscriber:
+    def __init__(self, websocket, queue_size=QUEUE_SIZE, policy=OVERFLOW_POLICY, batch_size=BATCH_SIZE):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.websocket = websocket
+        self.queue_size = queue_size
+        self.policy = policy
+        self.batch_size = batch_size
+        self.rooms = set()
+        # (message, competition_id); competition_id is None for frames that aren't
+        # submission notifications, e.g. subscription acknowledgements
+        self._queue = deque()
+        # competition_id -> notifications folded into a summary (coalesce policy)
+        self._summary = {}
+        self._ready = asyncio.Event()
+        self._closing = False
 
-# Connect to Redis
-redis_client = redis.StrictRedis(host='redis', port=6378, db=0)
+    # Never blocks: called by the broadcaster for every subscriber in a room
+    def offer(self, message, competition_id=None):
+        if self._closing:
+            return
+        if len(self._queue) >= self.queue_size:
+            if self.policy == 'drop_oldest':
+                self._queue.popleft()
+                stats["queued"] -= 1
+                stats["dropped"] += 1
+            elif self.policy == 'coalesce':
+                kept = deque()
+                for queued in self._queue:
+                    if queued[1] is None:
+                        kept.append(queued)
+                    else:
+                        self._summary[queued[1]] = self._summary.get(queued[1], 0) + 1
+                folded = len(self._queue) - len(kept)
+                self._queue = kept
+                stats["queued"] -= folded
+                stats["coalesced"] += folded
+                if competition_id is not None:
+                    self._summary[competition_id] = self._summary.get(competition_id, 0) + 1
+                    stats["coalesced"] += 1
+                    self._ready.set()
+                    return
+                # Nothing left to fold
+                if len(self._queue) >= self.queue_size:
+                    self._queue.popleft()
+                    stats["queued"] -= 1
+                    stats["dropped"] += 1
+            else:
+                self._closing = True
+                stats["disconnected_slow"] += 1
+                asyncio.ensure_future(self.websocket.close(code=1013, reason="Too slow"))
+                return
+        self._queue.append((message, competition_id))
+        stats["queued"] += 1
+        stats["max_queue_depth"] = max(stats["max_queue_depth"], len(self._queue))
+        self._ready.set()
 
-connected_clients = {}
+    def _next_frame(self):
+        if self._summary:
+            summary = [{"message": f"{count} new submissions", "competition_id": competition_id, "count": count}
+                       for competition_id, count in self._summary.items()]
+            self._summary = {}
+            return json.dumps(summary[0] if len(summary) == 1 else {"messages": summary}), len(summary)
+        batch = [self._queue.popleft()[0] for _ in range(min(self.batch_size, len(self._queue)))]
+        stats["queued"] -= len(batch)
+        if len(batch) == 1:
+            return batch[0], 1
+        # Messages are already JSON, so the batch frame is assembled without re-encoding
+        return '{"messages": [' + ', '.join(batch) + ']}', len(batch)
+
+    async def run(self):
+        try:
+            while True:
+                await self._ready.wait()
+                while self._queue or self._summary:
+                    frame, count = self._next_frame()
+                    await asyncio.wait_for(self.websocket.send(frame), SEND_TIMEOUT)
+                    stats["frames_sent"] += 1
+                    stats["messages_sent"] += count
+                self._ready.clear()
+        except asyncio.TimeoutError:
+            self._closing = True
+            stats["disconnected_slow"] += 1
+            await self.websocket.close(code=1013, reason="Too slow")
+        except websockets.ConnectionClosed:
+            pass
+
+    def discard(self):
+        stats["queued"] -= len(self._queue)
+        self._queue.clear()
+
+
+def broadcast(competition_id, message):
+    for subscriber in rooms.get(competition_id, ()):
+        subscriber.offer(message, competition_id)
+
+def _subscribe(subscriber, competition_id):
+    rooms.setdefault(competition_id, set()).add(subscriber)
+    subscriber.rooms.add(competition_id)
+
+def _unsubscribe_all(subscriber):
+    for competition_id in subscriber.rooms:
+        room = rooms.get(competition_id)
+        if room is not None:
+            room.discard(subscriber)
+            if not room:
+                del rooms[competition_id]
+    subscriber.discard()
 
 async def handler(websocket, path):
+    subscriber = Subscriber(websocket)
+    subscribers[websocket] = subscriber
+    stats["connections"] += 1
+    writer = asyncio.ensure_future(subscriber.run())
     try:
         async for message in websocket:
             data = json.loads(message)
@@ -17,28 +178,55 @@ async def handler(websocket, path):
             if action == "subscribe":
                 competition_id = data.get("competition_id")
                 if competition_id:
-                    if competition_id not in connected_clients:
-                        connected_clients[competition_id] = []
-                    connected_clients[competition_id].append(websocket)
-                    await websocket.send(json.dumps({"status": "subscribed", "competition_id": competition_id}))
-            elif action == "new_submission":
-                competition_id = data.get("competition_id")
-                if competition_id in connected_clients:
-                    # Notify all subscribers of the new submission
-                    for client in connected_clients[competition_id]:
-                        if client != websocket:
-                            await client.send(json.dumps({"message": "New submission received", "data": data}))
+                    _subscribe(subscriber, competition_id)
+                    subscriber.offer(json.dumps({"status": "subscribed", "competition_id": competition_id}))
+            # Notifications only come from the API (notifications.publish_submission) once a
+            # submission is committed; connections are unauthenticated, so clients can't
+            # announce any themselves
     except websockets.ConnectionClosed:
         pass
     finally:
-        # Remove disconnected clients from all rooms
-        for subscribers in connected_clients.values():
-            if websocket in subscribers:
-                subscribers.remove(websocket)
+        writer.cancel()
+        _unsubscribe_all(subscriber)
+        del subscribers[websocket]
+        stats["connections"] -= 1
+
+# Plain HTTP GET /stats on the WebSocket port, for monitoring
+async def process_request(path, request_headers):
+    if path == "/stats":
+        body = json.dumps(dict(stats, rooms=len(rooms))).encode('utf-8')
+        return HTTPStatus.OK, [("Content-Type", "application/json")], body
+    return None
 
-def start_websocket_server():
+# Blocking Redis subscriber, run in its own thread; each message is handed to the event loop
+def _listen(loop):
+    while True:
+        try:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(NOTIFICATIONS_CHANNEL)
+            for message in pubsub.listen():
+                # Anyone with access to Redis can publish here; a bad message is skipped
+                # rather than ending the subscription
+                try:
+                    data = json.loads(message['data'])
+                    competition_id = data['competition_id']
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.warning(f"Skipping malformed notification {message['data']!r}: {e!r}")
+                    continue
+                loop.call_soon_threadsafe(broadcast, competition_id, new_submission_message(data))
+        except redis.RedisError as e:
+            logger.warning(f"Redis subscription lost, reconnecting: {e}")
+            time.sleep(1)
+
+def start_websocket_server(host=WEBSOCKET_HOST, port=WEBSOCKET_PORT):
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
-    start_server = websockets.serve(handler, "0.0.0.0", 6378)
+    # reuse_port lets several notification processes share one port on the same host
+    start_server = websockets.serve(handler, host, port, reuse_port=True, process_request=process_request)
     loop.run_until_complete(start_server)
+    threading.Thread(target=_listen, args=(loop,), daemon=True).start()
     loop.run_forever()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    start_websocket_server()
@@ -0,0 +1,92 @@
+import argparse
+import datetime
+import logging
+import os
+import time
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from sources import SOURCES, SOURCES_BY_NAME, extract
+from warehouse import Warehouse
+
+# Incremental ETL from both service databases into the local warehouse directory.
+#
+# Each table is read from its stored (created_at, id) watermark onwards, in chunks of
+# ETL_CHUNK_SIZE rows, and written as date-partitioned Parquet (or gzipped CSV without
+# pyarrow). The watermark advances after every chunk. Rows newer than ETL_SAFETY_LAG
+# seconds are left for the next run, so a transaction that commits late with an older
+# created_at isn't skipped. The aggregates are only rebuilt when something was loaded,
+# so a run with nothing new costs one indexed query per table.
+#
+# Only new rows are picked up. Deletions, and rows bulk-imported with historical
+# timestamps, need a reload: python etl.py --full <table>
+#
+# Usage: python etl.py [--full TABLE ...] [--every SECONDS]
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DATABASE_URLS = {
+    'users': os.getenv('USER_DATABASE_URL'),
+    'competitions': os.getenv('COMPETITION_DATABASE_URL'),
+}
+WAREHOUSE_DIR = os.getenv('WAREHOUSE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'warehouse'))
+WAREHOUSE_FORMAT = os.getenv('WAREHOUSE_FORMAT') or None
+CHUNK_SIZE = int(os.getenv('ETL_CHUNK_SIZE', '10000'))
+SAFETY_LAG = float(os.getenv('ETL_SAFETY_LAG', '60'))
+
+
+def load_table(warehouse, engine, source, upper, chunk_size=CHUNK_SIZE):
+    watermark = warehouse.watermark(source.name)
+    loaded = 0
+    with engine.connect() as connection:
+        for rows in extract(connection, source, watermark, upper, chunk_size):
+            warehouse.write_chunk(source.name, rows, watermark)
+            last = rows[-1]
+            watermark = (last['created_at'], last['id'])
+            warehouse.save_watermark(source.name, *watermark)
+            loaded += len(rows)
+    return loaded
+
+
+def run(warehouse, engines, full=(), chunk_size=CHUNK_SIZE, safety_lag=SAFETY_LAG):
+    for name in full:
+        warehouse.reset(name)
+    upper = datetime.datetime.utcnow() - datetime.timedelta(seconds=safety_lag)
+    counts = {}
+    for source in SOURCES:
+        engine = engines.get(source.database)
+        if engine is None:
+            continue
+        start = time.time()
+        counts[source.name] = load_table(warehouse, engine, source, upper, chunk_size)
+        logger.info(f"{source.name}: {counts[source.name]} new rows in {time.time() - start:.2f}s")
+    if any(counts.values()) or full:
+        warehouse.aggregate()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load new rows from the service databases into the warehouse")
+    parser.add_argument('--full', nargs='+', default=[], choices=list(SOURCES_BY_NAME), metavar='TABLE',
+                        help="reload these tables from scratch")
+    parser.add_argument('--every', type=float, help="keep running, once every this many seconds")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    engines = {database: create_engine(url) for database, url in DATABASE_URLS.items() if url}
+    if not engines:
+        parser.error("Set USER_DATABASE_URL and/or COMPETITION_DATABASE_URL")
+    warehouse = Warehouse(WAREHOUSE_DIR, WAREHOUSE_FORMAT)
+    full = args.full
+    while True:
+        start = time.time()
+        counts = run(warehouse, engines, full)
+        print(f"Loaded {sum(counts.values())} rows into {WAREHOUSE_DIR} in {time.time() - start:.2f}s: {counts}")
+        if not args.every:
+            break
+        full = ()
+        time.sleep(args.every)
+
+if __name__ == "__main__":
+    main()
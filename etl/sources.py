@@ -0,0 +1,69 @@
+from sqlalchemy import Date, DateTime, column, func, select, table, tuple_
+
+# What the warehouse copies from each service database. Only append-only facts are
+# extracted: every table is read in (created_at, id) order, which both services index,
+# so an incremental run starts exactly after the last row it saw. Passwords, emails and
+# submission/comment text stay in the services. Column types are only given where the
+# driver needs them to return dates rather than strings.
+
+user = table('user', column('id'), column('username'), column('created_at', DateTime))
+subscription = table('subscription', column('id'), column('user_id'), column('competition_id'),
+                     column('created_at', DateTime))
+competition = table('competition', column('id'), column('title'), column('admin_id'), column('start_date', Date),
+                    column('end_date', Date), column('created_at', DateTime))
+submission = table('submission', column('id'), column('competition_id'), column('user_id'), column('title'),
+                   column('content'), column('created_at', DateTime))
+like = table('like', column('id'), column('user_id'), column('submission_id'), column('created_at', DateTime))
+comment = table('comment', column('id'), column('user_id'), column('submission_id'), column('parent_comment_id'),
+                column('created_at', DateTime))
+
+
+class Source:
+    def __init__(self, name, database, source_table, statement):
+        self.name = name
+        # 'users' or 'competitions': which service database it is read from
+        self.database = database
+        self.table = source_table
+        self.statement = statement
+
+    # New rows after the watermark, up to `upper`, in watermark order
+    def query(self, watermark, upper):
+        created_at, id = self.table.c.created_at, self.table.c.id
+        statement = self.statement.where(created_at <= upper)
+        if watermark is not None:
+            statement = statement.where(tuple_(created_at, id) > tuple_(*watermark))
+        return statement.order_by(created_at, id)
+
+
+SOURCES = [
+    Source('user', 'users', user, select([user.c.id, user.c.username, user.c.created_at])),
+    Source('subscription', 'users', subscription, select([subscription])),
+    Source('competition', 'competitions', competition, select([competition])),
+    Source('submission', 'competitions', submission, select([
+        submission.c.id, submission.c.competition_id, submission.c.user_id, submission.c.title,
+        func.length(submission.c.content).label('content_length'), submission.c.created_at
+    ])),
+    # Likes and comments carry their submission's competition so the warehouse needn't join
+    Source('like', 'competitions', like, select([like, submission.c.competition_id]).select_from(
+        like.join(submission, submission.c.id == like.c.submission_id)
+    )),
+    Source('comment', 'competitions', comment, select([comment, submission.c.competition_id]).select_from(
+        comment.join(submission, submission.c.id == comment.c.submission_id)
+    )),
+]
+
+SOURCES_BY_NAME = {source.name: source for source in SOURCES}
+
+
+# Streams the new rows in chunks through a server-side cursor (stream_results), so
+# memory stays at one chunk however far behind the warehouse is
+def extract(connection, source, watermark, upper, chunk_size):
+    result = connection.execution_options(stream_results=True).execute(source.query(watermark, upper))
+    try:
+        while True:
+            rows = result.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield [dict(row._mapping) for row in rows]
+    finally:
+        result.close()
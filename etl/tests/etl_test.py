@@ -0,0 +1,134 @@
+import csv
+import datetime
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+import etl
+import warehouse as warehouse_module
+from warehouse import Warehouse
+
+NUM_SUBMISSIONS = 200
+NUM_LIKES = 20000
+
+SCHEMA = {
+    'users': [
+        'CREATE TABLE "user" (id VARCHAR(36) PRIMARY KEY, username VARCHAR(100), email VARCHAR(255), password VARCHAR(255), created_at DATETIME)',
+        'CREATE INDEX ix_user_created_at_id ON "user" (created_at, id)',
+        'CREATE TABLE subscription (id VARCHAR(36) PRIMARY KEY, user_id VARCHAR(36), competition_id VARCHAR(36), created_at DATETIME)',
+        'CREATE INDEX ix_subscription_created_at_id ON subscription (created_at, id)',
+    ],
+    'competitions': [
+        'CREATE TABLE competition (id VARCHAR(36) PRIMARY KEY, title VARCHAR(255), description TEXT, admin_id VARCHAR(36), start_date DATE, end_date DATE, created_at DATETIME)',
+        'CREATE INDEX ix_competition_created_at_id ON competition (created_at, id)',
+        'CREATE TABLE submission (id VARCHAR(36) PRIMARY KEY, title VARCHAR(255), content TEXT, created_at DATETIME, competition_id VARCHAR(36), user_id VARCHAR(36))',
+        'CREATE INDEX ix_submission_created_at_id ON submission (created_at, id)',
+        'CREATE TABLE "like" (id VARCHAR(36) PRIMARY KEY, user_id VARCHAR(36), submission_id VARCHAR(36), created_at DATETIME)',
+        'CREATE INDEX ix_like_created_at_id ON "like" (created_at, id)',
+        'CREATE TABLE comment (id VARCHAR(36) PRIMARY KEY, content TEXT, created_at DATETIME, user_id VARCHAR(36), submission_id VARCHAR(36), parent_comment_id VARCHAR(36))',
+        'CREATE INDEX ix_comment_created_at_id ON comment (created_at, id)',
+    ],
+}
+
+# Activity over the two days before now
+START = datetime.datetime.utcnow().replace(microsecond=0) - datetime.timedelta(days=2)
+
+# Stored the way SQLAlchemy writes DateTime to SQLite, so string comparisons line up
+def stored(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+def at(seconds):
+    return stored(START + datetime.timedelta(seconds=seconds))
+
+def create_databases(directory):
+    engines = {name: create_engine(f"sqlite:///{directory}/{name}.db") for name in SCHEMA}
+    for name, statements in SCHEMA.items():
+        with engines[name].begin() as connection:
+            for statement in statements:
+                connection.execute(statement)
+    with engines['users'].begin() as connection:
+        connection.execute('INSERT INTO "user" VALUES (?, ?, ?, ?, ?)',
+                           [(f"u{i}", f"user{i}", f"user{i}@example.com", "hash", at(i)) for i in range(50)])
+        connection.execute('INSERT INTO subscription VALUES (?, ?, ?, ?)',
+                           [(f"s{i}", f"u{i}", "c1", at(100 + i)) for i in range(30)])
+    with engines['competitions'].begin() as connection:
+        connection.execute('INSERT INTO competition VALUES (?, ?, ?, ?, ?, ?, ?)',
+                           [(f"c{i}", f"Competition {i}", "...", "admin", "2026-01-01", "2026-12-31", at(i)) for i in (1, 2)])
+        connection.execute('INSERT INTO submission VALUES (?, ?, ?, ?, ?, ?)',
+                           [(f"p{i}", f"Entry {i}", "x" * i, at(1000 + i), f"c{i % 2 + 1}", f"u{i % 50}")
+                            for i in range(NUM_SUBMISSIONS)])
+        add_likes(connection, 0, NUM_LIKES)
+        connection.execute('INSERT INTO comment VALUES (?, ?, ?, ?, ?, ?)',
+                           [(f"m{i}", "Nice", at(90000 + i), f"u{i % 50}", "p1", None) for i in range(10)])
+    return engines
+
+# Spread over the second day; p<i> belongs to c2 when i is odd
+def add_likes(connection, first, count):
+    connection.execute('INSERT INTO "like" VALUES (?, ?, ?, ?)',
+                        [(str(uuid.uuid4()), f"u{i}", f"p{i % NUM_SUBMISSIONS}", at(86400 + i * 3))
+                         for i in range(first, first + count)])
+
+def report(store, name):
+    with open(os.path.join(store.directory, 'aggregates', name)) as f:
+        return {row[next(iter(row))]: row for row in csv.DictReader(f)}
+
+def files(store):
+    found = {}
+    for root, _, names in os.walk(store.directory):
+        for name in names:
+            path = os.path.join(root, name)
+            found[path] = os.stat(path).st_mtime_ns
+    return found
+
+def check_format(fmt):
+    directory = tempfile.mkdtemp()
+    engines = create_databases(directory)
+    store = Warehouse(os.path.join(directory, 'warehouse'), fmt)
+
+    start = time.time()
+    counts = etl.run(store, engines, chunk_size=5000)
+    first_run = time.time() - start
+    assert counts == {"user": 50, "subscription": 30, "competition": 2, "submission": NUM_SUBMISSIONS,
+                      "like": NUM_LIKES, "comment": 10}
+    summary = report(store, 'competition_summary.csv')
+    assert summary['c1']['title'] == "Competition 1"
+    assert int(summary['c1']['likes']) + int(summary['c2']['likes']) == NUM_LIKES
+    assert summary['c2']['comments'] == '10' and summary['c1']['subscriptions'] == '30'
+    assert summary['c1']['participants'] == '25'
+    daily = report(store, 'daily_activity.csv')
+    assert sum(int(day['likes']) for day in daily.values()) == NUM_LIKES
+
+    # Nothing new: one empty query per table, no files touched
+    before = files(store)
+    start = time.time()
+    assert not any(etl.run(store, engines).values())
+    second_run = time.time() - start
+    assert files(store) == before
+
+    # Only the new likes are read; the one inside the safety lag waits for a later run
+    with engines['competitions'].begin() as connection:
+        add_likes(connection, NUM_LIKES, 100)
+        connection.execute('INSERT INTO "like" VALUES (?, ?, ?, ?)',
+                           ("fresh", "u1", "p1", stored(datetime.datetime.utcnow())))
+    assert etl.run(store, engines, safety_lag=60) == {"user": 0, "subscription": 0, "competition": 0,
+                                                     "submission": 0, "like": 100, "comment": 0}
+    summary = report(store, 'competition_summary.csv')
+    assert int(summary['c1']['likes']) + int(summary['c2']['likes']) == NUM_LIKES + 100
+
+    # A full reload gives the same totals
+    etl.run(store, engines, full=['like'])
+    assert report(store, 'competition_summary.csv') == summary
+    print(f"{fmt}: first run {first_run:.2f}s, unchanged run {second_run * 1000:.1f} ms")
+
+def test_incremental_load():
+    check_format('csv')
+    if warehouse_module.pyarrow is not None:
+        check_format('parquet')
+
+if __name__ == "__main__":
+    test_incremental_load()
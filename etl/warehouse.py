@@ -0,0 +1,182 @@
+import csv
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from collections import Counter, defaultdict
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:
+    pyarrow = None
+
+# Local warehouse directory layout:
+#
+#   <table>/date=YYYY-MM-DD/part-<chunk>-<n>.parquet   (or .csv.gz without pyarrow)
+#   _watermarks.json                                    last (created_at, id) loaded per table
+#   aggregates/*.csv                                    reports rebuilt after each load
+#
+# Part files are named after the watermark their chunk started from, so re-running a
+# chunk that was written but not yet recorded (a crash in between) overwrites it
+# instead of duplicating it.
+
+FORMATS = ('parquet', 'csv')
+WATERMARKS_FILE = '_watermarks.json'
+AGGREGATES_DIR = 'aggregates'
+
+
+def default_format():
+    return 'parquet' if pyarrow is not None else 'csv'
+
+
+def _write_atomic(path, write):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = path + '.tmp'
+    write(temporary)
+    os.replace(temporary, path)
+
+
+def _csv_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return '' if value is None else value
+
+
+class Warehouse:
+    def __init__(self, directory, fmt=None):
+        fmt = fmt or default_format()
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown warehouse format: {fmt}")
+        if fmt == 'parquet' and pyarrow is None:
+            raise ValueError("Parquet output needs pyarrow; install it or use the csv format")
+        self.directory = directory
+        self.format = fmt
+
+    # Watermarks
+
+    def _watermarks_path(self):
+        return os.path.join(self.directory, WATERMARKS_FILE)
+
+    def watermarks(self):
+        try:
+            with open(self._watermarks_path()) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def watermark(self, table):
+        mark = self.watermarks().get(table)
+        if mark is None:
+            return None
+        return datetime.datetime.fromisoformat(mark['created_at']), mark['id']
+
+    def save_watermark(self, table, created_at, id):
+        marks = self.watermarks()
+        marks[table] = {"created_at": created_at.isoformat(), "id": id}
+
+        def write(path):
+            with open(path, 'w') as f:
+                json.dump(marks, f, indent=2, sort_keys=True)
+        _write_atomic(self._watermarks_path(), write)
+
+    # Drops a table's files and watermark, so the next run reloads it from scratch
+    def reset(self, table):
+        shutil.rmtree(os.path.join(self.directory, table), ignore_errors=True)
+        marks = self.watermarks()
+        if marks.pop(table, None) is not None:
+            def write(path):
+                with open(path, 'w') as f:
+                    json.dump(marks, f, indent=2, sort_keys=True)
+            _write_atomic(self._watermarks_path(), write)
+
+    # Loading
+
+    def write_chunk(self, table, rows, start_watermark):
+        chunk = hashlib.sha1(repr(start_watermark).encode('utf-8')).hexdigest()[:12]
+        by_date = defaultdict(list)
+        for row in rows:
+            by_date[row['created_at'].date().isoformat()].append(row)
+        for n, (date, partition_rows) in enumerate(sorted(by_date.items())):
+            path = os.path.join(self.directory, table, f"date={date}", f"part-{chunk}-{n}.{self._extension()}")
+            _write_atomic(path, lambda temporary: self._write_file(temporary, partition_rows))
+        return len(by_date)
+
+    def _extension(self):
+        return 'parquet' if self.format == 'parquet' else 'csv.gz'
+
+    def _write_file(self, path, rows):
+        if self.format == 'parquet':
+            columns = {name: [row[name] for row in rows] for name in rows[0]}
+            parquet.write_table(pyarrow.table(columns), path, compression='zstd')
+            return
+        with gzip.open(path, 'wt', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(list(rows[0]))
+            for row in rows:
+                writer.writerow([_csv_value(value) for value in row.values()])
+
+    # Reading
+
+    # Yields (date, row) for every stored row of a table, reading only `columns`
+    def scan(self, table, columns):
+        root = os.path.join(self.directory, table)
+        if not os.path.isdir(root):
+            return
+        for partition in sorted(os.listdir(root)):
+            date = partition.split('=', 1)[1]
+            for name in sorted(os.listdir(os.path.join(root, partition))):
+                path = os.path.join(root, partition, name)
+                if name.endswith('.parquet'):
+                    for batch in parquet.ParquetFile(path).iter_batches(columns=columns):
+                        for row in batch.to_pylist():
+                            yield date, row
+                elif name.endswith('.csv.gz'):
+                    with gzip.open(path, 'rt', newline='') as f:
+                        for row in csv.DictReader(f):
+                            yield date, {column: row[column] for column in columns}
+
+    # Aggregation
+
+    def aggregate(self):
+        daily = defaultdict(Counter)
+        competitions = defaultdict(Counter)
+        titles = {}
+        participants = defaultdict(set)
+
+        for date, _ in self.scan('user', ['id']):
+            daily[date]['new_users'] += 1
+        for date, row in self.scan('subscription', ['competition_id']):
+            daily[date]['subscriptions'] += 1
+            competitions[row['competition_id']]['subscriptions'] += 1
+        for date, row in self.scan('competition', ['id', 'title']):
+            daily[date]['new_competitions'] += 1
+            titles[row['id']] = row['title']
+        for date, row in self.scan('submission', ['competition_id', 'user_id']):
+            daily[date]['submissions'] += 1
+            competitions[row['competition_id']]['submissions'] += 1
+            participants[row['competition_id']].add(row['user_id'])
+        for table in ('like', 'comment'):
+            for date, row in self.scan(table, ['competition_id']):
+                daily[date][f"{table}s"] += 1
+                competitions[row['competition_id']][f"{table}s"] += 1
+
+        daily_columns = ['new_users', 'subscriptions', 'new_competitions', 'submissions', 'likes', 'comments']
+        self._write_report('daily_activity.csv', ['date'] + daily_columns,
+                           ([date] + [daily[date][name] for name in daily_columns] for date in sorted(daily)))
+        summary_columns = ['submissions', 'likes', 'comments', 'subscriptions']
+        self._write_report(
+            'competition_summary.csv', ['competition_id', 'title'] + summary_columns + ['participants'],
+            ([competition_id, titles.get(competition_id, '')] + [competitions[competition_id][name] for name in summary_columns]
+             + [len(participants[competition_id])] for competition_id in sorted(set(competitions) | set(titles)))
+        )
+
+    def _write_report(self, name, header, rows):
+        def write(path):
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(rows)
+        _write_atomic(os.path.join(self.directory, AGGREGATES_DIR, name), write)
@@ -36,9 +36,19 @@ const userServiceBreaker = new opossum(async (reqConfig) => {
     return response.data;
 }, circuitBreakerOptions);
 
+// Resolves with the whole response, so conditional GETs can be relayed (304 and ETag).
+// The body is relayed as received: gzipped when the client accepted gzip, along with
+// the gzip variant's ETag.
 const competitionServiceBreaker = new opossum(async (reqConfig) => {
-    const response = await axios(reqConfig);
-    return response.data;
+    const response = await axios({
+        ...reqConfig,
+        validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+        // Otherwise axios asks for every encoding it can decode, whatever the client accepts
+        headers: { 'Accept-Encoding': 'identity', ...reqConfig.headers },
+        responseType: 'arraybuffer',
+        decompress: false,
+    });
+    return response;
 }, circuitBreakerOptions);
 
 // Utility function to route through the circuit breaker
@@ -52,6 +62,12 @@ async function routeThroughCircuitBreaker(breaker, req, serviceUrl) {
             'Authorization': req.headers['authorization'] || '',
         },
     };
+    if (req.headers['if-none-match']) {
+        reqConfig.headers['If-None-Match'] = req.headers['if-none-match'];
+    }
+    if (req.headers['accept-encoding']) {
+        reqConfig.headers['Accept-Encoding'] = req.headers['accept-encoding'];
+    }
 
     try {
         // Attempt to fire the circuit breaker
@@ -112,12 +128,20 @@ app.all('/competition/*', async (req, res) => {
     try {
         // Remove '/competition' from the forwarded path
         req.url = req.url.replace('/competition', '');
-        const result = await routeThroughCircuitBreaker(
+        const response = await routeThroughCircuitBreaker(
             competitionServiceBreaker,
             req,
             COMPETITION_SERVICE_URL
         );
-        res.status(200).send(result);
+        ['etag', 'cache-control', 'vary', 'content-type', 'content-encoding'].forEach((header) => {
+            if (response.headers[header]) {
+                res.set(header, response.headers[header]);
+            }
+        });
+        if (response.status === 304) {
+            return res.status(304).end();
+        }
+        res.status(200).send(response.data);
     } catch (error) {
         console.error(`Competition service error: ${error.message}`);
         res.status(503).send({ error: 'Competition service is unavailable. Please try again later.' });
@@ -1,18 +1,30 @@
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 from dotenv import load_dotenv
 import os
 from flask_cors import CORS
+import redis
+from db_routing import RoutingSQLAlchemy, router_from_env
 
 load_dotenv()  # Load environment variables from .env
 
-db = SQLAlchemy()
-bcrypt = Bcrypt()
+# GET requests read from the replicas in DATABASE_REPLICA_URLS (see db_routing.py)
+db = RoutingSQLAlchemy()
 jwt = JWTManager()
+# Schema changes are Alembic revisions under migrations/versions (python migrate.py applies them)
+MIGRATIONS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
 
-def create_app():
+# Used to publish user events (e.g. deletions) to the other services
+redis_client = redis.Redis.from_url(os.getenv('REDIS_URL', 'redis://redis:6379/0'), socket_timeout=0.5)
+
+db_router = router_from_env(redis_client)
+
+# Alembic is only needed to apply migrations, so workers don't import it
+def init_migrations(app):
+    from flask_migrate import Migrate
+    return Migrate(app, db, directory=MIGRATIONS_DIRECTORY)
+
+def create_app(migrations=False):
     app = Flask(__name__)
     CORS(app)
 
@@ -23,8 +35,10 @@ def create_app():
 
     # Initialize extensions
     db.init_app(app)
-    bcrypt.init_app(app)
     jwt.init_app(app)
+    db_router.init_app(app)
+    if migrations:
+        init_migrations(app)
 
     # Register Blueprints
     from routes import user_routes
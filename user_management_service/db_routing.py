@@ -0,0 +1,211 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+import redis
+from flask import g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import create_engine, orm, text
+from sqlalchemy.sql.dml import UpdateBase
+
+# Read-replica routing for the Flask-SQLAlchemy session.
+#
+# GET/HEAD requests read from one replica, picked round-robin per request. Everything else
+# uses the primary: other methods, pending or flushing writes, INSERT/UPDATE/DELETE
+# statements, and work outside a request (CLI scripts, background threads).
+#
+# Read-your-writes: after a successful write a client is pinned to the primary for
+# DB_STICKY_SECONDS. The pin is a cookie, plus a Redis key per JWT identity because the
+# gateway only passes the Authorization header through. A background thread measures each
+# replica's lag every DB_LAG_CHECK_INTERVAL seconds; replicas that are behind by more than
+# DB_REPLICA_MAX_LAG seconds, or unreachable, are taken out of rotation until they catch up.
+#
+# DATABASE_REPLICA_URLS is a comma-separated list; when empty everything uses the primary.
+#
+# competition_service and user_management_service each carry an identical copy, as each
+# is built from its own directory. Change both; tests/db_routing_test.py in the
+# competition service checks they match.
+
+logger = logging.getLogger(__name__)
+
+STICKY_COOKIE = 'db_primary_until'
+READ_METHODS = ('GET', 'HEAD')
+
+# Seconds the replica's last replayed transaction is behind, 0 when fully caught up
+POSTGRES_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class Replica:
+    def __init__(self, url):
+        self.engine = create_engine(url, pool_pre_ping=True)
+        # Out of rotation until its lag has been measured once
+        self.healthy = False
+        self.lag = None
+
+
+class ReplicaRouter:
+    def __init__(self, replica_urls=(), max_lag=5.0, sticky_seconds=5.0, check_interval=2.0, redis_client=None):
+        self.replicas = [Replica(url) for url in replica_urls]
+        self.max_lag = max_lag
+        self.sticky_seconds = sticky_seconds
+        self.check_interval = check_interval
+        self.redis_client = redis_client
+        self._next = itertools.count()
+        self._monitor_pid = None
+        self._lock = threading.Lock()
+        # Read requests by where they were served from
+        self.stats = {"replica": 0, "primary_sticky": 0, "primary_no_replica": 0}
+
+    def init_app(self, app):
+        app.extensions['db_routing'] = self
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    # Drops pooled connections, e.g. ones inherited from a parent process
+    def dispose(self):
+        for replica in self.replicas:
+            replica.engine.dispose()
+
+    def measure_lag(self, replica):
+        with replica.engine.connect() as connection:
+            if connection.dialect.name != 'postgresql':
+                return 0.0
+            return float(connection.execute(POSTGRES_LAG_QUERY).scalar())
+
+    def check_replicas(self):
+        for replica in self.replicas:
+            try:
+                replica.lag = self.measure_lag(replica)
+                healthy = replica.lag <= self.max_lag
+            except Exception as e:
+                logger.warning(f"Replica {replica.engine.url!r} unavailable: {e}")
+                replica.lag, healthy = None, False
+            if healthy != replica.healthy:
+                logger.info(f"Replica {replica.engine.url!r} {'back in' if healthy else 'out of'} rotation (lag {replica.lag})")
+            replica.healthy = healthy
+
+    def _monitor(self):
+        while True:
+            self.check_replicas()
+            time.sleep(self.check_interval)
+
+    # Started on first use so each gunicorn worker gets its own monitor
+    def _ensure_monitor(self):
+        if self._monitor_pid == os.getpid():
+            return
+        with self._lock:
+            if self._monitor_pid != os.getpid():
+                threading.Thread(target=self._monitor, daemon=True).start()
+                self._monitor_pid = os.getpid()
+
+    def choose(self):
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._next) % len(healthy)]
+
+    def _identity(self):
+        try:
+            verify_jwt_in_request(optional=True)
+            return get_jwt_identity()
+        except Exception:
+            return None
+
+    def _sticky(self):
+        try:
+            if float(request.cookies.get(STICKY_COOKIE, 0)) > time.time():
+                return True
+        except ValueError:
+            pass
+        identity = self._identity()
+        if identity is None or self.redis_client is None:
+            return False
+        try:
+            return bool(self.redis_client.exists(f"db:sticky:{identity}"))
+        except redis.RedisError:
+            # Can't tell, so play it safe
+            return True
+
+    def _before_request(self):
+        g.db_replica = None
+        if not self.replicas or request.method not in READ_METHODS:
+            return
+        self._ensure_monitor()
+        if self._sticky():
+            self.stats["primary_sticky"] += 1
+            return
+        g.db_replica = self.choose()
+        self.stats["replica" if g.db_replica else "primary_no_replica"] += 1
+
+    def _after_request(self, response):
+        if not self.replicas or request.method in READ_METHODS or response.status_code >= 400:
+            return response
+        until = time.time() + self.sticky_seconds
+        response.set_cookie(STICKY_COOKIE, str(until), max_age=int(self.sticky_seconds) + 1, httponly=True)
+        identity = self._identity()
+        if identity is not None and self.redis_client is not None:
+            try:
+                self.redis_client.set(f"db:sticky:{identity}", 1, px=int(self.sticky_seconds * 1000))
+            except redis.RedisError as e:
+                logger.warning(f"Could not record read-your-writes window: {e}")
+        return response
+
+    # Reads inside the block go to the primary, e.g. ones whose result is kept for longer
+    # than the request, like a rebuilt leaderboard
+    @contextmanager
+    def primary(self):
+        if not has_request_context():
+            yield
+            return
+        replica, g.db_replica = g.get('db_replica'), None
+        try:
+            yield
+        finally:
+            g.db_replica = replica
+
+    # Cache entries filled from a replica may be up to max_lag old, so they shouldn't
+    # outlive that window by much
+    def cache_ttl_cap(self):
+        if has_request_context() and g.get('db_replica') is not None:
+            return max(1, int(self.max_lag))
+        return None
+
+    def status(self):
+        return {
+            "replicas": [{"url": repr(replica.engine.url), "healthy": replica.healthy, "lag": replica.lag}
+                         for replica in self.replicas],
+            **self.stats
+        }
+
+
+class RoutingSession(SignallingSession):
+    def get_bind(self, mapper=None, clause=None):
+        replica = g.get('db_replica') if has_request_context() else None
+        if (replica is not None and not self._flushing and not isinstance(clause, UpdateBase)
+                and not (self.new or self.dirty or self.deleted)):
+            return replica.engine
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+def router_from_env(redis_client=None):
+    return ReplicaRouter(
+        [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()],
+        max_lag=float(os.getenv('DB_REPLICA_MAX_LAG', '5')),
+        sticky_seconds=float(os.getenv('DB_STICKY_SECONDS', '5')),
+        check_interval=float(os.getenv('DB_LAG_CHECK_INTERVAL', '2')),
+        redis_client=redis_client
+    )
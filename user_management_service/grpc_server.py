@@ -0,0 +1,75 @@
+import logging
+import os
+from concurrent import futures
+import grpc
+import redis
+from app import app, db, redis_client
+from models import User
+import users_pb2
+import users_pb2_grpc
+
+# gRPC API for the other services (protos/users.proto), run next to the HTTP workers:
+#
+#   python grpc_server.py
+#
+# Lookups take up to MAX_IDS ids and answer them with one query. WatchUserDeletions relays
+# the users:deleted Redis channel that DELETE /users/delete publishes to; each open stream
+# holds one of the GRPC_WORKERS threads, so keep it to one stream per client process.
+# Only reachable on the internal network: calls are not authenticated.
+
+logger = logging.getLogger(__name__)
+
+GRPC_PORT = int(os.getenv('GRPC_PORT', '50051'))
+GRPC_WORKERS = int(os.getenv('GRPC_WORKERS', '16'))
+MAX_IDS = 1000
+USER_DELETED_CHANNEL = 'users:deleted'
+# How often an idle deletion stream checks that its caller is still there
+WATCH_POLL_SECONDS = 1.0
+
+
+def _user_ids(request, context):
+    ids = list(dict.fromkeys(request.user_ids))
+    if len(ids) > MAX_IDS:
+        context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"At most {MAX_IDS} user ids per call")
+    return ids
+
+
+class UsersService(users_pb2_grpc.UsersServicer):
+    def ValidateUsers(self, request, context):
+        ids = _user_ids(request, context)
+        with app.app_context():
+            found = {id for id, in db.session.query(User.id).filter(User.id.in_(ids))} if ids else set()
+        return users_pb2.ValidateUsersReply(exists={id: id in found for id in ids})
+
+    def GetUsers(self, request, context):
+        ids = _user_ids(request, context)
+        with app.app_context():
+            rows = db.session.query(User.id, User.username).filter(User.id.in_(ids)).all() if ids else []
+        return users_pb2.GetUsersReply(users=[users_pb2.User(id=id, username=username) for id, username in rows])
+
+    def WatchUserDeletions(self, request, context):
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(USER_DELETED_CHANNEL)
+            while context.is_active():
+                message = pubsub.get_message(timeout=WATCH_POLL_SECONDS)
+                if message:
+                    yield users_pb2.UserDeletion(user_id=message['data'].decode('utf-8'))
+        except redis.RedisError as e:
+            context.abort(grpc.StatusCode.UNAVAILABLE, f"Deletion feed unavailable: {e}")
+        finally:
+            pubsub.close()
+
+
+def create_server(port=GRPC_PORT, workers=GRPC_WORKERS):
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=workers))
+    users_pb2_grpc.add_UsersServicer_to_server(UsersService(), server)
+    server.add_insecure_port(f"[::]:{port}")
+    return server
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    server = create_server()
+    server.start()
+    logger.info(f"User gRPC server listening on port {GRPC_PORT}")
+    server.wait_for_termination()
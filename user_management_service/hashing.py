@@ -0,0 +1,109 @@
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import bcrypt
+
+# bcrypt is deliberately slow C code. Run inline it would hold the gevent hub, and every
+# other request on the worker, for the whole hash, so it runs in a small process pool
+# instead. Each request waits cooperatively for its result.
+#
+# Admission control: at most HASH_MAX_PENDING operations may be queued or running per
+# worker. A request that can't get a slot within HASH_ADMISSION_TIMEOUT seconds is
+# turned away (HashingBusy -> 503) rather than piling up behind the others.
+#
+# Pool processes run at a lower priority (HASH_NICE) so that on a busy host the CPU goes to
+# serving requests first and hashing second.
+#
+# BCRYPT_LOG_ROUNDS is the work factor for new hashes. Raising it upgrades existing users
+# the next time they log in (see needs_rehash). HASH_POOL_SIZE=0 hashes inline, for
+# development.
+
+logger = logging.getLogger(__name__)
+
+LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', '12'))
+POOL_SIZE = int(os.getenv('HASH_POOL_SIZE', '2'))
+MAX_PENDING = int(os.getenv('HASH_MAX_PENDING', str(max(POOL_SIZE, 1) * 8)))
+ADMISSION_TIMEOUT = float(os.getenv('HASH_ADMISSION_TIMEOUT', '0.5'))
+HASH_TIMEOUT = float(os.getenv('HASH_TIMEOUT', '10'))
+NICE = int(os.getenv('HASH_NICE', '10'))
+
+stats = {"hashed": 0, "checked": 0, "rehashed": 0, "rejected": 0}
+
+
+class HashingBusy(Exception):
+    pass
+
+
+# Run in the pool processes
+def _init_worker(nice):
+    os.nice(nice)
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds)).decode('utf-8')
+
+def _check(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+_pool = None
+_admission = None
+_pool_pid = None
+_lock = threading.Lock()
+
+# Created on first use, after gunicorn has forked and gevent has patched threading, so
+# each worker gets its own pool and a cooperative semaphore
+def _ensure_pool():
+    global _pool, _admission, _pool_pid
+    if _pool_pid != os.getpid():
+        with _lock:
+            if _pool_pid != os.getpid():
+                _pool = ProcessPoolExecutor(POOL_SIZE, initializer=_init_worker, initargs=(NICE,)) if POOL_SIZE > 0 else None
+                _admission = threading.BoundedSemaphore(MAX_PENDING)
+                _pool_pid = os.getpid()
+    return _pool, _admission
+
+def _run(function, *args):
+    global _pool_pid
+    pool, admission = _ensure_pool()
+    if not admission.acquire(timeout=ADMISSION_TIMEOUT):
+        stats["rejected"] += 1
+        raise HashingBusy("Too many logins in progress, try again shortly")
+    try:
+        if pool is None:
+            return function(*args)
+        future = pool.submit(function, *args)
+        try:
+            return future.result(timeout=HASH_TIMEOUT)
+        except TimeoutError:
+            future.cancel()
+            stats["rejected"] += 1
+            raise HashingBusy("Too many logins in progress, try again shortly")
+    except BrokenProcessPool:
+        # A pool process died. Shut the broken pool down, cancelling whatever is still
+        # queued on it, and start a fresh one for the next request. Concurrent requests
+        # see the same failure; only the first replaces the pool.
+        with _lock:
+            if _pool is pool and _pool_pid == os.getpid():
+                logger.error("Password hashing pool broke, restarting it")
+                pool.shutdown(wait=False, cancel_futures=True)
+                _pool_pid = None
+        raise
+    finally:
+        admission.release()
+
+def hash_password(password):
+    stats["hashed"] += 1
+    return _run(_hash, password.encode('utf-8'), LOG_ROUNDS)
+
+def check_password(password, hashed):
+    stats["checked"] += 1
+    return _run(_check, password.encode('utf-8'), hashed.encode('utf-8'))
+
+# Hashes look like $2b$12$<salt+hash>; the middle field is the work factor
+def needs_rehash(hashed):
+    try:
+        return int(hashed.split('$')[2]) < LOG_ROUNDS
+    except (IndexError, ValueError):
+        return False
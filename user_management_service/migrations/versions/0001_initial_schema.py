@@ -0,0 +1,56 @@
+"""Initial user schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 21:00:00.000000
+
+Databases created earlier with `db.create_all()` already have these tables and are left
+as they are.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _user():
+    return [
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('username', sa.String(length=100), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('password', sa.String(length=255), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username'),
+        sa.UniqueConstraint('email')
+    ]
+
+def _subscription():
+    return [
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('competition_id', sa.String(length=36), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id')
+    ]
+
+TABLES = [('user', _user), ('subscription', _subscription)]
+
+
+def upgrade():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    for name, definition in TABLES:
+        if name not in tables:
+            op.create_table(name, *definition())
+
+
+def downgrade():
+    for name, _ in reversed(TABLES):
+        op.drop_table(name)
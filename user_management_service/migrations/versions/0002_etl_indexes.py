@@ -0,0 +1,40 @@
+"""Indexes for incremental ETL extraction
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 21:00:00.000000
+
+The warehouse ETL (etl/ at the repository root) reads each table in (created_at, id) order
+from its last watermark. Databases that ran the earlier migrate.py may already have the
+indexes, so they are only created where missing.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_user_created_at_id', 'user'),
+    ('ix_subscription_created_at_id', 'subscription'),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        for name, table in INDEXES:
+            op.execute(f'CREATE INDEX IF NOT EXISTS {name} ON "{table}" (created_at, id)')
+        return
+
+    with op.get_context().autocommit_block():
+        for name, table in INDEXES:
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON "{table}" (created_at, id)')
+
+
+def downgrade():
+    for name, table in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -3,6 +3,9 @@ from datetime import datetime
 import uuid
 
 class User(db.Model):
+    # Incremental warehouse extraction (etl/) reads users in this order
+    __table_args__ = (db.Index('ix_user_created_at_id', 'created_at', 'id'),)
+
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     username = db.Column(db.String(100), unique=True, nullable=False)
     email = db.Column(db.String(255), unique=True, nullable=False)
@@ -13,6 +16,8 @@ class User(db.Model):
         return f"<User {self.username}>"
 
 class Subscription(db.Model):
+    __table_args__ = (db.Index('ix_subscription_created_at_id', 'created_at', 'id'),)
+
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
     competition_id = db.Column(db.String(36), nullable=False)
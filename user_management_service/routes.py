@@ -1,6 +1,7 @@
 import requests
+import redis
 from flask import Blueprint, request, jsonify
-from app import db, bcrypt
+from app import db, redis_client
 from models import User, Subscription
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 import datetime
@@ -8,6 +9,9 @@ import asyncio
 import websockets
 import json
 import time
+import hashing
+import streaming
+from hashing import HashingBusy
 
 user_routes = Blueprint('user_routes', __name__)
 
@@ -16,12 +20,20 @@ def status():
     time.sleep(10)
     return jsonify({"status": "User Management Service is running"}), 200
 
+@user_routes.route('/status/hashing', methods=['GET'])
+def hashing_status():
+    return jsonify({"log_rounds": hashing.LOG_ROUNDS, "pool_size": hashing.POOL_SIZE,
+                    "max_pending": hashing.MAX_PENDING, **hashing.stats}), 200
+
 @user_routes.route('/users/register', methods=['POST'])
 def register():
     data = request.get_json()
     if not data:
         return jsonify({"error": "Invalid JSON payload"}), 400
-    hashed_password = bcrypt.generate_password_hash(data['password']).decode('utf-8')
+    try:
+        hashed_password = hashing.hash_password(data['password'])
+    except HashingBusy as e:
+        return jsonify({"error": str(e)}), 503
     new_user = User(username=data['username'], email=data['email'], password=hashed_password)
     try:
         db.session.add(new_user)
@@ -39,7 +51,19 @@ def register():
 def login():
     data = request.get_json()
     user = User.query.filter_by(email=data['email']).first()
-    if user and bcrypt.check_password_hash(user.password, data['password']):
+    try:
+        valid = user is not None and hashing.check_password(data['password'], user.password)
+    except HashingBusy as e:
+        return jsonify({"error": str(e)}), 503
+    if valid:
+        # Upgrade hashes made with an older BCRYPT_LOG_ROUNDS while we have the password
+        if hashing.needs_rehash(user.password):
+            try:
+                user.password = hashing.hash_password(data['password'])
+                db.session.commit()
+                hashing.stats["rehashed"] += 1
+            except HashingBusy:
+                pass  # Try again on a later login
         expires = datetime.timedelta(hours=1)
         access_token = create_access_token(identity=user.id, expires_delta=expires)
         return jsonify({"token": access_token, "user_id": user.id, "expires_at": str(datetime.datetime.utcnow() + expires)}), 200
@@ -97,15 +121,15 @@ def validate_user():
 @jwt_required()
 def get_subscriptions():
     user_id = get_jwt_identity()
-    subscriptions = Subscription.query.filter_by(user_id=user_id).all()
-    if subscriptions:
-        result = [{
-            "subscription_id": sub.id,
-            "competition_id": sub.competition_id,
-            "created_at": sub.created_at
-        } for sub in subscriptions]
-        return jsonify(result), 200
-    return jsonify([]), 200
+    # Unbounded, so streamed as it is read (see streaming.py)
+    rows = (db.session.query(Subscription.id, Subscription.competition_id, Subscription.created_at)
+            .filter(Subscription.user_id == user_id)
+            .yield_per(streaming.CHUNK_SIZE))
+    return streaming.json_array_response({
+        "subscription_id": id,
+        "competition_id": competition_id,
+        "created_at": created_at
+    } for id, competition_id, created_at in rows)
 
 @user_routes.route('/users/delete', methods=['DELETE'])
 @jwt_required()
@@ -116,6 +140,13 @@ def delete_profile():
         try:
             db.session.delete(user)
             db.session.commit()
+            # Lets the competition service drop the user from its validity cache, and
+            # revalidate pages that showed the username
+            try:
+                redis_client.incr("users:names_version")
+                redis_client.publish("users:deleted", user_id)
+            except redis.RedisError as e:
+                print(f"Failed to publish user deletion: {str(e)}")
             return jsonify({"message": "User profile deleted successfully"}), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 400
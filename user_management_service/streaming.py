@@ -0,0 +1,51 @@
+import datetime
+import json
+import os
+from itertools import islice
+from flask import Response, stream_with_context
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# JSON array responses written as the rows are read, for lists with no upper bound.
+#
+# Rows are encoded CHUNK_SIZE at a time (with orjson when it is installed) and sent as
+# they are encoded, so memory stays at one chunk instead of the whole result as Python
+# objects plus the encoded body. Feed it a query with .yield_per(CHUNK_SIZE) so the
+# database driver streams too. Dates are written as Flask's jsonify writes them (HTTP
+# dates), so clients see the same output as before.
+#
+# The status line goes out before the first row is read: an error mid-stream cuts the
+# body short instead of turning into a 4xx/5xx.
+
+CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', '1000'))
+
+
+def _default(value):
+    if isinstance(value, datetime.date):
+        return http_date(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def encode(rows):
+    if orjson is not None:
+        return orjson.dumps(rows, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(rows, default=_default, separators=(',', ':')).encode('utf-8')
+
+def json_array(rows, chunk_size=CHUNK_SIZE):
+    rows = iter(rows)
+    yield b'['
+    separator = b''
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        # Each chunk is encoded as an array; its brackets are dropped
+        yield separator + encode(chunk)[1:-1]
+        separator = b','
+    yield b']'
+
+def json_array_response(rows, status=200):
+    return Response(stream_with_context(json_array(rows)), status=status, mimetype='application/json')
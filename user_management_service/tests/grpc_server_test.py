@@ -0,0 +1,85 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent import futures
+
+# The gRPC API (grpc_server.py) served in-process on a free port, against a throwaway
+# SQLite file. The deletion stream is only checked when Redis is reachable at REDIS_URL.
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{tempfile.mkdtemp()}/users.db")
+os.environ.setdefault('JWT_SECRET_KEY', 'test')
+os.environ.setdefault('REDIS_URL', 'redis://localhost:6379/0')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import grpc
+import redis
+from app import app, db, redis_client
+from models import User
+import grpc_server
+import users_pb2
+import users_pb2_grpc
+
+NUM_USERS = 500
+
+def serve():
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    users_pb2_grpc.add_UsersServicer_to_server(grpc_server.UsersService(), server)
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+    return server, users_pb2_grpc.UsersStub(grpc.insecure_channel(f"localhost:{port}"))
+
+def seed():
+    with app.app_context():
+        db.create_all()
+        if User.query.count():
+            return
+        db.session.add_all([User(id=f"user-{i}", username=f"name-{i}", email=f"{i}@example.com", password="-")
+                            for i in range(NUM_USERS)])
+        db.session.commit()
+
+def test_batched_lookups():
+    seed()
+    server, users = serve()
+    try:
+        ids = [f"user-{i}" for i in range(0, NUM_USERS, 5)] + ["deleted-1", "deleted-2"]
+        start = time.time()
+        exists = users.ValidateUsers(users_pb2.UserIds(user_ids=ids)).exists
+        found = users.GetUsers(users_pb2.UserIds(user_ids=ids)).users
+        print(f"{len(ids)} ids validated and looked up in {(time.time() - start) * 1000:.1f}ms")
+        assert dict(exists) == dict({id: True for id in ids[:-2]}, **{"deleted-1": False, "deleted-2": False})
+        assert {user.id: user.username for user in found} == {f"user-{i}": f"name-{i}" for i in range(0, NUM_USERS, 5)}
+        assert users.GetUsers(users_pb2.UserIds()).users == []
+
+        try:
+            users.ValidateUsers(users_pb2.UserIds(user_ids=[f"id-{i}" for i in range(grpc_server.MAX_IDS + 1)]))
+            assert False, "oversized batch accepted"
+        except grpc.RpcError as e:
+            assert e.code() == grpc.StatusCode.INVALID_ARGUMENT
+    finally:
+        server.stop(None)
+
+def test_deletion_stream():
+    try:
+        redis_client.ping()
+    except redis.RedisError:
+        print("Redis not reachable, skipping the deletion stream")
+        return
+    server, users = serve()
+    try:
+        stream = users.WatchUserDeletions(users_pb2.WatchUserDeletionsRequest())
+        received = []
+        reader = threading.Thread(target=lambda: received.append(next(stream).user_id))
+        reader.start()
+        # Give the server time to subscribe before publishing
+        time.sleep(0.5)
+        redis_client.publish(grpc_server.USER_DELETED_CHANNEL, "user-7")
+        reader.join(5)
+        stream.cancel()
+        assert received == ["user-7"]
+    finally:
+        server.stop(None)
+
+if __name__ == "__main__":
+    test_batched_lookups()
+    test_deletion_stream()
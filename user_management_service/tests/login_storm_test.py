@@ -0,0 +1,66 @@
+import concurrent.futures
+import statistics
+import threading
+import time
+import uuid
+import requests
+
+# Measures /users/validate latency on a running service, first on its own and then while
+# a storm of logins keeps the bcrypt pool busy. Validate should stay flat; logins beyond
+# HASH_MAX_PENDING get 503s instead of queueing.
+BASE_URL = "http://localhost:5000"
+VALIDATE_REQUESTS = 200
+STORM_THREADS = 50
+STORM_SECONDS = 10
+
+def create_user():
+    suffix = uuid.uuid4().hex[:8]
+    user = {"username": f"storm-{suffix}", "email": f"storm-{suffix}@example.com", "password": "hunter22"}
+    requests.post(f"{BASE_URL}/users/register", json=user, timeout=30).raise_for_status()
+    response = requests.post(f"{BASE_URL}/users/login", json=user, timeout=30)
+    response.raise_for_status()
+    return user, response.json()["token"]
+
+def validate_latencies(token):
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies = []
+    with requests.Session() as session:
+        for _ in range(VALIDATE_REQUESTS):
+            start = time.time()
+            session.post(f"{BASE_URL}/users/validate", headers=headers, timeout=30).raise_for_status()
+            latencies.append((time.time() - start) * 1000)
+            time.sleep(0.01)
+    return latencies
+
+def report(label, latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{label:>14}: p50 {statistics.median(latencies):7.1f} ms  p99 {p99:7.1f} ms  max {latencies[-1]:7.1f} ms")
+
+def login_storm(user, stop, results):
+    with requests.Session() as session:
+        while not stop.is_set():
+            try:
+                status = session.post(f"{BASE_URL}/users/login", json=user, timeout=30).status_code
+            except requests.exceptions.RequestException:
+                status = "error"
+            results[status] = results.get(status, 0) + 1
+
+def main():
+    user, token = create_user()
+    report("idle", validate_latencies(token))
+
+    stop, results = threading.Event(), {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=STORM_THREADS) as executor:
+        for _ in range(STORM_THREADS):
+            executor.submit(login_storm, user, stop, results)
+        time.sleep(1)
+        start = time.time()
+        report("login storm", validate_latencies(token))
+        time.sleep(max(0, STORM_SECONDS - (time.time() - start)))
+        stop.set()
+    print(f"Login responses during the storm: {results}")
+    print(requests.get(f"{BASE_URL}/status/hashing", timeout=5).json())
+
+if __name__ == "__main__":
+    main()
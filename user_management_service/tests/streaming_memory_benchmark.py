@@ -0,0 +1,93 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+import datetime
+
+# Peak memory of GET /users/subscriptions for a user with NUM_ROWS subscriptions, built
+# whole and jsonify'd as before versus streamed (streaming.py). Each variant runs in its
+# own process against the same throwaway SQLite file, so their peak RSS can't mix.
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{tempfile.mkdtemp()}/subscriptions.db")
+os.environ.setdefault('JWT_SECRET_KEY', 'benchmark')
+os.environ.setdefault('REDIS_URL', 'redis://localhost:1/0')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import jsonify
+from flask_jwt_extended import create_access_token
+from app import app, db
+from models import User, Subscription
+import streaming
+
+NUM_ROWS = 100000
+USER_ID = "subscriber"
+
+def seed():
+    db.create_all()
+    db.session.add(User(id=USER_ID, username="subscriber", email="subscriber@example.com", password="-"))
+    now = datetime.datetime.utcnow()
+    db.session.execute(Subscription.__table__.insert(), [
+        {"id": str(uuid.uuid4()), "user_id": USER_ID, "competition_id": str(uuid.uuid4()),
+         "created_at": now - datetime.timedelta(seconds=i)} for i in range(NUM_ROWS)])
+    db.session.commit()
+
+# VmHWM rather than ru_maxrss, which Linux carries over from the forking parent
+def peak_rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+
+# What the route did before
+def jsonified():
+    with app.test_request_context():
+        subscriptions = Subscription.query.filter_by(user_id=USER_ID).all()
+        return jsonify([{
+            "subscription_id": sub.id,
+            "competition_id": sub.competition_id,
+            "created_at": sub.created_at
+        } for sub in subscriptions]).get_data()
+
+def streamed(client, token):
+    response = client.get("/users/subscriptions", headers={"Authorization": f"Bearer {token}"}, buffered=False)
+    return b''.join(response.response)
+
+def measure(variant):
+    with app.app_context():
+        token = create_access_token(identity=USER_ID)
+    client = app.test_client()
+    # Warm up imports and the connection
+    with app.app_context():
+        Subscription.query.limit(1).all()
+    baseline = peak_rss_mb()
+    start = time.time()
+    if variant == 'jsonify':
+        size = len(jsonified())
+    else:
+        # Consumed chunk by chunk, as a client socket would
+        size = 0
+        response = client.get("/users/subscriptions", headers={"Authorization": f"Bearer {token}"}, buffered=False)
+        for chunk in response.response:
+            size += len(chunk)
+    print(json.dumps({"seconds": time.time() - start, "bytes": size, "peak_mb": peak_rss_mb() - baseline}))
+
+def main():
+    with app.app_context():
+        seed()
+        token = create_access_token(identity=USER_ID)
+    # Same document either way (jsonify sorts keys)
+    assert sorted(json.loads(streamed(app.test_client(), token)), key=lambda row: row["subscription_id"]) == \
+        sorted(json.loads(jsonified()), key=lambda row: row["subscription_id"])
+    print(f"{NUM_ROWS} subscriptions, encoder: {'orjson' if streaming.orjson else 'json'}")
+    for variant in ('jsonify', 'stream'):
+        result = json.loads(subprocess.check_output([sys.executable, __file__, variant]))
+        print(f"  {variant:>7}: {result['bytes'] / 1e6:.1f} MB body in {result['seconds']:.2f}s, "
+              f"peak RSS +{result['peak_mb']:.1f} MB")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        measure(sys.argv[1])
+    else:
+        main()
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: users.proto
+# Protobuf Python Version: 4.25.1
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0busers.proto\x12\x05users\"\x1b\n\x07UserIds\x12\x10\n\x08user_ids\x18\x01 \x03(\t\"z\n\x12ValidateUsersReply\x12\x35\n\x06\x65xists\x18\x01 \x03(\x0b\x32%.users.ValidateUsersReply.ExistsEntry\x1a-\n\x0b\x45xistsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x08:\x02\x38\x01\"$\n\x04User\x12\n\n\x02id\x18\x01 \x01(\t\x12\x10\n\x08username\x18\x02 \x01(\t\"+\n\rGetUsersReply\x12\x1a\n\x05users\x18\x01 \x03(\x0b\x32\x0b.users.User\"\x1b\n\x19WatchUserDeletionsRequest\"\x1f\n\x0cUserDeletion\x12\x0f\n\x07user_id\x18\x01 \x01(\t2\xc4\x01\n\x05Users\x12:\n\rValidateUsers\x12\x0e.users.UserIds\x1a\x19.users.ValidateUsersReply\x12\x30\n\x08GetUsers\x12\x0e.users.UserIds\x1a\x14.users.GetUsersReply\x12M\n\x12WatchUserDeletions\x12 .users.WatchUserDeletionsRequest\x1a\x13.users.UserDeletion0\x01\x62\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'users_pb2', _globals)
+if _descriptor._USE_C_DESCRIPTORS == False:
+  DESCRIPTOR._options = None
+  _globals['_VALIDATEUSERSREPLY_EXISTSENTRY']._options = None
+  _globals['_VALIDATEUSERSREPLY_EXISTSENTRY']._serialized_options = b'8\001'
+  _globals['_USERIDS']._serialized_start=22
+  _globals['_USERIDS']._serialized_end=49
+  _globals['_VALIDATEUSERSREPLY']._serialized_start=51
+  _globals['_VALIDATEUSERSREPLY']._serialized_end=173
+  _globals['_VALIDATEUSERSREPLY_EXISTSENTRY']._serialized_start=128
+  _globals['_VALIDATEUSERSREPLY_EXISTSENTRY']._serialized_end=173
+  _globals['_USER']._serialized_start=175
+  _globals['_USER']._serialized_end=211
+  _globals['_GETUSERSREPLY']._serialized_start=213
+  _globals['_GETUSERSREPLY']._serialized_end=256
+  _globals['_WATCHUSERDELETIONSREQUEST']._serialized_start=258
+  _globals['_WATCHUSERDELETIONSREQUEST']._serialized_end=285
+  _globals['_USERDELETION']._serialized_start=287
+  _globals['_USERDELETION']._serialized_end=318
+  _globals['_USERS']._serialized_start=321
+  _globals['_USERS']._serialized_end=517
+# @@protoc_insertion_point(module_scope)